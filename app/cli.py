@@ -0,0 +1,132 @@
+"""
+Comandos de línea de comandos de la aplicación.
+
+    python -m app import estates fincas.csv
+    python -m app import users usuarios.ndjson --workers 4 --errors errores.ndjson
+    python -m app rebuild-occupancy
+    python -m app migrate-booking-dates --errors rechazadas.ndjson
+    python -m app geocode
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from app.database import create_tables, dispose_engine
+from app.utils.bulk_import import IMPORT_SPECS, detect_format, open_input, run_import
+from app.utils.occupancy import rebuild_occupancy
+from app.utils.booking_dates import migrate_booking_dates
+from app.utils.geo import geocode_missing
+from app.models import Estate, Experiences
+
+
+async def import_command(args: argparse.Namespace) -> int:
+    fmt = args.format or detect_format(args.path)
+    errors = open(args.errors, "w", encoding="utf-8") if args.errors else sys.stderr
+    try:
+        with open_input(args.path) as stream:
+            report = await run_import(args.entity, stream, fmt, args.batch_size, args.workers, errors)
+    finally:
+        if args.errors:
+            errors.close()
+        await dispose_engine()
+    print(report.summary(args.entity))
+    return 1 if report.rejected else 0
+
+
+async def rebuild_occupancy_command(args: argparse.Namespace) -> int:
+    try:
+        await create_tables()
+        rows = await rebuild_occupancy()
+    finally:
+        await dispose_engine()
+    print(f"ocupación: {rows} noches ocupadas")
+    return 0
+
+
+async def migrate_booking_dates_command(args: argparse.Namespace) -> int:
+    errors = open(args.errors, "w", encoding="utf-8") if args.errors else sys.stderr
+    try:
+        report = await migrate_booking_dates(errors, dry_run=args.dry_run)
+        if report.applied:
+            # Las noches ocupadas dependen de las fechas recién normalizadas
+            await create_tables()
+            rows = await rebuild_occupancy()
+    finally:
+        if args.errors:
+            errors.close()
+        await dispose_engine()
+    print(report.summary())
+    if report.applied:
+        print(f"ocupación: {rows} noches ocupadas")
+    return 1 if report.rejected else 0
+
+
+async def geocode_command(args: argparse.Namespace) -> int:
+    try:
+        await create_tables()
+        estates = await geocode_missing(Estate.__table__, overwrite=args.overwrite)
+        experiences = await geocode_missing(Experiences.__table__, overwrite=args.overwrite)
+    finally:
+        await dispose_engine()
+    print(f"geocodificadas: {estates} fincas, {experiences} experiencias")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app", description="Triada Cafetera API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser(
+        "import",
+        help="Importar fincas, experiencias o usuarios desde CSV/NDJSON",
+        description="Importación masiva por lotes; los errores se reportan por fila sin abortar el lote."
+    )
+    importer.add_argument("entity", choices=sorted(IMPORT_SPECS), help="Tipo de registro a importar")
+    importer.add_argument("path", help="Archivo CSV (con encabezado) o NDJSON; '-' para stdin")
+    importer.add_argument("--format", choices=("csv", "ndjson"), help="Formato (por defecto según la extensión)")
+    importer.add_argument("--batch-size", type=int, default=1000, help="Filas por lote/transacción")
+    importer.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="Procesos para el hash de contraseñas de usuarios (0 = en el proceso principal)"
+    )
+    importer.add_argument("--errors", help="Archivo NDJSON para los errores por fila (por defecto stderr)")
+    importer.set_defaults(handler=import_command)
+
+    occupancy = commands.add_parser(
+        "rebuild-occupancy",
+        help="Reconstruir la tabla de ocupación desde las reservas",
+        description="Necesario si se escribieron reservas por fuera de la API."
+    )
+    occupancy.set_defaults(handler=rebuild_occupancy_command)
+
+    dates = commands.add_parser(
+        "migrate-booking-dates",
+        help="Convertir las fechas de reservas de texto libre a fechas",
+        description=(
+            "Normaliza start_date/end_date a ISO 8601, elimina el índice único antiguo sobre start_date "
+            "y en PostgreSQL convierte las columnas a date. Si hay reservas con fechas que no se pueden "
+            "interpretar, las reporta y no cambia nada."
+        )
+    )
+    dates.add_argument("--dry-run", action="store_true", help="Solo revisar y reportar, sin cambiar la base")
+    dates.add_argument("--errors", help="Archivo NDJSON para las reservas rechazadas (por defecto stderr)")
+    dates.set_defaults(handler=migrate_booking_dates_command)
+
+    geocode = commands.add_parser(
+        "geocode",
+        help="Asignar coordenadas desde el nomenclátor local de municipios",
+        description="Geocodifica las fincas y experiencias sin coordenadas según el municipio de su ubicación."
+    )
+    geocode.add_argument("--overwrite", action="store_true", help="Reemplazar también las coordenadas existentes")
+    geocode.set_defaults(handler=geocode_command)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return asyncio.run(args.handler(args))
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 2
@@ -1,12 +1,126 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
+from pathlib import Path
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Triada Cafetera API"
     DATABASE_URL: str = "sqlite+aiosqlite:///./triada_cafetera.db"
+    # Réplicas de solo lectura, separadas por comas (vacío = todo va al primario)
+    DATABASE_REPLICA_URLS: str = ""
+    # Segundos que un cliente lee del primario después de escribir
+    READ_YOUR_WRITES_SECONDS: float = 5.0
     SECRET_KEY: str = "clave_secreta_para_pruebas_cambiar_en_produccion"
     ALGORITHM: str = "HS256"
 
+    # Pool de conexiones
+    # DB_POOL_MODE: "queue" (pool propio) o "null" (sin pool, para PgBouncer u otro pooler externo)
+    DB_POOL_MODE: str = "queue"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_USE_LIFO: bool = False
+    # Endpoints /internal (métricas de pools, colas y cachés): desactivados por defecto y,
+    # si se activan, solo responden a clientes de loopback
+    INTERNAL_ENDPOINTS_ENABLED: bool = False
+
+    # Perfil de SQLite: "default" (solo foreign_keys=ON) o "production" (además WAL, mmap,
+    # caché y busy timeout). Las llaves foráneas están activas en los dos: los controladores
+    # validan con ellas que existan el usuario, la finca o el propietario referenciados
+    SQLITE_PROFILE: str = "default"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    # Negativo = tamaño en KiB (-64000 ≈ 64 MB de caché de páginas por conexión)
+    SQLITE_CACHE_SIZE: int = -64000
+    SQLITE_MMAP_SIZE: int = 268435456
+
+    # Escritor único con group commit (pensado para SQLite, que solo admite un escritor)
+    WRITE_COORDINATOR_ENABLED: bool = False
+    WRITE_COORDINATOR_MAX_BATCH: int = 64
+    WRITE_COORDINATOR_MAX_WAIT_MS: float = 2.0
+    WRITE_COORDINATOR_QUEUE_SIZE: int = 10000
+
+    # Instrumentación SQL por petición (cabecera Server-Timing)
+    SQL_INSTRUMENTATION_ENABLED: bool = True
+    # Presupuesto de sentencias por ruta: solo desarrollo/pruebas, la petición falla con 500 si se excede
+    QUERY_BUDGET_ENFORCED: bool = False
+    # Presupuesto de las rutas sin query_budget propio (0 = sin límite)
+    QUERY_BUDGET_DEFAULT: int = 0
+
+    # Log de consultas lentas (JSON por línea, archivo rotativo) con su plan de ejecución
+    SLOW_QUERY_LOG_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    SLOW_QUERY_EXPLAIN: bool = True
+    SLOW_QUERY_LOG_FILE: str = "logs/slow_queries.log"
+    SLOW_QUERY_LOG_MAX_BYTES: int = 10485760
+    SLOW_QUERY_LOG_BACKUP_COUNT: int = 5
+
+    # Exportaciones en streaming: filas por lote del cursor y nivel de compresión gzip
+    EXPORT_BATCH_SIZE: int = 1000
+    EXPORT_GZIP_LEVEL: int = 6
+
+    # Índice de disponibilidad en memoria; se recarga desde la base para ver las escrituras de otros procesos
+    AVAILABILITY_INDEX_ENABLED: bool = True
+    AVAILABILITY_INDEX_REFRESH_SECONDS: float = 300.0
+
+    # PostgreSQL: restricción de exclusión (btree_gist) que rechaza reservas cruzadas también
+    # para escrituras que no pasan por la API; se crea junto con la tabla bookings
+    BOOKING_EXCLUSION_CONSTRAINT: bool = False
+    # Noches máximas de una reserva: la ocupación escribe una fila por noche en la transacción
+    MAX_BOOKING_NIGHTS: int = 365
+
+    # Filtros por ubicación: vocabulario de ubicaciones en memoria (se recarga para ver otros
+    # procesos), similitud mínima de trigramas y máximo de ubicaciones por búsqueda
+    LOCATION_INDEX_TTL_SECONDS: float = 60.0
+    LOCATION_SIMILARITY_THRESHOLD: float = 0.45
+    LOCATION_MAX_MATCHES: int = 50
+
+    # Nomenclátor local (CSV municipio,departamento,latitud,longitud) para geocodificar ubicaciones
+    GAZETTEER_PATH: str = str(Path(__file__).resolve().parent / "data" / "municipios.csv")
+    # Radio máximo de las búsquedas por cercanía
+    NEARBY_MAX_RADIUS_KM: float = 500.0
+
+    # Facetas del listado de fincas: ancho de los rangos por defecto y caché por conjunto de filtros
+    # (se invalida con las escrituras de fincas de este worker; el vencimiento cubre las de otros procesos)
+    FACET_PRICE_STEP: int = 100000
+    FACET_SIZE_STEP: int = 10
+    FACET_MAX_LOCATIONS: int = 50
+    FACET_CACHE_SIZE: int = 256
+    FACET_CACHE_TTL_SECONDS: float = 30.0
+
+    # Caché de respuestas serializadas de fincas y experiencias (por ID y páginas del listado);
+    # los cuerpos desde GZIP_MIN_BYTES se guardan también comprimidos
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_SIZE: int = 1024
+    RESPONSE_CACHE_TTL_SECONDS: float = 30.0
+    RESPONSE_CACHE_GZIP_MIN_BYTES: int = 1024
+    RESPONSE_CACHE_GZIP_LEVEL: int = 6
+
+    # Caché del usuario autenticado (UserProfile por ID) de las dependencias de autenticación;
+    # se invalida con las escrituras de usuarios de este worker, el vencimiento cubre las de otros
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+
+    # Tokens con claims (activo, roles, generación): las dependencias require_claims_roles y
+    # require_active_claims autorizan sin cargar el usuario. La generación y el estado activo
+    # de cada usuario se guardan en memoria; TOKEN_STATE_TTL_SECONDS acota cuánto tarda un
+    # worker en ver una revocación hecha en otro
+    AUTH_CLAIMS_TOKENS: bool = False
+    TOKEN_STATE_CACHE_SIZE: int = 10000
+    TOKEN_STATE_TTL_SECONDS: float = 30.0
+
+    # Tokens JWT ya verificados (payload por resumen del token), hasta su exp; evita repetir
+    # la decodificación y la firma HMAC cuando un cliente reutiliza su token
+    TOKEN_VERIFY_CACHE_ENABLED: bool = True
+    TOKEN_VERIFY_CACHE_SIZE: int = 10000
+    TOKEN_VERIFY_CACHE_TTL_SECONDS: float = 300.0
+
+    # Pool de hilos para bcrypt (hash y verificación de contraseñas) fuera del event loop;
+    # con PASSWORD_HASH_MAX_PENDING hashes en curso o en espera, los siguientes reciben 429
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 16
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
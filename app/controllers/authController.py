@@ -1,10 +1,10 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert
 from sqlalchemy.exc import IntegrityError
 from typing import Optional, Dict, Any
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import jwt
+from jose import JWTError
 from datetime import datetime, timedelta
 
 from app.models.user import User
@@ -12,8 +12,13 @@ from app.schemas.auth import (
     LoginRequest, RegisterRequest, TokenData, UserProfile,
     PasswordResetRequest, PasswordResetConfirm, ChangePasswordRequest
 )
-from app.utils.auth import get_password_hash, verify_password, create_access_token, verify_token
+from app.utils.auth import create_access_token, verify_token
+from app.utils.password_hasher import password_hasher
 from app.config import settings
+from app.utils.write_coordinator import write_returning, save_changes
+from app.controllers.userController import user_integrity_error
+from app.utils.user_cache import resolve_user, forget_user
+from app.utils.token_claims import issue_access_token, is_revoked
 
 security = HTTPBearer()
 
@@ -24,41 +29,23 @@ class AuthController:
     async def register_user(self, user_data: RegisterRequest) -> Dict[str, Any]:
         """Registrar un nuevo usuario"""
         try:
-            # Verificar si el usuario ya existe
-            existing_user = await self._get_user_by_username(user_data.username)
-            if existing_user:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="El nombre de usuario ya existe"
-                )
-            
-            existing_email = await self._get_user_by_email(user_data.email)
-            if existing_email:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="El email ya está registrado"
-                )
-
-            # Crear el nuevo usuario
-            hashed_password = get_password_hash(user_data.password)
-            db_user = User(
-                username=user_data.username,
-                email=user_data.email,
-                full_name=user_data.full_name,
-                phone=user_data.phone,
-                hashed_password=hashed_password,
-                is_active=1
+            # Las restricciones UNIQUE de username y email validan los duplicados
+            hashed_password = await password_hasher.hash(user_data.password)
+            db_user = await write_returning(
+                self.db,
+                insert(User).values(
+                    username=user_data.username,
+                    email=user_data.email,
+                    full_name=user_data.full_name,
+                    phone=user_data.phone,
+                    hashed_password=hashed_password,
+                    is_active=1
+                ).returning(User)
             )
             
-            self.db.add(db_user)
-            await self.db.commit()
-            await self.db.refresh(db_user)
-            
             # Generar token de acceso
-            access_token_expires = timedelta(minutes=30)
-            access_token = create_access_token(
-                data={"sub": db_user.username, "user_id": db_user.id},
-                expires_delta=access_token_expires
+            access_token = await issue_access_token(
+                self.db, db_user.id, db_user.username, db_user.is_active, db_user.token_generation
             )
             
             return {
@@ -69,12 +56,9 @@ class AuthController:
                 "user": UserProfile.from_orm(db_user)
             }
             
-        except IntegrityError:
+        except IntegrityError as e:
             await self.db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Error de integridad en la base de datos"
-            )
+            raise user_integrity_error(e)
 
     async def login_user(self, login_data: LoginRequest) -> Dict[str, Any]:
         """Autenticar usuario y generar token"""
@@ -86,10 +70,8 @@ class AuthController:
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        access_token_expires = timedelta(minutes=30)
-        access_token = create_access_token(
-            data={"sub": user.username, "user_id": user.id},
-            expires_delta=access_token_expires
+        access_token = await issue_access_token(
+            self.db, user.id, user.username, user.is_active, user.token_generation
         )
         
         return {
@@ -120,10 +102,13 @@ class AuthController:
             if username is None or user_id is None:
                 raise credentials_exception
                 
-        except jwt.PyJWTError:
+        except JWTError:
             raise credentials_exception
         
-        user = await self._get_user_by_username(username)
+        if await is_revoked(self.db, payload):
+            raise credentials_exception
+        
+        user = await resolve_user(self.db, username, user_id)
         if user is None:
             raise credentials_exception
             
@@ -133,14 +118,12 @@ class AuthController:
                 detail="Usuario inactivo"
             )
         
-        return UserProfile.from_orm(user)
+        return user
 
     async def refresh_token(self, current_user: UserProfile) -> Dict[str, Any]:
         """Refrescar token de acceso"""
-        access_token_expires = timedelta(minutes=30)
-        access_token = create_access_token(
-            data={"sub": current_user.username, "user_id": current_user.id},
-            expires_delta=access_token_expires
+        access_token = await issue_access_token(
+            self.db, current_user.id, current_user.username, current_user.is_active == 1
         )
         
         return {
@@ -161,16 +144,19 @@ class AuthController:
             )
         
         # Verificar contraseña actual
-        if not verify_password(password_data.current_password, user.hashed_password):
+        if not await password_hasher.verify(password_data.current_password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="La contraseña actual es incorrecta"
             )
         
         # Actualizar contraseña
-        new_hashed_password = get_password_hash(password_data.new_password)
+        new_hashed_password = await password_hasher.hash(password_data.new_password)
         user.hashed_password = new_hashed_password
-        await self.db.commit()
+        # Revocar los tokens con claims emitidos con la contraseña anterior
+        user.token_generation = User.token_generation + 1
+        await save_changes(self.db, user)
+        forget_user(user.id)
         
         return {"message": "Contraseña actualizada exitosamente"}
 
@@ -229,13 +215,15 @@ class AuthController:
                 )
             
             # Actualizar contraseña
-            new_hashed_password = get_password_hash(reset_data.new_password)
+            new_hashed_password = await password_hasher.hash(reset_data.new_password)
             user.hashed_password = new_hashed_password
-            await self.db.commit()
+            user.token_generation = User.token_generation + 1
+            await save_changes(self.db, user)
+            forget_user(user.id)
             
             return {"message": "Contraseña restablecida exitosamente"}
             
-        except jwt.PyJWTError:
+        except JWTError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Token inválido o expirado"
@@ -266,8 +254,8 @@ class AuthController:
             if field in allowed_fields and value is not None:
                 setattr(user, field, value)
         
-        await self.db.commit()
-        await self.db.refresh(user)
+        await save_changes(self.db, user, refresh=True)
+        forget_user(user.id)
         
         return UserProfile.from_orm(user)
 
@@ -278,7 +266,7 @@ class AuthController:
         if not user:
             return None
         
-        if not verify_password(password, user.hashed_password):
+        if not await password_hasher.verify(password, user.hashed_password):
             return None
             
         if user.is_active != 1:
@@ -1,60 +1,81 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, delete, literal, union_all, or_, and_
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import Select
 from fastapi import HTTPException, status
-from typing import List, Optional
+from functools import partial
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.models.booking import Booking
 from app.models.user import User
 from app.models.estate import Estate
-from app.schemas.booking import BookingCreate, BookingUpdate, BookingResponse
+from app.config import settings
+from app.schemas.booking import (
+    check_date_range,
+    BookingCreate,
+    BookingUpdate,
+    BookingResponse,
+    BookingBulkItemResult,
+    BookingBulkCreateResponse,
+    BookingStatusResult,
+    BookingStatusBulkResponse
+)
+from app.database import read_only
+from app.utils.write_coordinator import write_returning, execute_write, write_transaction
+from app.utils.integrity import parse_integrity_error, FOREIGN_KEY, EXCLUSION
+from app.utils.pagination import Keyset
+from app.utils.availability import availability_index, occupies, EstateIntervals, INACTIVE_STATUSES
+from app.utils.booking_guard import (
+    lock_estates,
+    lock_booking_estates,
+    overlap_conditions,
+    capacity_exceeded,
+    capacity_detail,
+    exceeds_capacity,
+    BOOKING_CONFLICT_DETAIL
+)
+from app.utils.occupancy import write_occupancy
+
+# Campos que cambian las noches que ocupa una reserva
+OCCUPANCY_FIELDS = {"start_date", "end_date", "status"}
 
 
 class BookingController:
-    def __init__(self, db: Session):
+    keyset = Keyset(Booking.id, start_date=Booking.start_date)
+
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create_booking(self, booking_data: BookingCreate) -> BookingResponse:
-        """Crear una nueva reserva"""
+    async def create_booking(self, booking_data: BookingCreate) -> BookingResponse:
+        """Crear una nueva reserva si la finca está libre en esas noches"""
+        values = booking_data.model_dump()
         try:
-            # Verificar que el usuario existe
-            user_result = self.db.execute(select(User).where(User.id == booking_data.user_id))
-            user = user_result.scalar_one_or_none()
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Usuario con ID {booking_data.user_id} no encontrado"
-                )
-            
-            # Verificar que la finca existe
-            estate_result = self.db.execute(select(Estate).where(Estate.id == booking_data.estate_id))
-            estate = estate_result.scalar_one_or_none()
-            if not estate:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Finca con ID {booking_data.estate_id} no encontrada"
-                )
-            
-            new_booking = Booking(
-                start_date=booking_data.start_date,
-                end_date=booking_data.end_date,
-                status=booking_data.status,
-                num_persons=booking_data.num_persons,
-                user_id=booking_data.user_id,
-                estate_id=booking_data.estate_id
-            )
-            
-            self.db.add(new_booking)
-            self.db.commit()
-            self.db.refresh(new_booking)
+            # Las llaves foráneas validan que el usuario y la finca existan
+            if occupies(booking_data.status):
+                new_booking = await write_transaction(self.db, partial(self._insert_if_free, values))
+            else:
+                new_booking = await write_returning(self.db, insert(Booking).values(**values).returning(Booking))
+            if new_booking is None:
+                raise await self._rejection(booking_data.user_id, booking_data.estate_id, booking_data.num_persons)
+            availability_index.apply(new_booking)
             
             return BookingResponse.from_orm(new_booking)
             
         except HTTPException:
-            self.db.rollback()
+            await self.db.rollback()
             raise
         except IntegrityError as e:
-            self.db.rollback()
+            await self.db.rollback()
+            kind = parse_integrity_error(e)[0]
+            if kind == FOREIGN_KEY:
+                raise await self._missing_reference(booking_data.user_id, booking_data.estate_id)
+            if kind == EXCLUSION:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=BOOKING_CONFLICT_DETAIL
+                )
             error_msg = str(e.orig) if hasattr(e, 'orig') else str(e)
             if "UNIQUE constraint" in error_msg or "unique constraint" in error_msg.lower():
                 raise HTTPException(
@@ -66,15 +87,271 @@ class BookingController:
                 detail=f"Error de integridad al crear la reserva: {error_msg}"
             )
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error al crear la reserva: {str(e)}"
             )
+
+    @staticmethod
+    async def _insert_if_free(values: Dict[str, Any], session: AsyncSession) -> Optional[Booking]:
+        """
+        Con las reservas de la finca bloqueadas, INSERT ... SELECT ... WHERE NOT EXISTS:
+        la verificación de cruces y de capacidad y la inserción son una sola sentencia.
+        None si hay cruce o la finca no admite tantas personas. La ocupación por noche se
+        escribe en la misma transacción.
+        """
+        await lock_estates(session, [values["estate_id"]])
+        columns = list(values)
+        overlapping = select(Booking.id).where(
+            *overlap_conditions(Booking, values["estate_id"], values["start_date"], values["end_date"])
+        )
+        free = select(
+            *[literal(values[column], Booking.__table__.c[column].type) for column in columns]
+        ).where(~overlapping.exists(), ~capacity_exceeded(values["estate_id"], values["num_persons"]))
+        result = await session.execute(insert(Booking).from_select(columns, free).returning(Booking))
+        booking = result.scalar_one_or_none()
+        if booking is not None:
+            await write_occupancy(session, [booking], replace=False)
+        return booking
+
+    async def _rejection(self, user_id: int, estate_id: int, persons: int) -> HTTPException:
+        """
+        Por qué no se insertó una reserva activa, con una sola consulta: usuario o finca
+        inexistente (404; el INSERT ... SELECT no llega a las llaves foráneas si hay cruce),
+        capacidad de la finca (422) o cruce (409)
+        """
+        result = await self.db.execute(
+            select(
+                select(User.id).where(User.id == user_id).exists(),
+                select(Estate.id).where(Estate.id == estate_id).exists(),
+                select(Estate.capacity).where(Estate.id == estate_id).scalar_subquery()
+            )
+        )
+        user_exists, estate_exists, capacity = result.one()
+        missing = self._not_found(user_id, user_exists, estate_id, estate_exists)
+        if missing is not None:
+            return missing
+        if exceeds_capacity(capacity, persons):
+            return HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=capacity_detail(capacity)
+            )
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=BOOKING_CONFLICT_DETAIL
+        )
+
+    async def _missing_reference(self, user_id: Optional[int], estate_id: Optional[int]) -> HTTPException:
+        """Identificar qué llave foránea falló (SQLite no lo reporta) con una sola consulta"""
+        result = await self.db.execute(
+            select(
+                select(User.id).where(User.id == user_id).exists(),
+                select(Estate.id).where(Estate.id == estate_id).exists()
+            )
+        )
+        user_exists, estate_exists = result.one()
+        return self._not_found(user_id, user_exists, estate_id, estate_exists) or HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Error de integridad en la reserva"
+        )
+
+    @staticmethod
+    def _not_found(
+        user_id: Optional[int], user_exists: bool, estate_id: Optional[int], estate_exists: bool
+    ) -> Optional[HTTPException]:
+        """404 del usuario o de la finca que no existe; None si existen"""
+        if user_id is not None and not user_exists:
+            return HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Usuario con ID {user_id} no encontrado"
+            )
+        if estate_id is not None and not estate_exists:
+            return HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Finca con ID {estate_id} no encontrada"
+            )
+        return None
     
-    def get_booking_by_id(self, booking_id: int) -> Optional[BookingResponse]:
+    async def create_bookings_bulk(self, items: List[BookingCreate]) -> BookingBulkCreateResponse:
+        """
+        Crear varias reservas en una sola transacción.
+
+        Los usuarios y fincas referenciados (con la capacidad de cada finca) se verifican
+        con una sola consulta IN; los elementos con referencias inexistentes o con más
+        personas de las que admite la finca se reportan y el resto se inserta.
+        """
+        user_ids = {item.user_id for item in items}
+        estate_ids = {item.estate_id for item in items}
+        result = await self.db.execute(
+            union_all(
+                select(literal("user"), User.id, literal(None, Estate.capacity.type)).where(User.id.in_(user_ids)),
+                select(literal("estate"), Estate.id, Estate.capacity).where(Estate.id.in_(estate_ids))
+            )
+        )
+        rows = result.all()
+        found = {(kind, row_id) for kind, row_id, _ in rows}
+        capacities = {row_id: capacity for kind, row_id, capacity in rows if kind == "estate"}
+
+        results: List[Optional[BookingBulkItemResult]] = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            if ("user", item.user_id) not in found:
+                error = f"Usuario con ID {item.user_id} no encontrado"
+            elif ("estate", item.estate_id) not in found:
+                error = f"Finca con ID {item.estate_id} no encontrada"
+            elif occupies(item.status) and exceeds_capacity(capacities[item.estate_id], item.num_persons):
+                error = capacity_detail(capacities[item.estate_id])
+            else:
+                valid.append(index)
+                continue
+            results[index] = BookingBulkItemResult(index=index, ok=False, error=error)
+
+        created = 0
+        if valid:
+            try:
+                accepted, bookings = await write_transaction(
+                    self.db,
+                    partial(self._insert_free_batch, [items[index].model_dump() for index in valid])
+                )
+            except IntegrityError as e:
+                # Una referencia eliminada entre la verificación y el INSERT revierte todo el lote
+                await self.db.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Error de integridad al crear las reservas: {str(e.orig)}"
+                )
+            # Un solo INSERT multi-VALUES asigna los IDs en el orden de las filas, aunque
+            # RETURNING no garantice ese orden (sort_by_parameter_order haría un INSERT por fila en SQLite)
+            availability_index.apply_all(bookings)
+            for position, booking in zip(accepted, sorted(bookings, key=lambda booking: booking.id)):
+                index = valid[position]
+                results[index] = BookingBulkItemResult(
+                    index=index, ok=True, booking=BookingResponse.from_orm(booking)
+                )
+            for index in valid:
+                if results[index] is None:
+                    results[index] = BookingBulkItemResult(index=index, ok=False, error=BOOKING_CONFLICT_DETAIL)
+            created = len(bookings)
+
+        return BookingBulkCreateResponse(
+            created=created,
+            failed=len(items) - created,
+            results=results
+        )
+
+    @staticmethod
+    async def _insert_free_batch(
+        records: List[Dict[str, Any]], session: AsyncSession
+    ) -> Tuple[List[int], List[Booking]]:
+        """
+        Con las fincas del lote bloqueadas, traer en una consulta sus reservas activas en
+        el rango del lote e insertar solo los registros que no se cruzan con ellas ni con
+        los anteriores del mismo lote. Retorna las posiciones aceptadas y las filas insertadas.
+        """
+        active = [record for record in records if occupies(record["status"])]
+        intervals: Dict[int, EstateIntervals] = {}
+        if active:
+            estate_ids = {record["estate_id"] for record in active}
+            await lock_estates(session, estate_ids)
+            result = await session.execute(
+                select(Booking.id, Booking.estate_id, Booking.start_date, Booking.end_date).where(
+                    Booking.estate_id.in_(estate_ids),
+                    Booking.status.not_in(INACTIVE_STATUSES),
+                    Booking.start_date < max(record["end_date"] for record in active),
+                    Booking.end_date > min(record["start_date"] for record in active)
+                )
+            )
+            for booking_id, estate_id, start_date, end_date in result.all():
+                intervals.setdefault(estate_id, EstateIntervals()).add(
+                    booking_id, start_date.toordinal(), end_date.toordinal()
+                )
+
+        accepted = []
+        for position, record in enumerate(records):
+            if occupies(record["status"]):
+                first, last = record["start_date"].toordinal(), record["end_date"].toordinal()
+                estate_intervals = intervals.setdefault(record["estate_id"], EstateIntervals())
+                if estate_intervals.overlaps(first, last):
+                    continue
+                estate_intervals.add(0, first, last)
+            accepted.append(position)
+
+        if not accepted:
+            return [], []
+        result = await session.execute(
+            insert(Booking).returning(Booking), [records[position] for position in accepted]
+        )
+        bookings = result.scalars().all()
+        await write_occupancy(session, bookings, replace=False)
+        return accepted, bookings
+
+    async def update_bookings_status(self, booking_ids: List[int], new_status: str) -> BookingStatusBulkResponse:
+        """Cambiar el estado de varias reservas con un solo UPDATE ... WHERE id IN (...)"""
+        try:
+            bookings = await write_transaction(self.db, partial(self._update_status, set(booking_ids), new_status))
+        except Exception as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Error al actualizar las reservas: {str(e)}"
+            )
+        availability_index.apply_all(bookings)
+        updated_ids = {booking.id for booking in bookings}
+
+        # Las que no se actualizaron: no existen, quedarían cruzadas con otra reserva o
+        # tienen más personas de las que admite la finca
+        errors: Dict[int, str] = {}
+        missing = set(booking_ids) - updated_ids
+        if missing and occupies(new_status):
+            result = await self.db.execute(
+                select(Booking.id, Booking.num_persons, Estate.capacity)
+                .outerjoin(Estate, Estate.id == Booking.estate_id)
+                .where(Booking.id.in_(missing))
+            )
+            errors = {
+                booking_id: capacity_detail(capacity) if exceeds_capacity(capacity, persons) else BOOKING_CONFLICT_DETAIL
+                for booking_id, persons, capacity in result.all()
+            }
+
+        results = [
+            BookingStatusResult(id=booking_id, ok=True)
+            if booking_id in updated_ids
+            else BookingStatusResult(id=booking_id, ok=False, error=errors.get(booking_id, "Reserva no encontrada"))
+            for booking_id in booking_ids
+        ]
+        updated = sum(1 for result in results if result.ok)
+        return BookingStatusBulkResponse(updated=updated, failed=len(results) - updated, results=results)
+
+    @staticmethod
+    async def _update_status(booking_ids: set, new_status: str, session: AsyncSession) -> List[Booking]:
+        """
+        Cambiar el estado y la ocupación de las reservas. Al activar, solo se reactivan las
+        que no se cruzan con otra activa y caben en la finca; si dos canceladas del mismo
+        pedido se cruzan entre sí, ninguna se reactiva.
+        """
+        stmt = update(Booking).where(Booking.id.in_(booking_ids))
+        if occupies(new_status):
+            await lock_booking_estates(session, booking_ids)
+            other = aliased(Booking)
+            conflict = select(other.id).where(
+                other.id != Booking.id,
+                other.estate_id == Booking.estate_id,
+                other.start_date < Booking.end_date,
+                other.end_date > Booking.start_date,
+                or_(other.status.not_in(INACTIVE_STATUSES), other.id.in_(booking_ids))
+            ).exists()
+            fits = ~capacity_exceeded(Booking.estate_id, Booking.num_persons)
+            stmt = stmt.where(or_(Booking.status.not_in(INACTIVE_STATUSES), and_(~conflict, fits)))
+        result = await session.execute(stmt.values(status=new_status).returning(Booking))
+        bookings = result.scalars().all()
+        await write_occupancy(session, bookings)
+        return bookings
+
+    @read_only
+    async def get_booking_by_id(self, booking_id: int) -> Optional[BookingResponse]:
         """Obtener una reserva por ID"""
-        result = self.db.execute(select(Booking).where(Booking.id == booking_id))
+        result = await self.db.execute(select(Booking).where(Booking.id == booking_id))
         booking = result.scalar_one_or_none()
         
         if not booking:
@@ -82,103 +359,216 @@ class BookingController:
             
         return BookingResponse.from_orm(booking)
     
-    def get_all_bookings(
+    @read_only
+    async def get_booking_version(self, booking_id: int) -> Optional[int]:
+        """Versión de la reserva sin cargar la fila (peticiones condicionales)"""
+        result = await self.db.execute(select(Booking.version).where(Booking.id == booking_id))
+        return result.scalar_one_or_none()
+
+    @read_only
+    async def get_all_bookings(
         self, 
         skip: int = 0, 
         limit: int = 100,
         user_id: Optional[int] = None,
         estate_id: Optional[int] = None,
-        status_filter: Optional[str] = None
+        status_filter: Optional[str] = None,
+        sort: str = "id",
+        cursor: Optional[str] = None
     ) -> List[BookingResponse]:
         """Obtener todas las reservas con filtros opcionales"""
         try:
-            stmt = select(Booking)
-            
-            # Aplicar filtros si se proporcionan
-            if user_id:
-                stmt = stmt.where(Booking.user_id == user_id)
-            if estate_id:
-                stmt = stmt.where(Booking.estate_id == estate_id)
-            if status_filter:
-                stmt = stmt.where(Booking.status == status_filter)
-            
-            stmt = stmt.offset(skip).limit(limit)
+            stmt = self._apply_filters(select(Booking), user_id, estate_id, status_filter)
+            stmt = self.keyset.apply(stmt, sort, cursor, skip, limit)
             
-            result = self.db.execute(stmt)
+            result = await self.db.execute(stmt)
             bookings = result.scalars().all()
             
             return [BookingResponse.from_orm(booking) for booking in bookings]
             
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al obtener las reservas: {str(e)}"
             )
     
-    def update_booking(
+    def export_query(
+        self,
+        user_id: Optional[int] = None,
+        estate_id: Optional[int] = None,
+        status_filter: Optional[str] = None
+    ) -> Select:
+        """Consulta de exportación: columnas de BookingResponse, mismos filtros que el listado"""
+        stmt = select(*[Booking.__table__.c[name] for name in BookingResponse.model_fields])
+        return self._apply_filters(stmt, user_id, estate_id, status_filter).order_by(Booking.id)
+
+    @staticmethod
+    def _apply_filters(
+        stmt: Select,
+        user_id: Optional[int] = None,
+        estate_id: Optional[int] = None,
+        status_filter: Optional[str] = None
+    ) -> Select:
+        """Aplicar los filtros opcionales del listado"""
+        if user_id:
+            stmt = stmt.where(Booking.user_id == user_id)
+        if estate_id:
+            stmt = stmt.where(Booking.estate_id == estate_id)
+        if status_filter:
+            stmt = stmt.where(Booking.status == status_filter)
+        return stmt
+
+    async def update_booking(
         self, 
         booking_id: int, 
         booking_update: BookingUpdate
     ) -> Optional[BookingResponse]:
         """Actualizar una reserva existente"""
-        # Verificar si la reserva existe
-        existing_booking = self.get_booking_by_id(booking_id)
-        if not existing_booking:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Reserva no encontrada"
-            )
-        
         # Actualizar solo los campos que se proporcionaron
         update_data = booking_update.model_dump(exclude_unset=True)
         
+        checked = bool(OCCUPANCY_FIELDS & update_data.keys()) and occupies(update_data.get("status"))
+        # Más personas, o reactivar la reserva, debe caber en la capacidad de la finca
+        capacity_checked = bool({"num_persons", "status"} & update_data.keys()) and occupies(update_data.get("status"))
+        # Con una sola fecha, el esquema no puede validar la estadía: la valida el UPDATE
+        length_checked = len({"start_date", "end_date"} & update_data.keys()) == 1
+        
         try:
-            self.db.execute(
-                update(Booking).where(Booking.id == booking_id).values(**update_data)
-            )
-            self.db.commit()
+            if update_data:
+                booking = await write_transaction(
+                    self.db, partial(self._update_booking, booking_id, update_data, checked, capacity_checked)
+                )
+            else:
+                booking = await self.get_booking_by_id(booking_id)
+
+            if not booking and (checked or capacity_checked or length_checked):
+                result = await self.db.execute(
+                    select(Booking.start_date, Booking.end_date, Booking.num_persons, Estate.capacity)
+                    .outerjoin(Estate, Estate.id == Booking.estate_id)
+                    .where(Booking.id == booking_id)
+                )
+                row = result.first()
+                if row is not None:
+                    try:
+                        check_date_range(
+                            update_data.get("start_date", row.start_date), update_data.get("end_date", row.end_date)
+                        )
+                    except ValueError as e:
+                        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+                    persons = update_data.get("num_persons", row.num_persons)
+                    if capacity_checked and exceeds_capacity(row.capacity, persons):
+                        raise HTTPException(
+                            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=capacity_detail(row.capacity)
+                        )
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail=BOOKING_CONFLICT_DETAIL
+                    )
+            if not booking:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Reserva no encontrada"
+                )
+            if update_data:
+                availability_index.apply(booking)
             
-            # Retornar la reserva actualizada
-            return self.get_booking_by_id(booking_id)
+            return BookingResponse.from_orm(booking)
             
+        except HTTPException:
+            raise
         except IntegrityError as e:
-            self.db.rollback()
+            await self.db.rollback()
+            if parse_integrity_error(e)[0] == EXCLUSION:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=BOOKING_CONFLICT_DETAIL
+                )
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error de integridad al actualizar la reserva: {str(e)}"
             )
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error al actualizar la reserva: {str(e)}"
             )
     
-    def delete_booking(self, booking_id: int) -> bool:
+    @staticmethod
+    async def _update_booking(
+        booking_id: int, update_data: Dict[str, Any], checked: bool, capacity_checked: bool, session: AsyncSession
+    ) -> Optional[Booking]:
+        """
+        Actualizar la reserva y su ocupación. Con `checked`, el UPDATE se condiciona a que
+        las noches resultantes no se crucen con otra reserva activa de la misma finca (una
+        reserva cancelada que solo cambia fechas no se verifica); con `capacity_checked`, a
+        que las personas resultantes quepan en la finca (igual, salvo si sigue cancelada).
+        Si cambia una sola fecha, la estadía resultante debe durar entre una noche y
+        MAX_BOOKING_NIGHTS. None si la reserva no existe, hay cruce, no cabe o la estadía
+        no es válida.
+        """
+        stmt = update(Booking).where(Booking.id == booking_id)
+        stay = timedelta(days=settings.MAX_BOOKING_NIGHTS)
+        if update_data.get("start_date") is not None and "end_date" not in update_data:
+            start = update_data["start_date"]
+            latest = date.max if date.max - start < stay else start + stay
+            stmt = stmt.where(Booking.end_date > start, Booking.end_date <= latest)
+        elif update_data.get("end_date") is not None and "start_date" not in update_data:
+            end = update_data["end_date"]
+            earliest = date.min if end - date.min < stay else end - stay
+            stmt = stmt.where(Booking.start_date < end, Booking.start_date >= earliest)
+        if capacity_checked:
+            fits = ~capacity_exceeded(Booking.estate_id, update_data.get("num_persons", Booking.num_persons))
+            stmt = stmt.where(fits if "status" in update_data else or_(Booking.status.in_(INACTIVE_STATUSES), fits))
+        if checked:
+            await lock_booking_estates(session, [booking_id])
+            other = aliased(Booking)
+            conflict = select(other.id).where(
+                other.id != Booking.id,
+                *overlap_conditions(
+                    other,
+                    Booking.estate_id,
+                    update_data.get("start_date", Booking.start_date),
+                    update_data.get("end_date", Booking.end_date)
+                )
+            ).exists()
+            stmt = stmt.where(~conflict if "status" in update_data else or_(Booking.status.in_(INACTIVE_STATUSES), ~conflict))
+        result = await session.execute(stmt.values(**update_data).returning(Booking))
+        booking = result.scalar_one_or_none()
+        if booking is not None:
+            await write_occupancy(session, [booking])
+        return booking
+
+    async def delete_booking(self, booking_id: int) -> bool:
         """Eliminar una reserva"""
-        existing_booking = self.get_booking_by_id(booking_id)
-        if not existing_booking:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Reserva no encontrada"
-            )
-        
         try:
-            self.db.execute(delete(Booking).where(Booking.id == booking_id))
-            self.db.commit()
+            deleted = await execute_write(self.db, delete(Booking).where(Booking.id == booking_id))
+            if not deleted:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Reserva no encontrada"
+                )
+            availability_index.discard(booking_id)
             return True
             
+        except HTTPException:
+            raise
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error al eliminar la reserva: {str(e)}"
             )
     
-    def get_bookings_by_user(self, user_id: int) -> List[BookingResponse]:
+    @read_only
+    async def get_bookings_by_user(self, user_id: int) -> List[BookingResponse]:
         """Obtener todas las reservas de un usuario específico"""
-        return self.get_all_bookings(user_id=user_id, skip=0, limit=1000)
+        return await self.get_all_bookings(user_id=user_id, skip=0, limit=1000)
     
-    def get_bookings_by_estate(self, estate_id: int) -> List[BookingResponse]:
+    @read_only
+    async def get_bookings_by_estate(self, estate_id: int) -> List[BookingResponse]:
         """Obtener todas las reservas de una finca específica"""
-        return self.get_all_bookings(estate_id=estate_id, skip=0, limit=1000)
+        return await self.get_all_bookings(estate_id=estate_id, skip=0, limit=1000)
@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
@@ -7,21 +7,27 @@ from fastapi import HTTPException, status
 from app.models.client import Client
 from app.models.user import User
 from app.schemas.client import ClientCreate, ClientUpdate, ClientResponse
-from app.utils.auth import get_password_hash
+from app.utils.password_hasher import password_hasher
+from app.database import read_only
+from app.utils.write_coordinator import save_new, save_changes
+from app.utils.pagination import Keyset
+from app.utils.user_cache import forget_user
 
 class ClientController:
-    def __init__(self, db: Session):
+    keyset = Keyset(Client.id_client)
+
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create_client(self, client_data: ClientCreate) -> ClientResponse:
+    async def create_client(self, client_data: ClientCreate) -> ClientResponse:
         """Crear un nuevo cliente"""
         try:
             # Verificar si el usuario ya existe
-            result = self.db.execute(select(User).where(User.username == client_data.username))
+            result = await self.db.execute(select(User).where(User.username == client_data.username))
             existing_user = result.scalar_one_or_none()
             if existing_user:
                 # Verificar si ese User es un Client
-                result_client = self.db.execute(select(Client).where(Client.id_client == existing_user.id))
+                result_client = await self.db.execute(select(Client).where(Client.id_client == existing_user.id))
                 existing_client = result_client.scalar_one_or_none()
                 if existing_client:
                     raise HTTPException(
@@ -35,7 +41,7 @@ class ClientController:
                     )
             
             # Verificar si el email ya existe
-            result = self.db.execute(select(User).where(User.email == client_data.email))
+            result = await self.db.execute(select(User).where(User.email == client_data.email))
             existing_email = result.scalar_one_or_none()
             if existing_email:
                 raise HTTPException(
@@ -44,7 +50,7 @@ class ClientController:
                 )
 
             # Crear el cliente directamente (Client hereda de User, así que tiene todos los campos)
-            hashed_password = get_password_hash(client_data.password)
+            hashed_password = await password_hasher.hash(client_data.password)
             db_client = Client(
                 username=client_data.username,
                 email=client_data.email,
@@ -54,9 +60,7 @@ class ClientController:
                 is_active=True
             )
             
-            self.db.add(db_client)
-            self.db.commit()
-            self.db.refresh(db_client)
+            db_client = await save_new(self.db, db_client)
             
             return ClientResponse(
                 id_client=db_client.id_client,
@@ -68,16 +72,17 @@ class ClientController:
             )
             
         except IntegrityError as e:
-            self.db.rollback()
+            await self.db.rollback()
             error_msg = str(e.orig) if hasattr(e, 'orig') else str(e)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error de integridad en la base de datos: {error_msg}"
             )
 
-    def get_client_by_id(self, client_id: int) -> Optional[ClientResponse]:
+    @read_only
+    async def get_client_by_id(self, client_id: int) -> Optional[ClientResponse]:
         """Obtener cliente por ID"""
-        result = self.db.execute(
+        result = await self.db.execute(
             select(Client).where(Client.id_client == client_id)
         )
         client = result.scalar_one_or_none()
@@ -94,10 +99,11 @@ class ClientController:
             is_active=client.is_active
         )
 
-    def get_all_clients(self, skip: int = 0, limit: int = 100) -> List[ClientResponse]:
+    @read_only
+    async def get_all_clients(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[ClientResponse]:
         """Obtener todos los clientes con paginación"""
-        result = self.db.execute(
-            select(Client).offset(skip).limit(limit)
+        result = await self.db.execute(
+            self.keyset.apply(select(Client), cursor=cursor, skip=skip, limit=limit)
         )
         clients = result.scalars().all()
         
@@ -113,10 +119,10 @@ class ClientController:
             for client in clients
         ]
 
-    def update_client(self, client_id: int, client_data: ClientUpdate) -> Optional[ClientResponse]:
+    async def update_client(self, client_id: int, client_data: ClientUpdate) -> Optional[ClientResponse]:
         """Actualizar cliente"""
         # Verificar si el cliente existe
-        result = self.db.execute(
+        result = await self.db.execute(
             select(Client).where(Client.id_client == client_id)
         )
         client = result.scalar_one_or_none()
@@ -131,13 +137,16 @@ class ClientController:
         update_data = client_data.model_dump(exclude_unset=True)
         
         if "password" in update_data:
-            update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+            update_data["hashed_password"] = await password_hasher.hash(update_data.pop("password"))
         
         for field, value in update_data.items():
             setattr(client, field, value)
+        # Cambios de contraseña o nombre de usuario revocan los tokens con claims
+        if {"hashed_password", "username"} & update_data.keys():
+            client.token_generation = User.token_generation + 1
         
-        self.db.commit()
-        self.db.refresh(client)
+        await save_changes(self.db, client, refresh=True)
+        forget_user(client.id_client)
         
         return ClientResponse(
             id_client=client.id_client,
@@ -148,9 +157,9 @@ class ClientController:
             is_active=client.is_active
         )
 
-    def delete_client(self, client_id: int) -> bool:
+    async def delete_client(self, client_id: int) -> bool:
         """Eliminar cliente (soft delete - marcar como inactivo)"""
-        result = self.db.execute(
+        result = await self.db.execute(
             select(Client).where(Client.id_client == client_id)
         )
         client = result.scalar_one_or_none()
@@ -163,5 +172,7 @@ class ClientController:
         
         # Soft delete - marcar como inactivo
         client.is_active = False
-        self.db.commit()
+        client.token_generation = User.token_generation + 1
+        await save_changes(self.db, client)
+        forget_user(client.id_client)
         return True
@@ -1,52 +1,91 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, delete, or_, and_, func, literal, null, union_all
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import Select
 from typing import List, Optional
+import math
+from datetime import date
 from fastapi import HTTPException, status
 
 from app.models.estate import Estate
-from app.schemas.estate import EstateCreate, EstateUpdate, EstateResponse
+from app.models.booking import Booking
+from app.models.occupancy import EstateOccupancy
+from app.schemas.estate import (
+    EstateCreate,
+    EstateUpdate,
+    EstateResponse,
+    EstateNearbyResponse,
+    EstateFacetsResponse,
+    FacetBucket,
+    LocationFacet,
+    EstateCalendarDay,
+    EstateCalendarResponse
+)
+from app.config import settings
+from app.database import read_only
+from app.utils.write_coordinator import write_returning, execute_write
+from app.utils.integrity import violates, UNIQUE
+from app.utils.pagination import Keyset
+from app.utils.availability import availability_index
+from app.utils.booking_guard import overlap_conditions
+from app.utils.locations import LocationIndex, normalize_location
+from app.utils.geo import Box, bounding_box, coordinates_for, nearest
+from app.utils.cache import TTLCache
+from app.utils.response_cache import ResponseCache
+
+# Días máximos de un calendario (dos años)
+CALENDAR_MAX_DAYS = 731
 
 class EstateController:
-    def __init__(self, db: Session):
+    keyset = Keyset(Estate.id, price=Estate.price)
+    locations = LocationIndex(Estate.location_key)
+    facets_cache = TTLCache(settings.FACET_CACHE_SIZE, settings.FACET_CACHE_TTL_SECONDS)
+    responses = ResponseCache(EstateResponse)
+
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create_estate(self, estate_data: EstateCreate) -> EstateResponse:
+    async def create_estate(self, estate_data: EstateCreate) -> EstateResponse:
         """Crear una nueva finca"""
+        latitude, longitude = coordinates_for(estate_data.location, estate_data.latitude, estate_data.longitude)
         try:
-            # Verificar si el nombre de la finca ya existe
-            existing_estate = self.get_estate_by_name(estate_data.name)
-            if existing_estate:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Ya existe una finca con ese nombre"
-                )
-            
-            # Crear la nueva finca
-            db_estate = Estate(
-                name=estate_data.name,
-                location=estate_data.location,
-                size=estate_data.size,
-                price=estate_data.price,
-                owner_id=estate_data.owner_id
+            # La restricción UNIQUE de name valida que el nombre no exista
+            db_estate = await write_returning(
+                self.db,
+                insert(Estate).values(
+                    name=estate_data.name,
+                    location=estate_data.location,
+                    size=estate_data.size,
+                    price=estate_data.price,
+                    capacity=estate_data.capacity,
+                    latitude=latitude,
+                    longitude=longitude,
+                    owner_id=estate_data.owner_id
+                ).returning(Estate)
             )
-            
-            self.db.add(db_estate)
-            self.db.commit()
-            self.db.refresh(db_estate)
+            availability_index.apply_estate(db_estate)
+            self.locations.add(db_estate.location)
+            self.facets_cache.clear()
+            self.responses.invalidate()
             
             return EstateResponse.from_orm(db_estate)
             
         except IntegrityError as e:
-            self.db.rollback()
+            await self.db.rollback()
+            if violates(e, UNIQUE, "name"):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Ya existe una finca con ese nombre"
+                )
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error de integridad en la base de datos: {str(e)}"
             )
 
-    def get_estate_by_id(self, estate_id: int) -> Optional[EstateResponse]:
+    @read_only
+    async def get_estate_by_id(self, estate_id: int) -> Optional[EstateResponse]:
         """Obtener finca por ID"""
-        result = self.db.execute(select(Estate).where(Estate.id == estate_id))
+        result = await self.db.execute(select(Estate).where(Estate.id == estate_id))
         estate = result.scalar_one_or_none()
         
         if not estate:
@@ -54,87 +93,377 @@ class EstateController:
             
         return EstateResponse.from_orm(estate)
 
-    def get_estate_by_name(self, name: str) -> Optional[Estate]:
+    @read_only
+    async def get_estate_version(self, estate_id: int) -> Optional[int]:
+        """Versión de la finca sin cargar la fila (peticiones condicionales)"""
+        result = await self.db.execute(select(Estate.version).where(Estate.id == estate_id))
+        return result.scalar_one_or_none()
+
+    async def get_estate_by_name(self, name: str) -> Optional[Estate]:
         """Obtener finca por nombre (modelo de BD)"""
-        result = self.db.execute(select(Estate).where(Estate.name == name))
+        result = await self.db.execute(select(Estate).where(Estate.name == name))
         return result.scalar_one_or_none()
 
-    def get_all_estates(
+    @read_only
+    async def get_all_estates(
         self, 
         skip: int = 0, 
         limit: int = 100,
         owner_id: Optional[int] = None,
         min_price: Optional[int] = None,
-        max_price: Optional[int] = None
+        max_price: Optional[int] = None,
+        sort: str = "id",
+        cursor: Optional[str] = None,
+        location: Optional[str] = None
     ) -> List[EstateResponse]:
         """Obtener todas las fincas con paginación y filtros opcionales"""
-        stmt = select(Estate)
-        
-        # Aplicar filtros si se proporcionan
-        if owner_id:
-            stmt = stmt.where(Estate.owner_id == owner_id)
-        if min_price is not None:
-            stmt = stmt.where(Estate.price >= min_price)
-        if max_price is not None:
-            stmt = stmt.where(Estate.price <= max_price)
-        
-        stmt = stmt.offset(skip).limit(limit)
-        result = self.db.execute(stmt)
+        location_keys = await self.locations.keys(self.db, location) if location else None
+        if location_keys == []:
+            return []
+        stmt = self._apply_filters(select(Estate), owner_id, min_price, max_price, location_keys)
+        stmt = self.keyset.apply(stmt, sort, cursor, skip, limit)
+        result = await self.db.execute(stmt)
         estates = result.scalars().all()
         
         return [EstateResponse.from_orm(estate) for estate in estates]
 
-    def update_estate(self, estate_id: int, estate_data: EstateUpdate) -> Optional[EstateResponse]:
-        """Actualizar finca"""
-        # Verificar si la finca existe
-        existing_estate = self.get_estate_by_id(estate_id)
-        if not existing_estate:
+    @read_only
+    async def get_facets(
+        self,
+        owner_id: Optional[int] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        location: Optional[str] = None,
+        price_step: Optional[int] = None,
+        size_step: Optional[int] = None
+    ) -> EstateFacetsResponse:
+        """
+        Histograma de precios, fincas por rango de tamaño y por ubicación para los filtros
+        del listado. Una sola consulta: los tres GROUP BY sobre las fincas filtradas (CTE)
+        unidos con UNION ALL. El resultado queda en caché por conjunto de filtros.
+        """
+        price_step = price_step or settings.FACET_PRICE_STEP
+        size_step = size_step or settings.FACET_SIZE_STEP
+        location_keys = await self.locations.keys(self.db, location) if location else None
+        cache_key = (
+            owner_id or None, min_price, max_price,
+            tuple(location_keys) if location_keys is not None else None,
+            price_step, size_step
+        )
+        cached = self.facets_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        facets = EstateFacetsResponse(total=0, price=[], size=[], locations=[])
+        if location_keys != []:
+            facets = await self._compute_facets(owner_id, min_price, max_price, location_keys, price_step, size_step)
+        self.facets_cache.set(cache_key, facets)
+        return facets
+
+    async def _compute_facets(
+        self,
+        owner_id: Optional[int],
+        min_price: Optional[int],
+        max_price: Optional[int],
+        location_keys: Optional[List[str]],
+        price_step: int,
+        size_step: int
+    ) -> EstateFacetsResponse:
+        filtered = self._apply_filters(
+            select(Estate.price, Estate.size, Estate.location_key, Estate.location),
+            owner_id, min_price, max_price, location_keys
+        ).cte("filtered")
+        price_bucket = filtered.c.price // price_step
+        size_bucket = filtered.c.size // size_step
+        stmt = union_all(
+            select(
+                literal("price").label("facet"), price_bucket.label("bucket"),
+                null().label("location_key"), null().label("location"), func.count().label("count")
+            ).select_from(filtered).group_by(price_bucket),
+            select(
+                literal("size"), size_bucket, null(), null(), func.count()
+            ).select_from(filtered).group_by(size_bucket),
+            select(
+                literal("location"), null(), filtered.c.location_key, func.min(filtered.c.location), func.count()
+            ).select_from(filtered).where(filtered.c.location_key.is_not(None)).group_by(filtered.c.location_key)
+        )
+        result = await self.db.execute(stmt)
+
+        total, price, size, locations = 0, [], [], []
+        for facet, bucket, location_key, location, count in result.all():
+            if facet == "price":
+                # Cada finca cae en exactamente un grupo de precio (también las sin precio)
+                total += count
+                if bucket is not None:
+                    price.append(FacetBucket(start=bucket * price_step, end=(bucket + 1) * price_step, count=count))
+            elif facet == "size":
+                if bucket is not None:
+                    size.append(FacetBucket(start=bucket * size_step, end=(bucket + 1) * size_step, count=count))
+            else:
+                locations.append(LocationFacet(location=location, location_key=location_key, count=count))
+
+        price.sort(key=lambda item: item.start)
+        size.sort(key=lambda item: item.start)
+        locations.sort(key=lambda item: (-item.count, item.location_key))
+        return EstateFacetsResponse(
+            total=total, price=price, size=size, locations=locations[:settings.FACET_MAX_LOCATIONS]
+        )
+
+    @read_only
+    async def get_available_estates(
+        self,
+        start: date,
+        end: date,
+        persons: int = 1,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[EstateResponse]:
+        """
+        Fincas sin reservas activas en las noches [start, end) y con capacidad para `persons`.
+
+        Con el índice en memoria cargado, la base solo trae las fincas de la página;
+        si no, el cruce de fechas se resuelve en SQL.
+        """
+        if end <= start:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La fecha de fin debe ser posterior a la fecha de inicio"
+            )
+        if availability_index.loaded:
+            page = availability_index.free_estates(start, end, persons, min_price, max_price, skip, limit)
+            if not page:
+                return []
+            stmt = select(Estate).where(Estate.id.in_(page)).order_by(Estate.id)
+        else:
+            conditions = [or_(Estate.capacity.is_(None), Estate.capacity >= persons)]
+            if min_price is not None:
+                conditions.append(Estate.price >= min_price)
+            if max_price is not None:
+                conditions.append(Estate.price <= max_price)
+            overlapping = select(Booking.id).where(*overlap_conditions(Booking, Estate.id, start, end)).exists()
+            stmt = select(Estate).where(*conditions, ~overlapping).order_by(Estate.id).offset(skip).limit(limit)
+
+        result = await self.db.execute(stmt)
+        return [EstateResponse.from_orm(estate) for estate in result.scalars().all()]
+
+    @read_only
+    async def get_nearby_estates(
+        self, lat: float, lon: float, radius_km: float, skip: int = 0, limit: int = 100
+    ) -> List[EstateNearbyResponse]:
+        """Fincas a `radius_km` o menos de (lat, lon), de la más cercana a la más lejana"""
+        return await self._nearest(bounding_box(lat, lon, radius_km), lat, lon, radius_km, skip, limit)
+
+    @read_only
+    async def get_estates_in_box(
+        self,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[EstateNearbyResponse]:
+        """Fincas dentro de la caja, ordenadas por distancia a (lat, lon) o, si no viene, al centro de la caja"""
+        if min_lat > max_lat or min_lon > max_lon:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La caja debe cumplir min_lat <= max_lat y min_lon <= max_lon"
+            )
+        if lat is None or lon is None:
+            lat, lon = (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+        return await self._nearest((min_lat, max_lat, min_lon, max_lon), lat, lon, None, skip, limit)
+
+    async def _nearest(
+        self, box: Box, lat: float, lon: float, radius_km: Optional[float], skip: int, limit: int
+    ) -> List[EstateNearbyResponse]:
+        """Una consulta: la página de IDs sale del índice espacial ordenada por distancia y se une con las fincas"""
+        page = (
+            nearest(
+                self.db.get_bind().dialect.name, "estates", Estate.id, Estate.latitude, Estate.longitude,
+                box, lat, lon, radius_km
+            )
+            .order_by("distance", "id")
+            .offset(skip)
+            .limit(limit)
+            .subquery()
+        )
+        result = await self.db.execute(
+            select(Estate, page.c.distance).join(page, page.c.id == Estate.id).order_by(page.c.distance, Estate.id)
+        )
+        estates = []
+        for estate, distance_km_sq in result.all():
+            item = EstateNearbyResponse.from_orm(estate)
+            item.distance_km = round(math.sqrt(distance_km_sq), 3)
+            estates.append(item)
+        return estates
+
+    @read_only
+    async def get_calendar(self, estate_id: int, start: date, end: date) -> EstateCalendarResponse:
+        """
+        Noches ocupadas de la finca entre `start` y `end` (inclusive), desde la tabla de
+        ocupación: la finca por llave primaria y sus noches con un recorrido de rango
+        sobre (estate_id, day), en una sola consulta.
+        """
+        if end < start:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La fecha final debe ser igual o posterior a la inicial"
+            )
+        if (end - start).days >= CALENDAR_MAX_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"El calendario admite como máximo {CALENDAR_MAX_DAYS} días"
+            )
+
+        result = await self.db.execute(
+            select(
+                Estate.capacity,
+                EstateOccupancy.day,
+                EstateOccupancy.persons,
+                EstateOccupancy.status,
+                EstateOccupancy.booking_id
+            )
+            .outerjoin(
+                EstateOccupancy,
+                and_(
+                    EstateOccupancy.estate_id == Estate.id,
+                    EstateOccupancy.day >= start,
+                    EstateOccupancy.day <= end
+                )
+            )
+            .where(Estate.id == estate_id)
+            .order_by(EstateOccupancy.day)
+        )
+        rows = result.all()
+        if not rows:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Finca no encontrada"
             )
 
-        # Si se intenta cambiar el nombre, verificar que no exista otra finca con ese nombre
+        return EstateCalendarResponse(
+            estate_id=estate_id,
+            start=start,
+            end=end,
+            capacity=rows[0].capacity,
+            days=[
+                EstateCalendarDay(day=row.day, persons=row.persons, status=row.status, booking_id=row.booking_id)
+                for row in rows
+                if row.day is not None
+            ]
+        )
+
+    @read_only
+    async def match_locations(self, location: str) -> List[str]:
+        """Ubicaciones normalizadas que coinciden con `location` (sin tildes, parcial o con errores de escritura)"""
+        return await self.locations.keys(self.db, location)
+
+    def export_query(
+        self,
+        owner_id: Optional[int] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        location_keys: Optional[List[str]] = None
+    ) -> Select:
+        """
+        Consulta de exportación: columnas de EstateResponse, mismos filtros que el listado.
+        `location_keys` viene de match_locations.
+        """
+        stmt = select(*[Estate.__table__.c[name] for name in EstateResponse.model_fields])
+        return self._apply_filters(stmt, owner_id, min_price, max_price, location_keys).order_by(Estate.id)
+
+    @staticmethod
+    def _apply_filters(
+        stmt: Select,
+        owner_id: Optional[int] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        location_keys: Optional[List[str]] = None
+    ) -> Select:
+        """Aplicar los filtros opcionales del listado"""
+        if owner_id:
+            stmt = stmt.where(Estate.owner_id == owner_id)
+        if location_keys is not None:
+            stmt = stmt.where(Estate.location_key.in_(location_keys))
+        if min_price is not None:
+            stmt = stmt.where(Estate.price >= min_price)
+        if max_price is not None:
+            stmt = stmt.where(Estate.price <= max_price)
+        return stmt
+
+    async def update_estate(self, estate_id: int, estate_data: EstateUpdate) -> Optional[EstateResponse]:
+        """Actualizar finca"""
         update_data = estate_data.model_dump(exclude_unset=True)
-        if "name" in update_data:
-            existing_by_name = self.get_estate_by_name(update_data["name"])
-            if existing_by_name and existing_by_name.id != estate_id:
+        if not update_data:
+            existing_estate = await self.get_estate_by_id(estate_id)
+            if not existing_estate:
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Ya existe una finca con ese nombre"
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Finca no encontrada"
                 )
+            return existing_estate
+        if "location" in update_data:
+            update_data["location_key"] = normalize_location(update_data["location"])
+            # Nueva ubicación sin coordenadas: las del municipio (o ninguna, no las de la anterior)
+            if "latitude" not in update_data and "longitude" not in update_data:
+                update_data["latitude"], update_data["longitude"] = coordinates_for(update_data["location"])
 
         # Actualizar la finca
         try:
-            self.db.execute(
-                update(Estate).where(Estate.id == estate_id).values(**update_data)
+            estate = await write_returning(
+                self.db,
+                update(Estate).where(Estate.id == estate_id).values(**update_data).returning(Estate)
             )
-            self.db.commit()
-
-            # Retornar la finca actualizada
-            return self.get_estate_by_id(estate_id)
         except IntegrityError as e:
-            self.db.rollback()
+            await self.db.rollback()
+            if violates(e, UNIQUE, "name"):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Ya existe una finca con ese nombre"
+                )
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error de integridad en la base de datos: {str(e)}"
             )
 
-    def delete_estate(self, estate_id: int) -> bool:
-        """Eliminar finca"""
-        existing_estate = self.get_estate_by_id(estate_id)
-        if not existing_estate:
+        if not estate:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Finca no encontrada"
             )
+        availability_index.apply_estate(estate)
+        self.locations.add(estate.location)
+        self.facets_cache.clear()
+        self.responses.invalidate(estate_id)
+        return EstateResponse.from_orm(estate)
 
-        # Eliminar la finca
-        self.db.execute(delete(Estate).where(Estate.id == estate_id))
-        self.db.commit()
+    async def delete_estate(self, estate_id: int) -> bool:
+        """Eliminar finca"""
+        try:
+            deleted = await execute_write(self.db, delete(Estate).where(Estate.id == estate_id))
+        except IntegrityError:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No se puede eliminar la finca porque tiene reservas asociadas"
+            )
+
+        if not deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Finca no encontrada"
+            )
+        availability_index.discard_estate(estate_id)
+        self.facets_cache.clear()
+        self.responses.invalidate(estate_id)
         return True
 
-    def get_estates_by_owner(self, owner_id: int) -> List[EstateResponse]:
+    @read_only
+    async def get_estates_by_owner(self, owner_id: int) -> List[EstateResponse]:
         """Obtener todas las fincas de un propietario específico"""
-        return self.get_all_estates(owner_id=owner_id, skip=0, limit=1000)
+        return await self.get_all_estates(owner_id=owner_id, skip=0, limit=1000)
 
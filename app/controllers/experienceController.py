@@ -1,61 +1,63 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, insert, update, delete, func, literal, literal_column, null, table, column
+from sqlalchemy.dialects.postgresql import REGCONFIG
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import Select
 from typing import List, Optional
+import math
 from fastapi import HTTPException, status
 
 from app.models.experiences import Experiences
-from app.models.user import User
-from app.schemas.experience import ExperienceCreate, ExperienceUpdate, ExperienceResponse, ExperienceWithUser
+from app.schemas.experience import ExperienceCreate, ExperienceUpdate, ExperienceResponse, ExperienceSearchResult, ExperienceNearbyResult, ExperienceWithUser
+from app.database import read_only
+from app.utils.write_coordinator import write_returning, execute_write
+from app.utils.integrity import parse_integrity_error, violates, UNIQUE, FOREIGN_KEY
+from app.utils.pagination import Keyset
+from app.utils.locations import LocationIndex, normalize_location
+from app.utils.geo import bounding_box, coordinates_for, nearest
+from app.utils.response_cache import ResponseCache
+from app.utils.search import FTS_TABLE, PG_SEARCH_CONFIG, TITLE_WEIGHT, search_terms, fts5_query, tsquery
 
 class ExperienceController:
+    keyset = Keyset(Experiences.id_experience, price=Experiences.price)
+    locations = LocationIndex(Experiences.location_key)
+    responses = ResponseCache(ExperienceResponse)
+
     def __init__(self, db: AsyncSession):
         self.db = db
 
     async def create_experience(self, experience_data: ExperienceCreate) -> ExperienceResponse:
         """Crear una nueva experiencia"""
+        latitude, longitude = coordinates_for(
+            experience_data.location, experience_data.latitude, experience_data.longitude
+        )
         try:
-            # Verificar si el título ya existe
-            existing_experience = await self.get_experience_by_title(experience_data.title)
-            if existing_experience:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Ya existe una experiencia con este título"
-                )
-            
-            # Verificar si el usuario existe
-            user_exists = await self._user_exists(experience_data.user_id)
-            if not user_exists:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="El usuario especificado no existe"
-                )
-
-            # Crear la nueva experiencia
-            db_experience = Experiences(
-                title=experience_data.title,
-                description=experience_data.description,
-                schedule=experience_data.schedule,
-                duration=experience_data.duration,
-                price=experience_data.price,
-                location=experience_data.location,
-                user_id=experience_data.user_id
+            # El título único y la llave foránea de user_id se validan en la base de datos
+            db_experience = await write_returning(
+                self.db,
+                insert(Experiences).values(
+                    title=experience_data.title,
+                    description=experience_data.description,
+                    schedule=experience_data.schedule,
+                    duration=experience_data.duration,
+                    price=experience_data.price,
+                    location=experience_data.location,
+                    latitude=latitude,
+                    longitude=longitude,
+                    user_id=experience_data.user_id
+                ).returning(Experiences)
             )
-            
-            self.db.add(db_experience)
-            await self.db.commit()
-            await self.db.refresh(db_experience)
+            self.locations.add(db_experience.location)
+            self.responses.invalidate()
             
             return ExperienceResponse.from_orm(db_experience)
             
-        except IntegrityError:
+        except IntegrityError as e:
             await self.db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Error de integridad en la base de datos"
-            )
+            raise self._integrity_error(e)
 
+    @read_only
     async def get_experience_by_id(self, experience_id: int) -> Optional[ExperienceResponse]:
         """Obtener experiencia por ID"""
         result = await self.db.execute(
@@ -68,6 +70,14 @@ class ExperienceController:
             
         return ExperienceResponse.from_orm(experience)
 
+    @read_only
+    async def get_experience_version(self, experience_id: int) -> Optional[int]:
+        """Versión de la experiencia sin cargar la fila (peticiones condicionales)"""
+        result = await self.db.execute(
+            select(Experiences.version).where(Experiences.id_experience == experience_id)
+        )
+        return result.scalar_one_or_none()
+
     async def get_experience_by_title(self, title: str) -> Optional[Experiences]:
         """Obtener experiencia por título (modelo de BD)"""
         result = await self.db.execute(
@@ -75,14 +85,22 @@ class ExperienceController:
         )
         return result.scalar_one_or_none()
 
-    async def get_all_experiences(self, skip: int = 0, limit: int = 100) -> List[ExperienceResponse]:
+    @read_only
+    async def get_all_experiences(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        sort: str = "id",
+        cursor: Optional[str] = None
+    ) -> List[ExperienceResponse]:
         """Obtener todas las experiencias con paginación"""
         result = await self.db.execute(
-            select(Experiences).offset(skip).limit(limit)
+            self.keyset.apply(select(Experiences), sort, cursor, skip, limit)
         )
         experiences = result.scalars().all()
         return [ExperienceResponse.from_orm(exp) for exp in experiences]
 
+    @read_only
     async def get_experiences_by_user(self, user_id: int, skip: int = 0, limit: int = 100) -> List[ExperienceResponse]:
         """Obtener experiencias de un usuario específico"""
         result = await self.db.execute(
@@ -94,17 +112,54 @@ class ExperienceController:
         experiences = result.scalars().all()
         return [ExperienceResponse.from_orm(exp) for exp in experiences]
 
+    @read_only
+    async def match_locations(self, location: str) -> List[str]:
+        """Ubicaciones normalizadas que coinciden con `location` (sin tildes, parcial o con errores de escritura)"""
+        return await self.locations.keys(self.db, location)
+
+    @read_only
     async def get_experiences_by_location(self, location: str, skip: int = 0, limit: int = 100) -> List[ExperienceResponse]:
-        """Obtener experiencias por ubicación"""
+        """Obtener experiencias por ubicación, tolerando tildes y errores de escritura"""
+        keys = await self.match_locations(location)
+        if not keys:
+            return []
         result = await self.db.execute(
             select(Experiences)
-            .where(Experiences.location.ilike(f"%{location}%"))
+            .where(Experiences.location_key.in_(keys))
             .offset(skip)
             .limit(limit)
         )
         experiences = result.scalars().all()
         return [ExperienceResponse.from_orm(exp) for exp in experiences]
 
+    @read_only
+    async def get_nearby_experiences(
+        self, lat: float, lon: float, radius_km: float, skip: int = 0, limit: int = 100
+    ) -> List[ExperienceNearbyResult]:
+        """Experiencias a `radius_km` o menos de (lat, lon), de la más cercana a la más lejana"""
+        page = (
+            nearest(
+                self.db.get_bind().dialect.name, "experiences", Experiences.id_experience,
+                Experiences.latitude, Experiences.longitude, bounding_box(lat, lon, radius_km), lat, lon, radius_km
+            )
+            .order_by("distance", "id")
+            .offset(skip)
+            .limit(limit)
+            .subquery()
+        )
+        result = await self.db.execute(
+            select(Experiences, page.c.distance)
+            .join(page, page.c.id == Experiences.id_experience)
+            .order_by(page.c.distance, Experiences.id_experience)
+        )
+        experiences = []
+        for experience, distance_km_sq in result.all():
+            item = ExperienceNearbyResult.from_orm(experience)
+            item.distance_km = round(math.sqrt(distance_km_sq), 3)
+            experiences.append(item)
+        return experiences
+
+    @read_only
     async def get_experiences_by_price_range(self, min_price: int, max_price: int, skip: int = 0, limit: int = 100) -> List[ExperienceResponse]:
         """Obtener experiencias por rango de precio"""
         result = await self.db.execute(
@@ -117,64 +172,83 @@ class ExperienceController:
         experiences = result.scalars().all()
         return [ExperienceResponse.from_orm(exp) for exp in experiences]
 
+    def export_query(
+        self,
+        user_id: Optional[int] = None,
+        location_keys: Optional[List[str]] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None
+    ) -> Select:
+        """
+        Consulta de exportación: columnas de ExperienceResponse presentes en la tabla.
+        `location_keys` viene de match_locations.
+        """
+        columns = Experiences.__table__.c
+        stmt = select(*[columns[name] for name in ExperienceResponse.model_fields if name in columns])
+        if user_id:
+            stmt = stmt.where(Experiences.user_id == user_id)
+        if location_keys is not None:
+            stmt = stmt.where(Experiences.location_key.in_(location_keys))
+        if min_price is not None:
+            stmt = stmt.where(Experiences.price >= min_price)
+        if max_price is not None:
+            stmt = stmt.where(Experiences.price <= max_price)
+        return stmt.order_by(Experiences.id_experience)
+
     async def update_experience(self, experience_id: int, experience_data: ExperienceUpdate) -> Optional[ExperienceResponse]:
         """Actualizar experiencia"""
-        # Verificar si la experiencia existe
-        existing_experience = await self.get_experience_by_id(experience_id)
-        if not existing_experience:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Experiencia no encontrada"
-            )
-
-        # Si se actualiza el título, verificar que no exista otro con el mismo título
-        if experience_data.title:
-            existing_title = await self.get_experience_by_title(experience_data.title)
-            if existing_title and existing_title.id_experience != experience_id:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Ya existe una experiencia con este título"
-                )
-
-        # Si se actualiza el user_id, verificar que el usuario existe
-        if experience_data.user_id:
-            user_exists = await self._user_exists(experience_data.user_id)
-            if not user_exists:
+        update_data = experience_data.dict(exclude_unset=True)
+        if not update_data:
+            existing_experience = await self.get_experience_by_id(experience_id)
+            if not existing_experience:
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="El usuario especificado no existe"
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Experiencia no encontrada"
                 )
-
-        # Preparar datos para actualizar
-        update_data = experience_data.dict(exclude_unset=True)
+            return existing_experience
+        if "location" in update_data:
+            update_data["location_key"] = normalize_location(update_data["location"])
+            # Nueva ubicación sin coordenadas: las del municipio (o ninguna, no las de la anterior)
+            if "latitude" not in update_data and "longitude" not in update_data:
+                update_data["latitude"], update_data["longitude"] = coordinates_for(update_data["location"])
 
         # Actualizar la experiencia
-        await self.db.execute(
-            update(Experiences)
-            .where(Experiences.id_experience == experience_id)
-            .values(**update_data)
-        )
-        await self.db.commit()
-
-        # Retornar la experiencia actualizada
-        return await self.get_experience_by_id(experience_id)
+        try:
+            experience = await write_returning(
+                self.db,
+                update(Experiences)
+                .where(Experiences.id_experience == experience_id)
+                .values(**update_data)
+                .returning(Experiences)
+            )
+        except IntegrityError as e:
+            await self.db.rollback()
+            raise self._integrity_error(e)
 
-    async def delete_experience(self, experience_id: int) -> bool:
-        """Eliminar experiencia"""
-        existing_experience = await self.get_experience_by_id(experience_id)
-        if not existing_experience:
+        if not experience:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Experiencia no encontrada"
             )
+        self.locations.add(experience.location)
+        self.responses.invalidate(experience_id)
+        return ExperienceResponse.from_orm(experience)
 
-        # Eliminar la experiencia
-        await self.db.execute(
+    async def delete_experience(self, experience_id: int) -> bool:
+        """Eliminar experiencia"""
+        deleted = await execute_write(
+            self.db,
             delete(Experiences).where(Experiences.id_experience == experience_id)
         )
-        await self.db.commit()
+        if not deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Experiencia no encontrada"
+            )
+        self.responses.invalidate(experience_id)
         return True
 
+    @read_only
     async def get_experience_with_user(self, experience_id: int) -> Optional[ExperienceWithUser]:
         """Obtener experiencia con información del usuario"""
         result = await self.db.execute(
@@ -199,21 +273,74 @@ class ExperienceController:
         experience_data["user"] = user_data
         return ExperienceWithUser(**experience_data)
 
-    async def _user_exists(self, user_id: int) -> bool:
-        """Verificar si un usuario existe"""
-        result = await self.db.execute(select(User).where(User.id == user_id))
-        return result.scalar_one_or_none() is not None
-
-    async def search_experiences(self, query: str, skip: int = 0, limit: int = 100) -> List[ExperienceResponse]:
-        """Buscar experiencias por título o descripción"""
-        result = await self.db.execute(
-            select(Experiences)
-            .where(
-                Experiences.title.ilike(f"%{query}%") |
-                Experiences.description.ilike(f"%{query}%")
+    def _integrity_error(self, error: IntegrityError) -> HTTPException:
+        """Traducir una violación de restricción al error HTTP correspondiente"""
+        if violates(error, UNIQUE, "title"):
+            return HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Ya existe una experiencia con este título"
             )
-            .offset(skip)
-            .limit(limit)
+        if parse_integrity_error(error)[0] == FOREIGN_KEY:
+            return HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El usuario especificado no existe"
+            )
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Error de integridad en la base de datos"
         )
-        experiences = result.scalars().all()
-        return [ExperienceResponse.from_orm(exp) for exp in experiences]
+
+    @read_only
+    async def search_experiences(self, query: str, skip: int = 0, limit: int = 100) -> List[ExperienceSearchResult]:
+        """
+        Buscar experiencias por título o descripción con el índice de texto completo:
+        todas las palabras (como prefijo), sin distinguir tildes ni mayúsculas, ordenadas
+        por relevancia (el título pesa más) y con un fragmento resaltado
+        """
+        terms = search_terms(query)
+        if not terms:
+            return []
+
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "sqlite":
+            fts = table(FTS_TABLE, column("rowid"))
+            fts_ref = literal_column(FTS_TABLE)
+            # bm25 es menor cuanto más relevante; se expone negado para que mayor sea mejor
+            score = func.bm25(fts_ref, TITLE_WEIGHT, 1.0)
+            statement = (
+                select(Experiences, func.snippet(fts_ref, -1, "<mark>", "</mark>", "…", 16), -score)
+                .join(fts, fts.c.rowid == Experiences.id_experience)
+                .where(fts_ref.op("MATCH")(fts5_query(terms)))
+                .order_by(score, Experiences.id_experience)
+            )
+        elif dialect == "postgresql":
+            config = literal(PG_SEARCH_CONFIG).cast(REGCONFIG)
+            ts_query = func.to_tsquery(config, tsquery(terms))
+            score = func.ts_rank_cd(literal_column("experiences.search_vector"), ts_query)
+            headline = func.ts_headline(
+                config, Experiences.title + ". " + Experiences.description, ts_query,
+                "StartSel=<mark>, StopSel=</mark>, MaxWords=16, MinWords=6"
+            )
+            statement = (
+                select(Experiences, headline, score)
+                .where(literal_column("experiences.search_vector").op("@@")(ts_query))
+                .order_by(score.desc(), Experiences.id_experience)
+            )
+        else:
+            conditions = [
+                Experiences.title.ilike(f"%{term}%") | Experiences.description.ilike(f"%{term}%") for term in terms
+            ]
+            statement = (
+                select(Experiences, null(), literal(0.0))
+                .where(*conditions)
+                .order_by(Experiences.id_experience)
+            )
+
+        result = await self.db.execute(statement.offset(skip).limit(limit))
+        results = []
+        for experience, snippet, rank in result.all():
+            item = ExperienceSearchResult.from_orm(experience)
+            item.snippet = snippet
+            item.rank = rank
+            results.append(item)
+        return results
@@ -1,65 +1,58 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, delete
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from datetime import datetime
 from fastapi import HTTPException, status
 
 from app.models.profile import Profile
 from app.schemas.profile_schema import ProfileCreate, ProfileUpdate, ProfileResponse
-from app.models.user import User
+from app.database import read_only
+from app.utils.write_coordinator import write_returning, execute_write
+from app.utils.integrity import parse_integrity_error, violates, UNIQUE, FOREIGN_KEY
+from app.utils.pagination import Keyset
 
 class ProfileController:
-    def __init__(self, db: Session):
+    keyset = Keyset(Profile.id_profile)
+
+    def __init__(self, db: AsyncSession):
         self.db = db
 
     # ----------------------------
     #   Crear perfil
     # ----------------------------
-    def create_profile(self, profile_data: ProfileCreate) -> ProfileResponse:
+    async def create_profile(self, profile_data: ProfileCreate) -> ProfileResponse:
         """Crear un nuevo perfil"""
         try:
-            # Verificar que exista el usuario asociado
-            user_exist = self.db.execute(
-                select(User).where(User.id == profile_data.user_id)
-            ).scalar_one_or_none()
-
-            if not user_exist:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="El usuario asociado no existe"
-                )
+            # La llave foránea y la restricción UNIQUE de user_id validan el usuario y el perfil único
+            db_profile = await write_returning(
+                self.db,
+                insert(Profile).values(
+                    user_id=profile_data.user_id,
+                    bio=profile_data.bio,
+                    avatar_url=str(profile_data.avatar_url) if profile_data.avatar_url else None,
+                    location=profile_data.location,
+                    website=str(profile_data.website) if profile_data.website else None,
+                    theme=profile_data.theme,
+                    language=profile_data.language,
+                    show_email=profile_data.show_email
+                ).returning(Profile)
+            )
 
-            # Verificar si el usuario YA tiene un perfil
-            existing_profile = self.db.execute(
-                select(Profile).where(Profile.user_id == profile_data.user_id)
-            ).scalar_one_or_none()
+            return ProfileResponse.from_orm(db_profile)
 
-            if existing_profile:
+        except IntegrityError as e:
+            await self.db.rollback()
+            if violates(e, UNIQUE, "user_id"):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="El usuario ya tiene un perfil"
                 )
-
-            # Crear perfil
-            db_profile = Profile(
-                user_id=profile_data.user_id,
-                bio=profile_data.bio,
-                avatar_url=str(profile_data.avatar_url) if profile_data.avatar_url else None,
-                location=profile_data.location,
-                website=str(profile_data.website) if profile_data.website else None,
-                theme=profile_data.theme,
-                language=profile_data.language,
-                show_email=profile_data.show_email
-            )
-
-            self.db.add(db_profile)
-            self.db.commit()
-            self.db.refresh(db_profile)
-
-            return ProfileResponse.from_orm(db_profile)
-
-        except IntegrityError:
-            self.db.rollback()
+            if parse_integrity_error(e)[0] == FOREIGN_KEY:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="El usuario asociado no existe"
+                )
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Error de integridad en la base de datos"
@@ -68,9 +61,10 @@ class ProfileController:
     # ----------------------------
     #   Obtener perfil por ID
     # ----------------------------
-    def get_profile_by_id(self, profile_id: int) -> Optional[ProfileResponse]:
+    @read_only
+    async def get_profile_by_id(self, profile_id: int) -> Optional[ProfileResponse]:
         """Obtener perfil por ID"""
-        result = self.db.execute(
+        result = await self.db.execute(
             select(Profile).where(Profile.id_profile == profile_id)
         )
         profile = result.scalar_one_or_none()
@@ -83,9 +77,10 @@ class ProfileController:
     # ----------------------------
     #   Obtener perfil por user_id
     # ----------------------------
-    def get_profile_by_user_id(self, user_id: int) -> Optional[ProfileResponse]:
+    @read_only
+    async def get_profile_by_user_id(self, user_id: int) -> Optional[ProfileResponse]:
         """Obtener perfil por ID de usuario"""
-        result = self.db.execute(
+        result = await self.db.execute(
             select(Profile).where(Profile.user_id == user_id)
         )
         profile = result.scalar_one_or_none()
@@ -95,13 +90,27 @@ class ProfileController:
 
         return ProfileResponse.from_orm(profile)
 
+    # ----------------------------
+    #   Fecha de actualización del perfil
+    # ----------------------------
+    @read_only
+    async def get_profile_updated_at(self, profile_id: int) -> Optional[Tuple[Optional[datetime]]]:
+        """
+        Fecha de actualización del perfil sin cargar la fila (peticiones condicionales).
+        None si el perfil no existe; la tupla distingue un updated_at nulo.
+        """
+        result = await self.db.execute(select(Profile.updated_at).where(Profile.id_profile == profile_id))
+        row = result.first()
+        return None if row is None else tuple(row)
+
     # ----------------------------
     #   Obtener todos los perfiles
     # ----------------------------
-    def get_all_profiles(self, skip: int = 0, limit: int = 100) -> List[ProfileResponse]:
+    @read_only
+    async def get_all_profiles(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[ProfileResponse]:
         """Obtener todos los perfiles con paginación"""
-        result = self.db.execute(
-            select(Profile).offset(skip).limit(limit)
+        result = await self.db.execute(
+            self.keyset.apply(select(Profile), cursor=cursor, skip=skip, limit=limit)
         )
         profiles = result.scalars().all()
 
@@ -110,17 +119,8 @@ class ProfileController:
     # ----------------------------
     #   Actualizar perfil
     # ----------------------------
-    def update_profile(self, profile_id: int, profile_data: ProfileUpdate) -> Optional[ProfileResponse]:
+    async def update_profile(self, profile_id: int, profile_data: ProfileUpdate) -> Optional[ProfileResponse]:
         """Actualizar perfil"""
-
-        # Verificar que exista
-        existing_profile = self.get_profile_by_id(profile_id)
-        if not existing_profile:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Perfil no encontrado"
-            )
-
         update_data = profile_data.model_dump(exclude_unset=True)
         
         # Convertir HttpUrl a string si existen
@@ -129,36 +129,31 @@ class ProfileController:
         if "website" in update_data and update_data["website"]:
             update_data["website"] = str(update_data["website"])
 
-        # Actualizar
-        self.db.execute(
-            update(Profile).where(Profile.id_profile == profile_id).values(**update_data)
+        # Actualizar (updated_at se asigna por el onupdate de la columna)
+        profile = await write_returning(
+            self.db,
+            update(Profile).where(Profile.id_profile == profile_id).values(**update_data).returning(Profile)
         )
-        self.db.commit()
+        if not profile:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Perfil no encontrado"
+            )
 
-        return self.get_profile_by_id(profile_id)
+        return ProfileResponse.from_orm(profile)
 
     # ----------------------------
     #   Eliminar perfil (soft delete)
     # ----------------------------
-    def delete_profile(self, profile_id: int) -> bool:
+    async def delete_profile(self, profile_id: int) -> bool:
         """Eliminar perfil (soft delete)"""
 
-        existing_profile = self.get_profile_by_id(profile_id)
-        if not existing_profile:
+        # Eliminar perfil (hard delete ya que no hay campo is_active)
+        deleted = await execute_write(self.db, delete(Profile).where(Profile.id_profile == profile_id))
+        if not deleted:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Perfil no encontrado"
             )
 
-        # Eliminar perfil (hard delete ya que no hay campo is_active)
-        profile_to_delete = self.db.execute(
-            select(Profile).where(Profile.id_profile == profile_id)
-        ).scalar_one_or_none()
-        
-        if profile_to_delete:
-            self.db.delete(profile_to_delete)
-        self.db.commit()
-
         return True
-
-
@@ -1,29 +1,238 @@
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy import event, inspect
+from fastapi import Request, Response
+from functools import wraps
+import itertools
+import time
 import os
 from dotenv import load_dotenv
 from pathlib import Path
 
+from app.config import settings
+from app.utils.pool_metrics import get_pool_metrics, instrumented_pool_class, register_pool_events
+from app.utils.sqlite_profile import apply_sqlite_profile
+from app.utils.query_stats import register_query_events
+from app.utils.slow_query_log import register_slow_query_log
+
 load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / ".env")
 
+# Drivers asíncronos equivalentes a los drivers síncronos habituales
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def get_async_database_url(url: str) -> str:
+    """Convertir una URL de conexión síncrona a su equivalente asíncrono"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername)
+    if driver:
+        parsed = parsed.set(drivername=driver)
+    return parsed.render_as_string(hide_password=False)
+
 # URL de conexión (puedes cambiar SQLite por PostgreSQL o MySQL si quieres)
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
+SQLALCHEMY_DATABASE_URL = get_async_database_url(os.getenv("DATABASE_URL") or settings.DATABASE_URL)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+def get_engine_options(url: str, name: str) -> dict:
+    """Opciones de create_async_engine para el pool configurado en Settings"""
+    parsed = make_url(url)
+    metrics = get_pool_metrics(name)
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_logging_name": name,
+    }
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    # SQLite en memoria necesita una única conexión compartida: se deja el pool por defecto
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
 
-Base = declarative_base()
+    if settings.DB_POOL_MODE == "null":
+        # Sin pool propio: cada sesión abre y cierra su conexión (PgBouncer, RDS Proxy, ...)
+        options["poolclass"] = instrumented_pool_class(NullPool, metrics)
+        if parsed.get_backend_name() == "postgresql":
+            # PgBouncer en modo transacción no soporta prepared statements con nombre
+            options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+    elif settings.DB_POOL_MODE == "queue":
+        options.update({
+            "poolclass": instrumented_pool_class(AsyncAdaptedQueuePool, metrics),
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_use_lifo": settings.DB_POOL_USE_LIFO,
+        })
+    else:
+        raise ValueError(f"DB_POOL_MODE inválido: {settings.DB_POOL_MODE}")
+
+    return options
+
+def build_engine(url: str, name: str, **overrides):
+    """Crear un engine asíncrono con el pool configurado y sus métricas"""
+    options = get_engine_options(url, name)
+    options.update(overrides)
+    async_engine = create_async_engine(url, **options)
+    register_pool_events(async_engine.sync_engine, get_pool_metrics(name))
+    register_query_events(async_engine.sync_engine)
+    if settings.SLOW_QUERY_LOG_ENABLED:
+        register_slow_query_log(async_engine.sync_engine, name)
+
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        if settings.SQLITE_PROFILE == "production" and parsed.database not in (None, "", ":memory:"):
+            apply_sqlite_profile(async_engine.sync_engine)
+        elif settings.SQLITE_PROFILE in ("default", "production"):
+            # Los controladores validan las referencias con las llaves foráneas
+            apply_sqlite_profile(async_engine.sync_engine, {"foreign_keys": "ON"})
+        else:
+            raise ValueError(f"SQLITE_PROFILE inválido: {settings.SQLITE_PROFILE}")
+    return async_engine
+
+engine = build_engine(SQLALCHEMY_DATABASE_URL, "primary")
+
+# Réplicas de solo lectura (DATABASE_REPLICA_URLS separadas por comas)
+replica_engines = [
+    build_engine(get_async_database_url(url.strip()), f"replica-{index}")
+    for index, url in enumerate(settings.DATABASE_REPLICA_URLS.split(","))
+    if url.strip()
+]
+_replica_cycle = itertools.cycle(replica_engines)
+
+# Cookie que mantiene al cliente en el primario después de escribir (read-your-writes)
+PRIMARY_COOKIE = "db_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+class RoutingSession(Session):
+    """
+    Sesión que envía las lecturas marcadas con @read_only a una réplica
+    y todo lo demás (escrituras, flush, lecturas tras escribir) al primario.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            replica_engines
+            and self.info.get("read_only")
+            and not self.info.get("wrote")
+            and not self.info.get("force_primary")
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+        ):
+            # Una misma sesión lee siempre de la misma réplica
+            if "replica" not in self.info:
+                self.info["replica"] = next(_replica_cycle)
+            return self.info["replica"].sync_engine
+        return engine.sync_engine
 
-def get_db():
-    """Dependencia de sesión para FastAPI"""
-    db = SessionLocal()
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _track_orm_writes(orm_execute_state):
+    """Marcar la sesión cuando ejecuta INSERT/UPDATE/DELETE"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(RoutingSession, "after_flush")
+def _track_flush_writes(session, flush_context):
+    """Marcar la sesión cuando el flush envía cambios al primario"""
+    session.info["wrote"] = True
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_client_to_primary(session):
+    """Tras un commit con escrituras, fijar al cliente en el primario"""
+    if session.info.get("wrote"):
+        pin_to_primary(session)
+
+def pin_to_primary(session):
+    """Marcar que la sesión escribió y fijar al cliente en el primario durante la ventana configurada"""
+    session.info["wrote"] = True
+    response = session.info.get("response")
+    if response is not None and settings.READ_YOUR_WRITES_SECONDS > 0:
+        response.set_cookie(
+            PRIMARY_COOKIE,
+            str(time.time() + settings.READ_YOUR_WRITES_SECONDS),
+            max_age=int(settings.READ_YOUR_WRITES_SECONDS) + 1,
+            httponly=True,
+            samesite="lax"
+        )
+
+def is_pinned_to_primary(request: Request) -> bool:
+    """Verificar si el cliente escribió recientemente y debe leer del primario"""
     try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def read_engine(request: Request):
+    """Engine para lecturas fuera de una sesión (exportaciones): réplica salvo que el cliente esté fijado al primario"""
+    if replica_engines and not is_pinned_to_primary(request):
+        return next(_replica_cycle)
+    return engine
+
+def read_only(method):
+    """
+    Marcar un método de controlador como de solo lectura.
+    En peticiones GET/HEAD sus consultas pueden servirse desde una réplica.
+    """
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        info = self.db.info
+        previous = info.get("read_only", False)
+        info["read_only"] = info.get("safe_request", True)
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            info["read_only"] = previous
+    return wrapper
+
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+Base = declarative_base()
+
+async def get_db(request: Request, response: Response):
+    """Dependencia de sesión asíncrona para FastAPI"""
+    async with SessionLocal() as db:
+        db.info["safe_request"] = request.method in SAFE_METHODS
+        db.info["force_primary"] = is_pinned_to_primary(request)
+        db.info["response"] = response
         yield db
-    finally:
-        db.close()
 
-def create_tables():
+def sync_schema(conn):
+    """
+    Agregar a las tablas existentes las columnas e índices nuevos del modelo.
+    create_all solo crea las tablas que faltan; no hay migraciones en el proyecto.
+    """
+    inspector = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column.type.compile(conn.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            conn.exec_driver_sql(ddl)
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+async def create_tables():
     """Crear todas las tablas en la base de datos"""
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(sync_schema)
+
+async def dispose_engine():
+    """Cerrar todas las conexiones del pool"""
+    await engine.dispose()
+    for replica in replica_engines:
+        await replica.dispose()
@@ -1,9 +1,21 @@
 from fastapi import FastAPI
 from app.routes import user, client
+from app.routes.auth import router as auth_router
 from app.routes.booking import router as booking_router
 from app.routes.estate import router as estate_router
+from app.routes.experience import router as experience_router
 from app.routes.profile import router as profile_router
-from app.database import create_tables
+from app.routes.internal import router as internal_router
+from app.database import create_tables, dispose_engine
+from app.utils.write_coordinator import write_coordinator
+from app.utils.query_stats import query_stats_middleware
+from app.utils.availability import availability_index
+from app.utils.password_hasher import password_hasher
+from app.utils.occupancy import ensure_occupancy
+from app.utils.booking_dates import warn_legacy_layout
+from app.utils.locations import backfill_location_keys
+from app.models import Estate, Experiences
+from app.config import settings
 
 app = FastAPI(
     title="Triada Cafetera API",
@@ -11,17 +23,41 @@ app = FastAPI(
     version="1.0.0"
 )
 
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    app.middleware("http")(query_stats_middleware)
+
 # Incluir todas las rutas
+app.include_router(auth_router)
 app.include_router(user.router)
 app.include_router(client.router)
 app.include_router(booking_router)
 app.include_router(estate_router)
+app.include_router(experience_router)
 app.include_router(profile_router)
 
+if settings.INTERNAL_ENDPOINTS_ENABLED:
+    app.include_router(internal_router)
+
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     """Evento que se ejecuta al iniciar la aplicación"""
-    create_tables()
+    await create_tables()
+    await warn_legacy_layout()
+    await ensure_occupancy()
+    for table in (Estate.__table__, Experiences.__table__):
+        await backfill_location_keys(table)
+    if settings.WRITE_COORDINATOR_ENABLED:
+        await write_coordinator.start()
+    if settings.AVAILABILITY_INDEX_ENABLED:
+        await availability_index.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Evento que se ejecuta al detener la aplicación"""
+    await availability_index.stop()
+    await write_coordinator.stop()
+    password_hasher.stop()
+    await dispose_engine()
 
 @app.get("/")
 def read_root():
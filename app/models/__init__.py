@@ -6,6 +6,7 @@ from .profile import Profile
 from .booking import Booking
 from .experiences import Experiences
 from .estate import Estate
+from .occupancy import EstateOccupancy
 
 __all__ = [
     "User",
@@ -14,5 +15,6 @@ __all__ = [
     "Profile",
     "Booking",
     "Experiences",
-    "Estate"
+    "Estate",
+    "EstateOccupancy"
 ]
@@ -1,17 +1,50 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index, CheckConstraint, DDL, event, literal_column
 from sqlalchemy.orm import relationship
+from app.config import settings
 from app.database import Base
 
 class Booking(Base):
     __tablename__ = 'bookings'
     
     id = Column(Integer, primary_key=True, index=True)
-    start_date = Column(String, index=True)
-    end_date = Column(String, index=True)
+    # Noches reservadas: [start_date, end_date), end_date es el día de salida
+    start_date = Column(Date, index=True)
+    end_date = Column(Date, index=True)
     status = Column(String, index=True)
     num_persons = Column(Integer, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
     estate_id = Column(Integer, ForeignKey('estates.id'))
+    # Versión del registro para los ETag: cada UPDATE la incrementa (onupdate)
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version") + 1)
     
     user = relationship("User", back_populates="bookings")
     estate = relationship("Estate", back_populates="bookings")
+
+    __table_args__ = (
+        # Paginación por cursor ordenada por (start_date, id)
+        Index("ix_bookings_start_date_id", "start_date", "id"),
+        # Búsqueda de reservas que se cruzan con un rango de fechas en una finca
+        Index("ix_bookings_estate_dates", "estate_id", "start_date", "end_date"),
+        CheckConstraint("end_date > start_date", name="ck_bookings_dates"),
+    )
+
+
+# Opcional en PostgreSQL (BOOKING_EXCLUSION_CONSTRAINT): dos reservas activas de la misma
+# finca no pueden cruzarse. Las canceladas no cuentan, igual que en INACTIVE_STATUSES.
+def _exclusion_enabled(ddl, target, bind, **kw):
+    return settings.BOOKING_EXCLUSION_CONSTRAINT
+
+event.listen(
+    Booking.__table__,
+    "after_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql", callable_=_exclusion_enabled)
+)
+event.listen(
+    Booking.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE bookings ADD CONSTRAINT ex_bookings_overlap "
+        "EXCLUDE USING gist (estate_id WITH =, daterange(start_date, end_date) WITH &&) "
+        "WHERE (status <> 'cancelled')"
+    ).execute_if(dialect="postgresql", callable_=_exclusion_enabled)
+)
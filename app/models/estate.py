@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index, event, literal_column
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.utils.locations import location_key_default
+from app.utils.geo import spatial_index_listener
 
 class Estate(Base):
     __tablename__ = 'estates'
@@ -8,9 +10,24 @@ class Estate(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True)
     location = Column(String, index=True)
+    # Ubicación normalizada (sin tildes, minúsculas) para los filtros por ubicación
+    location_key = Column(String, index=True, default=location_key_default)
+    # Coordenadas (grados decimales); índice espacial R*Tree (SQLite) o GiST (PostgreSQL)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
     size = Column(Integer, index=True)
     price = Column(Integer, index=True)
+    # Máximo de huéspedes por reserva (NULL = sin límite registrado)
+    capacity = Column(Integer, nullable=True)
     owner_id = Column(Integer, ForeignKey('users.id'))
+    # Versión del registro para los ETag: cada UPDATE la incrementa (onupdate)
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version") + 1)
     
     owner = relationship("User", back_populates="estates")
     bookings = relationship("Booking", back_populates="estate")
+
+    # Paginación por cursor ordenada por (price, id)
+    __table_args__ = (Index("ix_estates_price_id", "price", "id"),)
+
+# Índice espacial de latitude/longitude
+event.listen(Base.metadata, "after_create", spatial_index_listener("estates", "id"))
@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index, event, literal_column
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.utils.locations import location_key_default
+from app.utils.geo import spatial_index_listener
+from app.utils.search import ensure_search_index
 
 class Experiences(Base):
     __tablename__ = 'experiences'
@@ -12,6 +15,21 @@ class Experiences(Base):
     duration = Column(Integer)
     price = Column(Integer, index=True)
     location = Column(String, index=True)
+    # Ubicación normalizada (sin tildes, minúsculas) para los filtros por ubicación
+    location_key = Column(String, index=True, default=location_key_default)
+    # Coordenadas (grados decimales); índice espacial R*Tree (SQLite) o GiST (PostgreSQL)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
     user_id = Column(Integer, ForeignKey('users.id'))
+    # Versión del registro para los ETag: cada UPDATE la incrementa (onupdate)
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version") + 1)
     
     user = relationship("User", back_populates="experiences")
+
+    # Paginación por cursor ordenada por (price, id_experience)
+    __table_args__ = (Index("ix_experiences_price_id", "price", "id_experience"),)
+
+# Índice de texto completo (FTS5 / tsvector) sobre título y descripción
+event.listen(Base.metadata, "after_create", ensure_search_index)
+# Índice espacial de latitude/longitude
+event.listen(Base.metadata, "after_create", spatial_index_listener("experiences", "id_experience"))
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from app.database import Base
+
+class EstateOccupancy(Base):
+    """
+    Ocupación materializada: una fila por finca y noche ocupada por una reserva activa.
+    Los controladores de reservas la mantienen en la misma transacción de cada escritura;
+    al eliminar una reserva sus filas se borran en cascada.
+    """
+    __tablename__ = 'estate_occupancy'
+
+    # La llave primaria (estate_id, day) sirve el calendario con un solo recorrido de rango
+    estate_id = Column(Integer, ForeignKey('estates.id', ondelete='CASCADE'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    booking_id = Column(Integer, ForeignKey('bookings.id', ondelete='CASCADE'), nullable=False, index=True)
+    persons = Column(Integer, nullable=False)
+    status = Column(String, nullable=False)
+
+    # En SQLite la tabla se guarda en el propio árbol de la llave primaria (sin rowid)
+    __table_args__ = {"sqlite_with_rowid": False}
@@ -12,6 +12,8 @@ class User(Base):
     phone = Column(String(20), unique=True, nullable=True)
     hashed_password = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True)
+    # Generación de tokens: incrementarla revoca los tokens con claims emitidos antes
+    token_generation = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relación 1:1 con Profile
     profile = relationship("Profile", back_populates="user", uselist=False)
@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from app.database import get_db
+from app.utils.query_stats import query_budget
+from app.utils.pagination import set_next_cursor
+from app.utils.conditional import entity_tag, page_tag, is_conditional, is_not_modified, not_modified, set_validators
+from app.utils.export import stream_export
 from app.controllers.bookingController import BookingController
 from app.schemas.booking import (
     BookingCreate,
     BookingUpdate,
     BookingResponse,
-    BookingDetail
+    BookingDetail,
+    BookingBulkCreate,
+    BookingBulkCreateResponse,
+    BookingStatusBulkUpdate,
+    BookingStatusBulkResponse
 )
 
 router = APIRouter(
@@ -17,10 +25,10 @@ router = APIRouter(
 )
 
 
-@router.post("/", response_model=BookingResponse, status_code=status.HTTP_201_CREATED)
-def create_booking(
+@router.post("/", response_model=BookingResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(query_budget(3))])
+async def create_booking(
     booking_data: BookingCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Crear una nueva reserva
@@ -31,19 +39,61 @@ def create_booking(
     - **num_persons**: Número de personas
     - **user_id**: ID del usuario
     - **estate_id**: ID de la finca
+
+    Responde 409 si la finca ya tiene una reserva activa que se cruza con esas noches.
+    """
+    controller = BookingController(db)
+    return await controller.create_booking(booking_data)
+
+
+@router.post("/bulk", response_model=BookingBulkCreateResponse, dependencies=[Depends(query_budget(5))])
+async def create_bookings_bulk(
+    bulk_data: BookingBulkCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Crear varias reservas en una sola petición (máximo 500)
+
+    Todas se validan antes de escribir; los usuarios y fincas se verifican con una
+    sola consulta y las reservas válidas se insertan en una sola transacción.
+    Las que se cruzan con una reserva activa (o con otra anterior del mismo lote) se
+    reportan como fallidas.
+    La respuesta trae un resultado por elemento, en el mismo orden de `items`.
+    """
+    controller = BookingController(db)
+    return await controller.create_bookings_bulk(bulk_data.items)
+
+
+@router.patch("/status", response_model=BookingStatusBulkResponse, dependencies=[Depends(query_budget(5))])
+async def update_bookings_status(
+    status_data: BookingStatusBulkUpdate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Cambiar el estado de varias reservas a la vez (por ejemplo, confirmarlas)
+
+    - **ids**: IDs de las reservas (máximo 1000)
+    - **status**: Nuevo estado (pending, confirmed, cancelled)
+
+    La respuesta indica, por cada ID, si se actualizó, no se encontró o quedaría
+    cruzada con otra reserva activa de la finca.
     """
     controller = BookingController(db)
-    return controller.create_booking(booking_data)
+    return await controller.update_bookings_status(status_data.ids, status_data.status)
 
 
-@router.get("/", response_model=List[BookingResponse])
-def get_all_bookings(
+@router.get("/", response_model=List[BookingResponse], dependencies=[Depends(query_budget(1))])
+async def get_all_bookings(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Número de registros a saltar"),
     limit: int = Query(100, ge=1, le=1000, description="Límite de registros"),
     user_id: Optional[int] = Query(None, description="Filtrar por ID de usuario"),
     estate_id: Optional[int] = Query(None, description="Filtrar por ID de finca"),
     status_filter: Optional[str] = Query(None, description="Filtrar por estado", alias="status"),
-    db: Session = Depends(get_db)
+    sort: str = Query("id", description="Orden: id o start_date"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor)"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtener todas las reservas con filtros opcionales
@@ -52,40 +102,84 @@ def get_all_bookings(
     - **user_id**: Mostrar solo reservas de un usuario específico
     - **estate_id**: Mostrar solo reservas de una finca específica
     - **status**: Filtrar por estado (pending, confirmed, cancelled)
+
+    Paginación: si la página está llena, la respuesta incluye la cabecera
+    `X-Next-Cursor`; envíela como `cursor` para obtener la siguiente.
+
+    Incluye `ETag` (versiones de las reservas de la página); con `If-None-Match`
+    responde 304 sin cuerpo si la página no cambió.
     """
     controller = BookingController(db)
-    return controller.get_all_bookings(
+    bookings = await controller.get_all_bookings(
         skip=skip,
         limit=limit,
         user_id=user_id,
         estate_id=estate_id,
-        status_filter=status_filter
+        status_filter=status_filter,
+        sort=sort,
+        cursor=cursor
     )
+    etag = page_tag((booking.id, booking.version) for booking in bookings)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_validators(response, etag)
+    set_next_cursor(request, response, controller.keyset.next_cursor(bookings, sort, limit))
+    return bookings
+
+
+@router.get("/export", dependencies=[Depends(query_budget(1))])
+async def export_bookings(
+    request: Request,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="Formato: ndjson o csv"),
+    user_id: Optional[int] = Query(None, description="Filtrar por ID de usuario"),
+    estate_id: Optional[int] = Query(None, description="Filtrar por ID de finca"),
+    status_filter: Optional[str] = Query(None, description="Filtrar por estado", alias="status"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Exportar todas las reservas (NDJSON o CSV) con los mismos filtros del listado
 
+    Las filas se envían en streaming desde un cursor del servidor, sin cargar la
+    tabla en memoria. Con `Accept-Encoding: gzip` la respuesta se comprime al vuelo.
+    """
+    controller = BookingController(db)
+    stmt = controller.export_query(user_id=user_id, estate_id=estate_id, status_filter=status_filter)
+    return stream_export(request, stmt, fmt, "bookings")
 
-@router.get("/{booking_id}", response_model=BookingDetail)
-def get_booking_by_id(
+
+@router.get("/{booking_id}", response_model=BookingDetail, dependencies=[Depends(query_budget(2))])
+async def get_booking_by_id(
     booking_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtener una reserva específica por su ID
+
+    Incluye `ETag` (versión de la reserva). Con `If-None-Match` responde 304 sin
+    cuerpo si la reserva no cambió, consultando solo su versión.
     """
     controller = BookingController(db)
-    booking = controller.get_booking_by_id(booking_id)
+    if is_conditional(request):
+        version = await controller.get_booking_version(booking_id)
+        if version is not None and is_not_modified(request, entity_tag(booking_id, version)):
+            return not_modified(entity_tag(booking_id, version))
+    booking = await controller.get_booking_by_id(booking_id)
     if not booking:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Reserva no encontrada"
         )
+    set_validators(response, entity_tag(booking_id, booking.version))
     return booking
 
 
-@router.put("/{booking_id}", response_model=BookingResponse)
-def update_booking(
+@router.put("/{booking_id}", response_model=BookingResponse, dependencies=[Depends(query_budget(4))])
+async def update_booking(
     booking_id: int,
     booking_update: BookingUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Actualizar una reserva existente
@@ -96,44 +190,46 @@ def update_booking(
     - **end_date**: Nueva fecha de fin
     - **status**: Nuevo estado
     - **num_persons**: Nuevo número de personas
+
+    Responde 409 si las nuevas fechas se cruzan con otra reserva activa de la finca.
     """
     controller = BookingController(db)
-    return controller.update_booking(booking_id, booking_update)
+    return await controller.update_booking(booking_id, booking_update)
 
 
-@router.delete("/{booking_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_booking(
+@router.delete("/{booking_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(query_budget(1))])
+async def delete_booking(
     booking_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Eliminar una reserva
     """
     controller = BookingController(db)
-    controller.delete_booking(booking_id)
+    await controller.delete_booking(booking_id)
     return None
 
 
 # Endpoints adicionales para casos específicos
-@router.get("/user/{user_id}", response_model=List[BookingResponse])
-def get_user_bookings(
+@router.get("/user/{user_id}", response_model=List[BookingResponse], dependencies=[Depends(query_budget(1))])
+async def get_user_bookings(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtener todas las reservas de un usuario específico
     """
     controller = BookingController(db)
-    return controller.get_bookings_by_user(user_id)
+    return await controller.get_bookings_by_user(user_id)
 
 
-@router.get("/estate/{estate_id}", response_model=List[BookingResponse])
-def get_estate_bookings(
+@router.get("/estate/{estate_id}", response_model=List[BookingResponse], dependencies=[Depends(query_budget(1))])
+async def get_estate_bookings(
     estate_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtener todas las reservas de una finca específica
     """
     controller = BookingController(db)
-    return controller.get_bookings_by_estate(estate_id)
+    return await controller.get_bookings_by_estate(estate_id)
@@ -1,15 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 from app.database import get_db
+from app.utils.pagination import set_next_cursor
 from app.controllers.clientController import ClientController
 from app.schemas.client import ClientCreate, ClientUpdate, ClientResponse
 
 router = APIRouter(prefix="/clients", tags=["Clients"])
 
 @router.post("/", response_model=ClientResponse, status_code=status.HTTP_201_CREATED)
-def create_client(client: ClientCreate, db: Session = Depends(get_db)):
+async def create_client(client: ClientCreate, db: AsyncSession = Depends(get_db)):
     """
     Crear un nuevo cliente
     
@@ -20,32 +21,38 @@ def create_client(client: ClientCreate, db: Session = Depends(get_db)):
     - **password**: Contraseña del cliente
     """
     controller = ClientController(db)
-    return controller.create_client(client)
+    return await controller.create_client(client)
 
 @router.get("/", response_model=List[ClientResponse])
-def get_clients(
+async def get_clients(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtener lista de clientes con paginación
     
     - **skip**: Número de clientes a saltar (para paginación)
     - **limit**: Número máximo de clientes a retornar
+    - **cursor**: Cursor de la página siguiente (cabecera `X-Next-Cursor`)
     """
     controller = ClientController(db)
-    return controller.get_all_clients(skip=skip, limit=limit)
+    clients = await controller.get_all_clients(skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(request, response, controller.keyset.next_cursor(clients, limit=limit))
+    return clients
 
 @router.get("/{client_id}", response_model=ClientResponse)
-def get_client(client_id: int, db: Session = Depends(get_db)):
+async def get_client(client_id: int, db: AsyncSession = Depends(get_db)):
     """
     Obtener un cliente específico por ID
     
     - **client_id**: ID del cliente a buscar
     """
     controller = ClientController(db)
-    client = controller.get_client_by_id(client_id)
+    client = await controller.get_client_by_id(client_id)
     if not client:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -54,10 +61,10 @@ def get_client(client_id: int, db: Session = Depends(get_db)):
     return client
 
 @router.put("/{client_id}", response_model=ClientResponse)
-def update_client(
+async def update_client(
     client_id: int, 
     client_update: ClientUpdate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Actualizar un cliente existente
@@ -66,15 +73,15 @@ def update_client(
     - **client_update**: Datos del cliente a actualizar (campos opcionales)
     """
     controller = ClientController(db)
-    return controller.update_client(client_id, client_update)
+    return await controller.update_client(client_id, client_update)
 
 @router.delete("/{client_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_client(client_id: int, db: Session = Depends(get_db)):
+async def delete_client(client_id: int, db: AsyncSession = Depends(get_db)):
     """
     Eliminar un cliente (soft delete)
     
     - **client_id**: ID del cliente a eliminar
     """
     controller = ClientController(db)
-    controller.delete_client(client_id)
+    await controller.delete_client(client_id)
     return None
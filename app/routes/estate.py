@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from datetime import date
 
+from app.config import settings
 from app.database import get_db
+from app.utils.query_stats import query_budget
+from app.utils.export import stream_export
 from app.controllers.estateController import EstateController
-from app.schemas.estate import EstateCreate, EstateUpdate, EstateResponse
+from app.schemas.estate import EstateCreate, EstateUpdate, EstateResponse, EstateNearbyResponse, EstateFacetsResponse, EstateCalendarResponse
 
 router = APIRouter(prefix="/estates", tags=["estates"])
 
-@router.post("/", response_model=EstateResponse, status_code=status.HTTP_201_CREATED)
-def create_estate(estate_data: EstateCreate, db: Session = Depends(get_db)):
+@router.post("/", response_model=EstateResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(query_budget(1))])
+async def create_estate(estate_data: EstateCreate, db: AsyncSession = Depends(get_db)):
     """
     Crear una nueva finca
     
@@ -20,16 +24,20 @@ def create_estate(estate_data: EstateCreate, db: Session = Depends(get_db)):
     - **owner_id**: ID del propietario (usuario)
     """
     controller = EstateController(db)
-    return controller.create_estate(estate_data)
+    return await controller.create_estate(estate_data)
 
-@router.get("/", response_model=List[EstateResponse])
-def get_estates(
+@router.get("/", response_model=List[EstateResponse], dependencies=[Depends(query_budget(2))])
+async def get_estates(
+    request: Request,
     skip: int = Query(0, ge=0, description="Número de registros a saltar"),
     limit: int = Query(100, ge=1, le=1000, description="Límite de registros"),
     owner_id: Optional[int] = Query(None, description="Filtrar por ID del propietario"),
     min_price: Optional[int] = Query(None, ge=0, description="Precio mínimo"),
     max_price: Optional[int] = Query(None, ge=0, description="Precio máximo"),
-    db: Session = Depends(get_db)
+    location: Optional[str] = Query(None, description="Filtrar por ubicación (sin tildes, parcial o con errores de escritura)"),
+    sort: str = Query("id", description="Orden: id o price"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor)"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtener lista de fincas con paginación y filtros opcionales
@@ -38,37 +46,201 @@ def get_estates(
     - **owner_id**: Mostrar solo fincas de un propietario específico
     - **min_price**: Precio mínimo
     - **max_price**: Precio máximo
+    - **location**: Ubicación; "salento", "Salénto", "sal" y "Slento" encuentran "Salento"
+
+    Paginación: si la página está llena, la respuesta incluye la cabecera
+    `X-Next-Cursor`; envíela como `cursor` para obtener la siguiente.
+
+    Las páginas se sirven desde la caché de respuestas hasta la siguiente escritura de fincas,
+    con `ETag`; con `If-None-Match` responde 304 si la página no cambió.
     """
     controller = EstateController(db)
-    return controller.get_all_estates(
-        skip=skip,
-        limit=limit,
+
+    async def load():
+        estates = await controller.get_all_estates(
+            skip=skip,
+            limit=limit,
+            owner_id=owner_id,
+            min_price=min_price,
+            max_price=max_price,
+            sort=sort,
+            cursor=cursor,
+            location=location
+        )
+        return estates, controller.keyset.next_cursor(estates, sort, limit)
+
+    return await controller.responses.page(request, load)
+
+@router.get("/facets", response_model=EstateFacetsResponse, dependencies=[Depends(query_budget(2))])
+async def get_estate_facets(
+    owner_id: Optional[int] = Query(None, description="Filtrar por ID del propietario"),
+    min_price: Optional[int] = Query(None, ge=0, description="Precio mínimo"),
+    max_price: Optional[int] = Query(None, ge=0, description="Precio máximo"),
+    location: Optional[str] = Query(None, description="Filtrar por ubicación (sin tildes, parcial o con errores de escritura)"),
+    price_step: int = Query(settings.FACET_PRICE_STEP, ge=1, description="Ancho de los rangos de precio"),
+    size_step: int = Query(settings.FACET_SIZE_STEP, ge=1, description="Ancho de los rangos de tamaño (hectáreas)"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Agregados del listado de fincas para los mismos filtros de `GET /estates/`
+
+    - **total**: fincas que cumplen los filtros
+    - **price**: histograma de precios en rangos de `price_step`
+    - **size**: fincas por rango de tamaño de `size_step` hectáreas
+    - **locations**: fincas por ubicación, de la más a la menos frecuente
+
+    Los rangos vacíos no aparecen. Se calcula en una sola consulta y queda en caché
+    por conjunto de filtros hasta la siguiente escritura de fincas.
+    """
+    controller = EstateController(db)
+    return await controller.get_facets(
         owner_id=owner_id,
         min_price=min_price,
-        max_price=max_price
+        max_price=max_price,
+        location=location,
+        price_step=price_step,
+        size_step=size_step
+    )
+
+@router.get("/available", response_model=List[EstateResponse], dependencies=[Depends(query_budget(2))])
+async def get_available_estates(
+    start: date = Query(..., description="Fecha de llegada (YYYY-MM-DD)"),
+    end: date = Query(..., description="Fecha de salida (YYYY-MM-DD)"),
+    persons: int = Query(1, ge=1, description="Número de huéspedes"),
+    min_price: Optional[int] = Query(None, ge=0, description="Precio mínimo"),
+    max_price: Optional[int] = Query(None, ge=0, description="Precio máximo"),
+    skip: int = Query(0, ge=0, description="Número de registros a saltar"),
+    limit: int = Query(100, ge=1, le=1000, description="Límite de registros"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Fincas disponibles entre dos fechas para un número de huéspedes
+
+    Una finca está disponible si ninguna reserva activa (no cancelada) ocupa alguna
+    de las noches entre `start` y `end` (el día de salida queda libre) y su
+    capacidad admite `persons` huéspedes.
+    """
+    controller = EstateController(db)
+    return await controller.get_available_estates(
+        start=start,
+        end=end,
+        persons=persons,
+        min_price=min_price,
+        max_price=max_price,
+        skip=skip,
+        limit=limit
+    )
+
+@router.get("/export", dependencies=[Depends(query_budget(2))])
+async def export_estates(
+    request: Request,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="Formato: ndjson o csv"),
+    owner_id: Optional[int] = Query(None, description="Filtrar por ID del propietario"),
+    min_price: Optional[int] = Query(None, ge=0, description="Precio mínimo"),
+    max_price: Optional[int] = Query(None, ge=0, description="Precio máximo"),
+    location: Optional[str] = Query(None, description="Filtrar por ubicación (sin tildes, parcial o con errores de escritura)"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Exportar todas las fincas (NDJSON o CSV) con los mismos filtros del listado
+
+    Las filas se envían en streaming desde un cursor del servidor, sin cargar la
+    tabla en memoria. Con `Accept-Encoding: gzip` la respuesta se comprime al vuelo.
+    """
+    controller = EstateController(db)
+    location_keys = await controller.match_locations(location) if location else None
+    stmt = controller.export_query(
+        owner_id=owner_id, min_price=min_price, max_price=max_price, location_keys=location_keys
+    )
+    return stream_export(request, stmt, fmt, "estates")
+
+@router.get("/nearby", response_model=List[EstateNearbyResponse], dependencies=[Depends(query_budget(1))])
+async def get_nearby_estates(
+    lat: float = Query(..., ge=-90, le=90, description="Latitud del punto de búsqueda"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitud del punto de búsqueda"),
+    radius_km: float = Query(10.0, gt=0, le=settings.NEARBY_MAX_RADIUS_KM, description="Radio en km"),
+    skip: int = Query(0, ge=0, description="Número de registros a saltar"),
+    limit: int = Query(100, ge=1, le=1000, description="Límite de registros"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Fincas a `radius_km` o menos del punto, de la más cercana a la más lejana
+
+    Cada finca incluye `distance_km`. Las fincas sin coordenadas no aparecen
+    (se geocodifican desde el nomenclátor con `python -m app geocode`).
+    """
+    controller = EstateController(db)
+    return await controller.get_nearby_estates(lat, lon, radius_km, skip=skip, limit=limit)
+
+@router.get("/within", response_model=List[EstateNearbyResponse], dependencies=[Depends(query_budget(1))])
+async def get_estates_in_box(
+    min_lat: float = Query(..., ge=-90, le=90, description="Latitud sur"),
+    min_lon: float = Query(..., ge=-180, le=180, description="Longitud oeste"),
+    max_lat: float = Query(..., ge=-90, le=90, description="Latitud norte"),
+    max_lon: float = Query(..., ge=-180, le=180, description="Longitud este"),
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Latitud de referencia para ordenar"),
+    lon: Optional[float] = Query(None, ge=-180, le=180, description="Longitud de referencia para ordenar"),
+    skip: int = Query(0, ge=0, description="Número de registros a saltar"),
+    limit: int = Query(100, ge=1, le=1000, description="Límite de registros"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Fincas dentro de una caja de coordenadas (por ejemplo, el área visible de un mapa)
+
+    Se ordenan por distancia a (`lat`, `lon`) o, si no vienen, al centro de la caja.
+    """
+    controller = EstateController(db)
+    return await controller.get_estates_in_box(
+        min_lat, min_lon, max_lat, max_lon, lat=lat, lon=lon, skip=skip, limit=limit
     )
 
-@router.get("/{estate_id}", response_model=EstateResponse)
-def get_estate(estate_id: int, db: Session = Depends(get_db)):
+@router.get("/{estate_id}", response_model=EstateResponse, dependencies=[Depends(query_budget(2))])
+async def get_estate(estate_id: int, request: Request, db: AsyncSession = Depends(get_db)):
     """
     Obtener una finca específica por ID
     
     - **estate_id**: ID de la finca a buscar
+
+    Incluye `ETag` (versión de la finca). Con `If-None-Match` responde 304 sin cuerpo
+    si la finca no cambió, consultando solo su versión.
     """
     controller = EstateController(db)
-    estate = controller.get_estate_by_id(estate_id)
-    if not estate:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Finca no encontrada"
-        )
-    return estate
 
-@router.put("/{estate_id}", response_model=EstateResponse)
-def update_estate(
+    async def load():
+        estate = await controller.get_estate_by_id(estate_id)
+        if not estate:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Finca no encontrada"
+            )
+        return estate
+
+    return await controller.responses.item(
+        request, estate_id, load, version=lambda: controller.get_estate_version(estate_id)
+    )
+
+@router.get("/{estate_id}/calendar", response_model=EstateCalendarResponse, dependencies=[Depends(query_budget(1))])
+async def get_estate_calendar(
+    estate_id: int,
+    start: date = Query(..., alias="from", description="Primer día (YYYY-MM-DD)"),
+    end: date = Query(..., alias="to", description="Último día, inclusive (YYYY-MM-DD)"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Calendario de ocupación de una finca
+
+    Devuelve las noches ocupadas por reservas activas entre `from` y `to` (máximo
+    dos años), con los huéspedes y el estado de la reserva de cada noche. Las noches
+    que no aparecen están libres.
+    """
+    controller = EstateController(db)
+    return await controller.get_calendar(estate_id, start, end)
+
+@router.put("/{estate_id}", response_model=EstateResponse, dependencies=[Depends(query_budget(1))])
+async def update_estate(
     estate_id: int,
     estate_data: EstateUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Actualizar una finca existente
@@ -79,26 +251,26 @@ def update_estate(
     Solo se actualizarán los campos que se envíen en el request.
     """
     controller = EstateController(db)
-    return controller.update_estate(estate_id, estate_data)
+    return await controller.update_estate(estate_id, estate_data)
 
-@router.delete("/{estate_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_estate(estate_id: int, db: Session = Depends(get_db)):
+@router.delete("/{estate_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(query_budget(1))])
+async def delete_estate(estate_id: int, db: AsyncSession = Depends(get_db)):
     """
     Eliminar una finca
     
     - **estate_id**: ID de la finca a eliminar
     """
     controller = EstateController(db)
-    controller.delete_estate(estate_id)
+    await controller.delete_estate(estate_id)
     return None
 
-@router.get("/owner/{owner_id}", response_model=List[EstateResponse])
-def get_estates_by_owner(owner_id: int, db: Session = Depends(get_db)):
+@router.get("/owner/{owner_id}", response_model=List[EstateResponse], dependencies=[Depends(query_budget(1))])
+async def get_estates_by_owner(owner_id: int, db: AsyncSession = Depends(get_db)):
     """
     Obtener todas las fincas de un propietario específico
     
     - **owner_id**: ID del propietario
     """
     controller = EstateController(db)
-    return controller.get_estates_by_owner(owner_id)
+    return await controller.get_estates_by_owner(owner_id)
 
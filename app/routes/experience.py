@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
+from app.config import settings
 from app.database import get_db
+from app.utils.query_stats import query_budget
+from app.utils.export import stream_export
 from app.controllers.experienceController import ExperienceController
-from app.schemas.experience import ExperienceCreate, ExperienceUpdate, ExperienceResponse, ExperienceWithUser
+from app.schemas.experience import ExperienceCreate, ExperienceUpdate, ExperienceResponse, ExperienceSearchResult, ExperienceNearbyResult, ExperienceWithUser
 
 router = APIRouter(prefix="/experiences", tags=["experiences"])
 
-@router.post("/", response_model=ExperienceResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=ExperienceResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(query_budget(1))])
 async def create_experience(experience_data: ExperienceCreate, db: AsyncSession = Depends(get_db)):
     """
     Crear una nueva experiencia
@@ -24,10 +27,13 @@ async def create_experience(experience_data: ExperienceCreate, db: AsyncSession
     controller = ExperienceController(db)
     return await controller.create_experience(experience_data)
 
-@router.get("/", response_model=List[ExperienceResponse])
+@router.get("/", response_model=List[ExperienceResponse], dependencies=[Depends(query_budget(1))])
 async def get_experiences(
+    request: Request,
     skip: int = Query(0, ge=0, description="Número de experiencias a saltar"),
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de experiencias a retornar"),
+    sort: str = Query("id", description="Orden: id o price"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor)"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -35,27 +41,85 @@ async def get_experiences(
     
     - **skip**: Número de experiencias a saltar (para paginación)
     - **limit**: Número máximo de experiencias a retornar
+    - **cursor**: Cursor de la página siguiente (cabecera `X-Next-Cursor`)
+
+    Las páginas se sirven desde la caché de respuestas hasta la siguiente escritura de
+    experiencias, con `ETag`; con `If-None-Match` responde 304 si la página no cambió.
     """
     controller = ExperienceController(db)
-    return await controller.get_all_experiences(skip=skip, limit=limit)
 
-@router.get("/{experience_id}", response_model=ExperienceResponse)
-async def get_experience(experience_id: int, db: AsyncSession = Depends(get_db)):
+    async def load():
+        experiences = await controller.get_all_experiences(skip=skip, limit=limit, sort=sort, cursor=cursor)
+        return experiences, controller.keyset.next_cursor(experiences, sort, limit)
+
+    return await controller.responses.page(request, load)
+
+@router.get("/export", dependencies=[Depends(query_budget(2))])
+async def export_experiences(
+    request: Request,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="Formato: ndjson o csv"),
+    user_id: Optional[int] = Query(None, description="Filtrar por ID del usuario"),
+    location: Optional[str] = Query(None, description="Filtrar por ubicación (sin tildes, parcial o con errores de escritura)"),
+    min_price: Optional[int] = Query(None, ge=0, description="Precio mínimo"),
+    max_price: Optional[int] = Query(None, ge=0, description="Precio máximo"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Exportar todas las experiencias (NDJSON o CSV) con filtros opcionales
+
+    Las filas se envían en streaming desde un cursor del servidor, sin cargar la
+    tabla en memoria. Con `Accept-Encoding: gzip` la respuesta se comprime al vuelo.
+    """
+    controller = ExperienceController(db)
+    location_keys = await controller.match_locations(location) if location else None
+    stmt = controller.export_query(
+        user_id=user_id, location_keys=location_keys, min_price=min_price, max_price=max_price
+    )
+    return stream_export(request, stmt, fmt, "experiences")
+
+@router.get("/nearby", response_model=List[ExperienceNearbyResult], dependencies=[Depends(query_budget(1))])
+async def get_nearby_experiences(
+    lat: float = Query(..., ge=-90, le=90, description="Latitud del punto de búsqueda"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitud del punto de búsqueda"),
+    radius_km: float = Query(10.0, gt=0, le=settings.NEARBY_MAX_RADIUS_KM, description="Radio en km"),
+    skip: int = Query(0, ge=0, description="Número de experiencias a saltar"),
+    limit: int = Query(100, ge=1, le=1000, description="Número máximo de experiencias a retornar"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Experiencias a `radius_km` o menos del punto, de la más cercana a la más lejana
+
+    Cada experiencia incluye `distance_km`.
+    """
+    controller = ExperienceController(db)
+    return await controller.get_nearby_experiences(lat, lon, radius_km, skip=skip, limit=limit)
+
+@router.get("/{experience_id}", response_model=ExperienceResponse, dependencies=[Depends(query_budget(2))])
+async def get_experience(experience_id: int, request: Request, db: AsyncSession = Depends(get_db)):
     """
     Obtener una experiencia específica por ID
     
     - **experience_id**: ID de la experiencia a buscar
+
+    Incluye `ETag` (versión de la experiencia). Con `If-None-Match` responde 304 sin
+    cuerpo si la experiencia no cambió, consultando solo su versión.
     """
     controller = ExperienceController(db)
-    experience = await controller.get_experience_by_id(experience_id)
-    if not experience:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Experiencia no encontrada"
-        )
-    return experience
 
-@router.get("/{experience_id}/with-user", response_model=ExperienceWithUser)
+    async def load():
+        experience = await controller.get_experience_by_id(experience_id)
+        if not experience:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Experiencia no encontrada"
+            )
+        return experience
+
+    return await controller.responses.item(
+        request, experience_id, load, version=lambda: controller.get_experience_version(experience_id)
+    )
+
+@router.get("/{experience_id}/with-user", response_model=ExperienceWithUser, dependencies=[Depends(query_budget(2))])
 async def get_experience_with_user(experience_id: int, db: AsyncSession = Depends(get_db)):
     """
     Obtener una experiencia con información del usuario
@@ -71,7 +135,7 @@ async def get_experience_with_user(experience_id: int, db: AsyncSession = Depend
         )
     return experience
 
-@router.put("/{experience_id}", response_model=ExperienceResponse)
+@router.put("/{experience_id}", response_model=ExperienceResponse, dependencies=[Depends(query_budget(1))])
 async def update_experience(
     experience_id: int, 
     experience_data: ExperienceUpdate, 
@@ -86,7 +150,7 @@ async def update_experience(
     controller = ExperienceController(db)
     return await controller.update_experience(experience_id, experience_data)
 
-@router.delete("/{experience_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{experience_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(query_budget(1))])
 async def delete_experience(experience_id: int, db: AsyncSession = Depends(get_db)):
     """
     Eliminar una experiencia
@@ -97,7 +161,7 @@ async def delete_experience(experience_id: int, db: AsyncSession = Depends(get_d
     await controller.delete_experience(experience_id)
     return None
 
-@router.get("/user/{user_id}", response_model=List[ExperienceResponse])
+@router.get("/user/{user_id}", response_model=List[ExperienceResponse], dependencies=[Depends(query_budget(1))])
 async def get_experiences_by_user(
     user_id: int,
     skip: int = Query(0, ge=0, description="Número de experiencias a saltar"),
@@ -114,7 +178,7 @@ async def get_experiences_by_user(
     controller = ExperienceController(db)
     return await controller.get_experiences_by_user(user_id, skip=skip, limit=limit)
 
-@router.get("/location/{location}", response_model=List[ExperienceResponse])
+@router.get("/location/{location}", response_model=List[ExperienceResponse], dependencies=[Depends(query_budget(2))])
 async def get_experiences_by_location(
     location: str,
     skip: int = Query(0, ge=0, description="Número de experiencias a saltar"),
@@ -124,14 +188,15 @@ async def get_experiences_by_location(
     """
     Obtener experiencias por ubicación
     
-    - **location**: Ubicación a buscar (búsqueda parcial)
+    - **location**: Ubicación a buscar, sin distinguir tildes ni mayúsculas, parcial
+      o con errores de escritura ("Salénto", "sal" y "Slento" encuentran "Salento")
     - **skip**: Número de experiencias a saltar (para paginación)
     - **limit**: Número máximo de experiencias a retornar
     """
     controller = ExperienceController(db)
     return await controller.get_experiences_by_location(location, skip=skip, limit=limit)
 
-@router.get("/price/range", response_model=List[ExperienceResponse])
+@router.get("/price/range", response_model=List[ExperienceResponse], dependencies=[Depends(query_budget(1))])
 async def get_experiences_by_price_range(
     min_price: int = Query(..., ge=0, description="Precio mínimo"),
     max_price: int = Query(..., ge=0, description="Precio máximo"),
@@ -156,7 +221,7 @@ async def get_experiences_by_price_range(
     controller = ExperienceController(db)
     return await controller.get_experiences_by_price_range(min_price, max_price, skip=skip, limit=limit)
 
-@router.get("/search/{query}", response_model=List[ExperienceResponse])
+@router.get("/search/{query}", response_model=List[ExperienceSearchResult], dependencies=[Depends(query_budget(1))])
 async def search_experiences(
     query: str,
     skip: int = Query(0, ge=0, description="Número de experiencias a saltar"),
@@ -164,7 +229,11 @@ async def search_experiences(
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Buscar experiencias por título o descripción
+    Buscar experiencias por título o descripción (texto completo)
+    
+    Retorna las experiencias que contienen todas las palabras (como prefijo, sin
+    distinguir tildes ni mayúsculas), de la más a la menos relevante, con un
+    fragmento (`snippet`) que resalta las coincidencias con `<mark>`.
     
     - **query**: Término de búsqueda
     - **skip**: Número de experiencias a saltar (para paginación)
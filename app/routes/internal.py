@@ -0,0 +1,86 @@
+import ipaddress
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+
+from app.utils.pool_metrics import all_pool_metrics
+from app.utils.write_coordinator import write_coordinator
+from app.utils.availability import availability_index
+from app.controllers.estateController import EstateController
+from app.controllers.experienceController import ExperienceController
+from app.utils.user_cache import user_cache, token_states
+from app.utils.auth import verified_tokens
+from app.utils.password_hasher import password_hasher
+
+def require_loopback(request: Request):
+    """
+    Los endpoints internos publican el estado de pools, colas y cachés del worker: solo se
+    atienden desde la misma máquina (localhost). 404 para el resto, sin revelar que existen.
+    """
+    host = request.client.host if request.client else None
+    try:
+        allowed = host is not None and ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        allowed = False
+    if not allowed:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+router = APIRouter(
+    prefix="/internal", tags=["internal"], include_in_schema=False, dependencies=[Depends(require_loopback)]
+)
+
+@router.get("/pool", response_model=dict)
+async def get_pool_metrics():
+    """
+    Métricas del pool de conexiones de este worker
+    
+    Para cada engine: conexiones en uso (checked_out), overflow,
+    timeouts y tiempos de espera acumulados para obtener una conexión.
+    """
+    return {"pools": all_pool_metrics()}
+
+@router.get("/writes", response_model=dict)
+async def get_write_coordinator_stats():
+    """
+    Estado del escritor único (group commit) de este worker
+
+    Lotes confirmados, operaciones totales y tamaño medio de lote.
+    """
+    return {"write_coordinator": write_coordinator.stats()}
+
+@router.get("/availability", response_model=dict)
+async def get_availability_index_stats():
+    """
+    Estado del índice de disponibilidad en memoria de este worker
+
+    Si está cargado, número de fincas y reservas activas, duración de la última carga
+    y consultas atendidas.
+    """
+    return {"availability_index": availability_index.stats()}
+
+@router.get("/password-hashing", response_model=dict)
+async def get_password_hasher_stats():
+    """
+    Estado del pool de bcrypt de este worker
+
+    Hashes en curso o en espera, máximo observado, completados, rechazados con 429
+    y duración media de un hash.
+    """
+    return {"password_hasher": password_hasher.stats()}
+
+@router.get("/caches", response_model=dict)
+async def get_cache_stats():
+    """
+    Estado de las cachés en memoria de este worker
+
+    Entradas, aciertos, fallos, descartes y tasa de aciertos; en las cachés de respuestas,
+    también las peticiones que esperaron una carga en curso (coalesced) y las cargas
+    descartadas por una escritura simultánea (discarded).
+    """
+    return {
+        "estate_facets": EstateController.facets_cache.stats(),
+        "estate_responses": EstateController.responses.stats(),
+        "experience_responses": ExperienceController.responses.stats(),
+        "users": user_cache.stats(),
+        "token_states": token_states.stats(),
+        "verified_tokens": verified_tokens.stats(),
+    }
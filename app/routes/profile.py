@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 from app.database import get_db
+from app.utils.pagination import set_next_cursor
+from app.utils.conditional import entity_tag, page_tag, is_conditional, is_not_modified, not_modified, set_validators
 from app.controllers.profileController import ProfileController
 from app.schemas.profile_schema import ProfileCreate, ProfileUpdate, ProfileResponse
 
@@ -10,7 +12,7 @@ router = APIRouter(prefix="/profiles", tags=["profiles"])
 
 
 @router.post("/", response_model=ProfileResponse, status_code=status.HTTP_201_CREATED)
-def create_profile(profile_data: ProfileCreate, db: Session = Depends(get_db)):
+async def create_profile(profile_data: ProfileCreate, db: AsyncSession = Depends(get_db)):
     """
     Crear un nuevo perfil
     
@@ -20,48 +22,74 @@ def create_profile(profile_data: ProfileCreate, db: Session = Depends(get_db)):
     - **birthdate**: Fecha de nacimiento
     """
     controller = ProfileController(db)
-    return controller.create_profile(profile_data)
+    return await controller.create_profile(profile_data)
 
 
 @router.get("/", response_model=List[ProfileResponse])
-def get_profiles(
+async def get_profiles(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtener lista de perfiles con paginación
     
     - **skip**: Número de perfiles a saltar (para paginación)
     - **limit**: Número máximo de perfiles a retornar
+    - **cursor**: Cursor de la página siguiente (cabecera `X-Next-Cursor`)
+
+    Incluye `ETag` y `Last-Modified` (fechas de actualización de los perfiles de la
+    página); con `If-None-Match` o `If-Modified-Since` responde 304 si no cambió.
     """
     controller = ProfileController(db)
-    return controller.get_all_profiles(skip=skip, limit=limit)
+    profiles = await controller.get_all_profiles(skip=skip, limit=limit, cursor=cursor)
+    etag = page_tag((profile.id_profile, profile.updated_at) for profile in profiles)
+    last_modified = max((profile.updated_at for profile in profiles if profile.updated_at), default=None)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
+    set_next_cursor(request, response, controller.keyset.next_cursor(profiles, limit=limit))
+    return profiles
 
 
 @router.get("/{profile_id}", response_model=ProfileResponse)
-def get_profile(profile_id: int, db: Session = Depends(get_db)):
+async def get_profile(profile_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """
     Obtener un perfil específico por ID
     
     - **profile_id**: ID del perfil a buscar
+
+    Incluye `ETag` y `Last-Modified` (fecha de actualización del perfil). Con
+    `If-None-Match` o `If-Modified-Since` responde 304 sin cuerpo si el perfil no
+    cambió, consultando solo esa fecha.
     """
     controller = ProfileController(db)
-    profile = controller.get_profile_by_id(profile_id)
+    if is_conditional(request):
+        found = await controller.get_profile_updated_at(profile_id)
+        if found is not None:
+            updated_at = found[0]
+            etag = entity_tag(profile_id, updated_at)
+            if is_not_modified(request, etag, updated_at):
+                return not_modified(etag, updated_at)
+    profile = await controller.get_profile_by_id(profile_id)
     
     if not profile:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Perfil no encontrado"
         )
+    set_validators(response, entity_tag(profile_id, profile.updated_at), profile.updated_at)
     return profile
 
 
 @router.put("/{profile_id}", response_model=ProfileResponse)
-def update_profile(
+async def update_profile(
     profile_id: int,
     profile_data: ProfileUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Actualizar un perfil existente
@@ -70,16 +98,16 @@ def update_profile(
     - **profile_data**: Datos del perfil a actualizar
     """
     controller = ProfileController(db)
-    return controller.update_profile(profile_id, profile_data)
+    return await controller.update_profile(profile_id, profile_data)
 
 
 @router.delete("/{profile_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_profile(profile_id: int, db: Session = Depends(get_db)):
+async def delete_profile(profile_id: int, db: AsyncSession = Depends(get_db)):
     """
     Eliminar un perfil (soft delete)
     
     - **profile_id**: ID del perfil a eliminar
     """
     controller = ProfileController(db)
-    controller.delete_profile(profile_id)
+    await controller.delete_profile(profile_id)
     return None
@@ -1,15 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 from app.database import get_db
+from app.utils.pagination import set_next_cursor
 from app.controllers.userController import UserController
 from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserLogin
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Crear un nuevo usuario
     
@@ -20,32 +21,38 @@ def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
     - **password**: Contraseña del usuario
     """
     controller = UserController(db)
-    return controller.create_user(user_data)
+    return await controller.create_user(user_data)
 
 @router.get("/", response_model=List[UserResponse])
-def get_users(
+async def get_users(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtener lista de usuarios con paginación
     
     - **skip**: Número de usuarios a saltar (para paginación)
     - **limit**: Número máximo de usuarios a retornar
+    - **cursor**: Cursor de la página siguiente (cabecera `X-Next-Cursor`)
     """
     controller = UserController(db)
-    return controller.get_all_users(skip=skip, limit=limit)
+    users = await controller.get_all_users(skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(request, response, controller.keyset.next_cursor(users, limit=limit))
+    return users
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Obtener un usuario específico por ID
     
     - **user_id**: ID del usuario a buscar
     """
     controller = UserController(db)
-    user = controller.get_user_by_id(user_id)
+    user = await controller.get_user_by_id(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -54,10 +61,10 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
     return user
 
 @router.put("/{user_id}", response_model=UserResponse)
-def update_user(
+async def update_user(
     user_id: int, 
     user_data: UserUpdate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Actualizar un usuario existente
@@ -66,21 +73,21 @@ def update_user(
     - **user_data**: Datos del usuario a actualizar (campos opcionales)
     """
     controller = UserController(db)
-    return controller.update_user(user_id, user_data)
+    return await controller.update_user(user_id, user_data)
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: int, db: Session = Depends(get_db)):
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Eliminar un usuario (soft delete)
     
     - **user_id**: ID del usuario a eliminar
     """
     controller = UserController(db)
-    controller.delete_user(user_id)
+    await controller.delete_user(user_id)
     return None
 
 @router.post("/login")
-def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
+async def login_user(login_data: UserLogin, db: AsyncSession = Depends(get_db)):
     """
     Autenticar usuario y obtener token de acceso
     
@@ -88,17 +95,17 @@ def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
     - **password**: Contraseña del usuario
     """
     controller = UserController(db)
-    return controller.login_user(login_data)
+    return await controller.login_user(login_data)
 
 @router.get("/username/{username}", response_model=UserResponse)
-def get_user_by_username(username: str, db: Session = Depends(get_db)):
+async def get_user_by_username(username: str, db: AsyncSession = Depends(get_db)):
     """
     Obtener usuario por nombre de usuario
     
     - **username**: Nombre de usuario a buscar
     """
     controller = UserController(db)
-    user = controller.get_user_by_username_response(username)
+    user = await controller.get_user_by_username_response(username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class Token(BaseModel):
@@ -12,6 +12,14 @@ class TokenData(BaseModel):
     username: Optional[str] = None
     user_id: Optional[int] = None
 
+class TokenClaims(BaseModel):
+    """Usuario autorizado por require_claims_roles/require_active_claims (desde los claims del token)"""
+    user_id: int
+    username: str
+    is_active: bool
+    roles: List[str]
+    generation: Optional[int] = None
+
 class LoginRequest(BaseModel):
     username: str
     password: str
@@ -1,10 +1,23 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
 from datetime import date
 
+from app.config import settings
+
+def check_date_range(start_date: Optional[date], end_date: Optional[date]):
+    """
+    La reserva ocupa las noches [start_date, end_date): la salida debe ser posterior a la
+    llegada y la estadía no puede superar MAX_BOOKING_NIGHTS noches
+    """
+    if start_date is not None and end_date is not None:
+        if end_date <= start_date:
+            raise ValueError("La fecha de fin debe ser posterior a la fecha de inicio")
+        if (end_date - start_date).days > settings.MAX_BOOKING_NIGHTS:
+            raise ValueError(f"La reserva admite como máximo {settings.MAX_BOOKING_NIGHTS} noches")
+
 class BookingBase(BaseModel):
-    start_date: str = Field(..., description="Fecha de inicio de la reserva (YYYY-MM-DD)")
-    end_date: str = Field(..., description="Fecha de fin de la reserva (YYYY-MM-DD)")
+    start_date: date = Field(..., description="Fecha de inicio de la reserva (YYYY-MM-DD)")
+    end_date: date = Field(..., description="Fecha de fin de la reserva, día de salida (YYYY-MM-DD)")
     status: str = Field(..., description="Estado de la reserva (pending, confirmed, cancelled)")
     num_persons: int = Field(..., gt=0, description="Número de personas")
     estate_id: int = Field(..., description="ID de la finca")
@@ -12,15 +25,26 @@ class BookingBase(BaseModel):
 class BookingCreate(BookingBase):
     user_id: int = Field(..., description="ID del usuario que hace la reserva")
 
+    @model_validator(mode="after")
+    def validate_dates(self):
+        check_date_range(self.start_date, self.end_date)
+        return self
+
 class BookingUpdate(BaseModel):
-    start_date: Optional[str] = None
-    end_date: Optional[str] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
     status: Optional[str] = None
     num_persons: Optional[int] = Field(None, gt=0)
 
+    @model_validator(mode="after")
+    def validate_dates(self):
+        check_date_range(self.start_date, self.end_date)
+        return self
+
 class BookingResponse(BookingBase):
     id: int
     user_id: int
+    version: int = Field(1, description="Versión del registro; cambia con cada actualización (ETag)")
     
     class Config:
         from_attributes = True
@@ -30,3 +54,32 @@ class BookingDetail(BookingResponse):
     # user: Optional[UserResponse] = None
     # estate: Optional[EstateResponse] = None
     pass
+
+# Operaciones por lote
+class BookingBulkCreate(BaseModel):
+    items: List[BookingCreate] = Field(..., min_length=1, max_length=500, description="Reservas a crear (máximo 500)")
+
+class BookingBulkItemResult(BaseModel):
+    index: int = Field(..., description="Posición del elemento en la petición")
+    ok: bool
+    booking: Optional[BookingResponse] = None
+    error: Optional[str] = None
+
+class BookingBulkCreateResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BookingBulkItemResult]
+
+class BookingStatusBulkUpdate(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000, description="IDs de las reservas (máximo 1000)")
+    status: str = Field(..., description="Nuevo estado (pending, confirmed, cancelled)")
+
+class BookingStatusResult(BaseModel):
+    id: int
+    ok: bool
+    error: Optional[str] = None
+
+class BookingStatusBulkResponse(BaseModel):
+    updated: int
+    failed: int
+    results: List[BookingStatusResult]
@@ -1,26 +1,89 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+from datetime import date
+
+def check_coordinates(model: BaseModel):
+    """Latitud y longitud van juntas: las dos o ninguna (sin ninguna, las del municipio)"""
+    given = {"latitude", "longitude"} & model.model_fields_set
+    if len(given) == 1 or (model.latitude is None) != (model.longitude is None):
+        raise ValueError("La latitud y la longitud deben venir juntas")
 
 class EstateBase(BaseModel):
     name: str = Field(..., description="Nombre de la finca")
     location: str = Field(..., description="Ubicación de la finca")
     size: int = Field(..., gt=0, description="Tamaño de la finca en hectáreas")
     price: int = Field(..., gt=0, description="Precio de la finca")
+    capacity: Optional[int] = Field(None, gt=0, description="Máximo de huéspedes por reserva")
+    latitude: Optional[float] = Field(None, ge=-90, le=90, description="Latitud (si no viene, la del municipio)")
+    longitude: Optional[float] = Field(None, ge=-180, le=180, description="Longitud (si no viene, la del municipio)")
 
 class EstateCreate(EstateBase):
     owner_id: int = Field(..., description="ID del propietario (usuario)")
 
+    @model_validator(mode="after")
+    def validate_coordinates(self):
+        check_coordinates(self)
+        return self
+
 class EstateUpdate(BaseModel):
     name: Optional[str] = Field(None, description="Nombre de la finca")
     location: Optional[str] = Field(None, description="Ubicación de la finca")
     size: Optional[int] = Field(None, gt=0, description="Tamaño de la finca en hectáreas")
     price: Optional[int] = Field(None, gt=0, description="Precio de la finca")
+    capacity: Optional[int] = Field(None, gt=0, description="Máximo de huéspedes por reserva")
+    latitude: Optional[float] = Field(None, ge=-90, le=90, description="Latitud")
+    longitude: Optional[float] = Field(None, ge=-180, le=180, description="Longitud")
     owner_id: Optional[int] = Field(None, description="ID del propietario")
 
+    @model_validator(mode="after")
+    def validate_coordinates(self):
+        check_coordinates(self)
+        return self
+
 class EstateResponse(EstateBase):
     id: int
     owner_id: int
+    version: int = Field(1, description="Versión del registro; cambia con cada actualización (ETag)")
     
     class Config:
         from_attributes = True
 
+class EstateNearbyResponse(EstateResponse):
+    """Finca de una búsqueda por cercanía"""
+    distance_km: float = Field(0.0, description="Distancia al punto de búsqueda en km")
+
+
+# Facetas del listado
+class FacetBucket(BaseModel):
+    start: int = Field(..., description="Límite inferior del rango (incluido)")
+    end: int = Field(..., description="Límite superior del rango (excluido)")
+    count: int
+
+class LocationFacet(BaseModel):
+    location: str = Field(..., description="Ubicación tal como se registró")
+    location_key: str = Field(..., description="Ubicación normalizada; sirve como filtro `location`")
+    count: int
+
+class EstateFacetsResponse(BaseModel):
+    total: int = Field(..., description="Fincas que cumplen los filtros")
+    price: List[FacetBucket] = Field(..., description="Histograma de precios")
+    size: List[FacetBucket] = Field(..., description="Fincas por rango de tamaño (hectáreas)")
+    locations: List[LocationFacet] = Field(..., description="Fincas por ubicación, de la más a la menos frecuente")
+
+
+# Calendario de ocupación
+class EstateCalendarDay(BaseModel):
+    day: date = Field(..., description="Noche ocupada")
+    persons: int = Field(..., description="Huéspedes de la reserva")
+    status: str = Field(..., description="Estado de la reserva (pending, confirmed)")
+    booking_id: int
+
+class EstateCalendarResponse(BaseModel):
+    estate_id: int
+    start: date = Field(..., alias="from")
+    end: date = Field(..., alias="to")
+    capacity: Optional[int] = Field(None, description="Máximo de huéspedes por reserva")
+    days: List[EstateCalendarDay] = Field(..., description="Noches ocupadas; las que no aparecen están libres")
+
+    class Config:
+        populate_by_name = True
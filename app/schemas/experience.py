@@ -1,7 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional
 from datetime import datetime
 
+from app.schemas.estate import check_coordinates
+
 class ExperienceBase(BaseModel):
     title: str
     description: str
@@ -10,9 +12,15 @@ class ExperienceBase(BaseModel):
     price: int
     location: str
     user_id: int
+    # Si no vienen, las coordenadas del municipio de la ubicación
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class ExperienceCreate(ExperienceBase):
-    pass
+    @model_validator(mode="after")
+    def validate_coordinates(self):
+        check_coordinates(self)
+        return self
 
 class ExperienceUpdate(BaseModel):
     title: Optional[str] = None
@@ -22,14 +30,31 @@ class ExperienceUpdate(BaseModel):
     price: Optional[int] = None
     location: Optional[str] = None
     user_id: Optional[int] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+
+    @model_validator(mode="after")
+    def validate_coordinates(self):
+        check_coordinates(self)
+        return self
 
 class ExperienceResponse(ExperienceBase):
     id_experience: int
     created_at: Optional[datetime] = None
+    version: int = Field(1, description="Versión del registro; cambia con cada actualización (ETag)")
     
     class Config:
         from_attributes = True
 
+class ExperienceSearchResult(ExperienceResponse):
+    """Resultado de la búsqueda de texto completo"""
+    snippet: Optional[str] = None
+    rank: float = 0.0
+
+class ExperienceNearbyResult(ExperienceResponse):
+    """Experiencia de una búsqueda por cercanía"""
+    distance_km: float = 0.0
+
 class ExperienceWithUser(ExperienceResponse):
     """Experiencia con información del usuario"""
     user: Optional[dict] = None
@@ -1,8 +1,16 @@
 import bcrypt
+import hashlib
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from jose import jwt, JWTError
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
 from app.config import settings
+from app.utils.cache import TTLCache
+
+# Payloads de tokens ya verificados por resumen del token; cada entrada vence con el exp del token
+verified_tokens = TTLCache(settings.TOKEN_VERIFY_CACHE_SIZE, settings.TOKEN_VERIFY_CACHE_TTL_SECONDS)
 
 def _truncate_password_to_bytes(password: str) -> bytes:
     """Trunca la contraseña a 72 bytes máximo para bcrypt"""
@@ -46,13 +54,43 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _signing_key(settings.SECRET_KEY, settings.ALGORITHM), algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+@lru_cache(maxsize=4)
+def _signing_key(secret: str, algorithm: str) -> Key:
+    """Llave ya construida (una vez por clave y algoritmo) en lugar de hacerlo en cada firma o verificación"""
+    return jwk.construct(secret, algorithm)
+
 def verify_token(token: str):
-    """Verifica y decodifica un token JWT"""
+    """
+    Verifica y decodifica un token JWT.
+    Un token ya verificado se responde desde memoria hasta su exp (el llamador recibe una copia).
+    """
+    if not settings.TOKEN_VERIFY_CACHE_ENABLED:
+        return _decode_token(token)
+
+    digest = hashlib.blake2b(token.encode(), digest_size=16, key=settings.SECRET_KEY.encode()[:64]).digest()
+    cached = verified_tokens.get(digest)
+    if cached is not None:
+        payload, expires_at = cached
+        if expires_at is None or time.time() < expires_at:
+            return dict(payload)
+        verified_tokens.pop(digest)
+        return None
+
+    payload = _decode_token(token)
+    if payload is None:
+        return None
+    expires_at = payload.get("exp")
+    if isinstance(expires_at, (int, float)):
+        verified_tokens.set(digest, (payload, expires_at), ttl=expires_at - time.time())
+    elif expires_at is None:
+        verified_tokens.set(digest, (payload, None))
+    return dict(payload)
+
+def _decode_token(token: str):
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
+        return jwt.decode(token, _signing_key(settings.SECRET_KEY, settings.ALGORITHM), algorithms=[settings.ALGORITHM])
     except JWTError:
         return None
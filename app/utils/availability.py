@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from itertools import accumulate
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import engine
+from app.models.booking import Booking
+from app.models.estate import Estate
+
+logger = logging.getLogger("triada.availability")
+
+# Estados que no ocupan la finca
+INACTIVE_STATUSES = ("cancelled",)
+
+
+def occupies(status: Optional[str]) -> bool:
+    return status not in INACTIVE_STATUSES
+
+
+class EstateIntervals:
+    """
+    Reservas activas de una finca como intervalos [inicio, fin) en días ordinales,
+    ordenados por inicio. Con el máximo acumulado de los fines, saber si algún
+    intervalo se cruza con [start, end) cuesta una búsqueda binaria.
+
+    Los arreglos (array) no los recorre el recolector de basura, así que un índice
+    de millones de reservas no alarga sus pausas.
+    """
+
+    __slots__ = ("starts", "ends", "ids", "_max_end")
+
+    def __init__(self):
+        self.starts = array("l")
+        self.ends = array("l")
+        self.ids = array("q")
+        self._max_end: Optional[array] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, booking_id: int, start: int, end: int):
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.ids.insert(position, booking_id)
+        self._max_end = None
+
+    def remove(self, booking_id: int):
+        position = self.ids.index(booking_id)
+        del self.starts[position], self.ends[position], self.ids[position]
+        self._max_end = None
+
+    def prepare(self):
+        if self._max_end is None:
+            self._max_end = array("l", accumulate(self.ends, max))
+
+    def overlaps(self, start: int, end: int) -> bool:
+        # Intervalos que empiezan antes de `end`; alguno se cruza si su fin supera `start`
+        count = bisect_left(self.starts, end)
+        if count == 0:
+            return False
+        self.prepare()
+        return self._max_end[count - 1] > start
+
+
+class IndexState:
+    """Contenido del índice; una recarga construye uno nuevo y lo reemplaza completo"""
+
+    __slots__ = ("intervals", "bookings", "capacity", "price")
+
+    def __init__(self):
+        # estate_id -> reservas activas
+        self.intervals: Dict[int, EstateIntervals] = {}
+        # booking_id -> estate_id
+        self.bookings: Dict[int, int] = {}
+        # estate_id -> capacidad (0 = sin límite) y precio, en orden de ID
+        # (diccionarios de enteros: el recolector de basura no los recorre)
+        self.capacity: Dict[int, int] = {}
+        self.price: Dict[int, int] = {}
+
+    def apply_booking(self, booking_id: int, estate_id: Optional[int], start_date, end_date, status):
+        self.discard_booking(booking_id)
+        if not occupies(status) or start_date is None or end_date is None or estate_id is None:
+            return
+        intervals = self.intervals.get(estate_id)
+        if intervals is None:
+            intervals = self.intervals[estate_id] = EstateIntervals()
+        intervals.add(booking_id, start_date.toordinal(), end_date.toordinal())
+        self.bookings[booking_id] = estate_id
+
+    def discard_booking(self, booking_id: int):
+        estate_id = self.bookings.pop(booking_id, None)
+        if estate_id is not None:
+            self.intervals[estate_id].remove(booking_id)
+
+    def apply_estate(self, estate_id: int, capacity: Optional[int], price: Optional[int]):
+        self.capacity[estate_id] = capacity or 0
+        self.price[estate_id] = price or 0
+
+    def discard_estate(self, estate_id: int):
+        self.capacity.pop(estate_id, None)
+        self.price.pop(estate_id, None)
+        self.intervals.pop(estate_id, None)
+
+
+class AvailabilityIndex:
+    """
+    Índice en memoria de las fincas (capacidad y precio) y de sus reservas activas.
+
+    Se carga desde la base al iniciar, los controladores le aplican cada escritura
+    de fincas y reservas, y se recarga cada AVAILABILITY_INDEX_REFRESH_SECONDS para
+    incorporar las escrituras de otros procesos. Mientras no está cargado, las
+    consultas usan SQL.
+    """
+
+    def __init__(self):
+        self._state = IndexState()
+        # Escrituras recibidas durante una recarga, para aplicarlas al índice nuevo
+        self._pending: Optional[List[Tuple[str, tuple]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.enabled = False
+        self.loaded = False
+        self.loaded_at: Optional[float] = None
+        self.load_seconds: Optional[float] = None
+        self.queries = 0
+
+    # Escrituras -----------------------------------------------------------
+
+    def _record(self, operation: str, *args):
+        if not self.enabled:
+            return
+        if self._pending is not None:
+            self._pending.append((operation, args))
+        getattr(self._state, operation)(*args)
+
+    def apply(self, booking):
+        """Registrar una reserva creada o modificada (las canceladas salen del índice)"""
+        self._record("apply_booking", booking.id, booking.estate_id, booking.start_date, booking.end_date, booking.status)
+
+    def apply_all(self, bookings: Iterable):
+        for booking in bookings:
+            self.apply(booking)
+
+    def discard(self, booking_id: int):
+        """Quitar una reserva eliminada"""
+        self._record("discard_booking", booking_id)
+
+    def apply_estate(self, estate):
+        """Registrar una finca creada o modificada"""
+        self._record("apply_estate", estate.id, estate.capacity, estate.price)
+
+    def discard_estate(self, estate_id: int):
+        """Quitar una finca eliminada"""
+        self._record("discard_estate", estate_id)
+
+    # Consultas ------------------------------------------------------------
+
+    def free_estates(
+        self,
+        start: date,
+        end: date,
+        persons: int = 1,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[int]:
+        """
+        IDs (en orden) de las fincas con capacidad para `persons`, precio en el rango
+        y sin reservas activas que se crucen con las noches [start, end).
+        Se detiene al completar `skip + limit` resultados.
+        """
+        self.queries += 1
+        first, last = start.toordinal(), end.toordinal()
+        state = self._state
+        intervals, capacity = state.intervals, state.capacity
+        free: List[int] = []
+        for estate_id, price in state.price.items():
+            if min_price is not None and price < min_price:
+                continue
+            if max_price is not None and price > max_price:
+                continue
+            limit_persons = capacity[estate_id]
+            if limit_persons and limit_persons < persons:
+                continue
+            estate_intervals = intervals.get(estate_id)
+            if estate_intervals is not None and estate_intervals.overlaps(first, last):
+                continue
+            if skip:
+                skip -= 1
+                continue
+            free.append(estate_id)
+            if len(free) >= limit:
+                break
+        return free
+
+    # Carga ----------------------------------------------------------------
+
+    async def load(self):
+        """Reconstruir el índice desde la base sin bloquear las escrituras concurrentes"""
+        started = time.perf_counter()
+        self._pending = []
+        state = IndexState()
+        try:
+            async with engine.connect() as conn:
+                estates = await conn.stream(
+                    select(Estate.id, Estate.capacity, Estate.price)
+                    .order_by(Estate.id)
+                    .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+                )
+                async for rows in estates.partitions():
+                    for row in rows:
+                        state.apply_estate(*row)
+                bookings = await conn.stream(
+                    select(Booking.id, Booking.estate_id, Booking.start_date, Booking.end_date, Booking.status)
+                    .where(Booking.status.not_in(INACTIVE_STATUSES))
+                    .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+                )
+                async for rows in bookings.partitions():
+                    for row in rows:
+                        state.apply_booking(*row)
+            for operation, args in self._pending:
+                getattr(state, operation)(*args)
+            for intervals in state.intervals.values():
+                intervals.prepare()
+        finally:
+            self._pending = None
+
+        self._state = state
+        self.loaded = True
+        self.loaded_at = time.time()
+        self.load_seconds = time.perf_counter() - started
+
+    async def _run(self):
+        while True:
+            try:
+                await self.load()
+                logger.info(
+                    "Índice de disponibilidad: %d fincas, %d reservas en %.2fs",
+                    len(self._state.price), len(self._state.bookings), self.load_seconds
+                )
+            except Exception:
+                logger.exception("No se pudo cargar el índice de disponibilidad")
+            if settings.AVAILABILITY_INDEX_REFRESH_SECONDS <= 0 and self.loaded:
+                return
+            await asyncio.sleep(settings.AVAILABILITY_INDEX_REFRESH_SECONDS or 5)
+
+    async def start(self):
+        """Cargar el índice en segundo plano (el arranque no espera la carga)"""
+        self.enabled = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.enabled = False
+        self.loaded = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "estates": len(self._state.price),
+            "bookings": len(self._state.bookings),
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "queries": self.queries,
+        }
+
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,191 @@
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, TextIO
+
+from sqlalchemy import String, bindparam, cast, column, inspect, select, table, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database import engine
+from app.models.booking import Booking
+
+logger = logging.getLogger("triada.booking_dates")
+
+# Formatos aceptados en las fechas antiguas (texto libre); día antes que mes, como en Colombia
+LEGACY_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d.%m.%Y")
+
+# Vista de texto de las fechas: se leen y escriben sin el procesamiento del tipo Date
+_bookings_text = table(
+    "bookings",
+    column("id"),
+    column("start_date", String),
+    column("end_date", String),
+)
+
+
+def parse_booking_date(value: Any) -> Optional[date]:
+    """
+    Fecha de una reserva a partir del valor guardado (date, ISO 8601 con o sin hora, o
+    uno de LEGACY_DATE_FORMATS). None si no se puede interpretar.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str):
+        return None
+    text = value.strip()
+    try:
+        return datetime.fromisoformat(text).date()
+    except ValueError:
+        pass
+    for fmt in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def legacy_unique_indexes(conn: Connection) -> List[str]:
+    """Índices UNIQUE antiguos sobre una sola columna de fecha (impiden dos llegadas el mismo día)"""
+    return [
+        index["name"]
+        for index in inspect(conn).get_indexes(Booking.__tablename__)
+        if index.get("unique") and index["column_names"] in (["start_date"], ["end_date"])
+    ]
+
+
+def legacy_text_columns(conn: Connection) -> List[str]:
+    """Columnas de fecha que en PostgreSQL siguen siendo texto (VARCHAR)"""
+    if conn.dialect.name != "postgresql":
+        # SQLite no tiene tipos de columna estrictos: basta con que los valores sean ISO 8601
+        return []
+    columns = {item["name"]: item["type"] for item in inspect(conn).get_columns(Booking.__tablename__)}
+    return [
+        name for name in ("start_date", "end_date")
+        if name in columns and columns[name].python_type is not date
+    ]
+
+
+def legacy_layout(conn: Connection) -> List[str]:
+    """Problemas de una base creada antes de las fechas tipadas (vacío si no hay)"""
+    if not inspect(conn).has_table(Booking.__tablename__):
+        return []
+    problems = [f"índice único antiguo {name}" for name in legacy_unique_indexes(conn)]
+    problems += [f"columna {name} de tipo texto" for name in legacy_text_columns(conn)]
+    return problems
+
+
+class DateMigrationReport:
+    """Reservas normalizadas y rechazadas (una línea JSON por reserva rechazada)"""
+
+    def __init__(self, errors: TextIO):
+        self.errors = errors
+        self.checked = 0
+        self.normalized = 0
+        self.rejected = 0
+        self.dropped_indexes: List[str] = []
+        self.altered_columns: List[str] = []
+        self.applied = False
+
+    def reject(self, booking_id: int, start_date: Optional[str], end_date: Optional[str], message: str):
+        self.rejected += 1
+        self.errors.write(json.dumps(
+            {"id": booking_id, "start_date": start_date, "end_date": end_date, "error": message},
+            ensure_ascii=False
+        ) + "\n")
+
+    def summary(self) -> str:
+        if not self.applied:
+            return (
+                f"fechas de reservas: {self.checked} revisadas, {self.normalized} por normalizar, "
+                f"{self.rejected} rechazadas; no se aplicaron cambios"
+            )
+        return (
+            f"fechas de reservas: {self.checked} revisadas, {self.normalized} normalizadas, "
+            f"índices eliminados: {', '.join(self.dropped_indexes) or 'ninguno'}, "
+            f"columnas convertidas a date: {', '.join(self.altered_columns) or 'ninguna'}"
+        )
+
+
+def _migrate(conn: Connection, report: DateMigrationReport, dry_run: bool):
+    if not inspect(conn).has_table(Booking.__tablename__):
+        return
+    # CAST a texto: en PostgreSQL la columna puede ser ya date (migración repetida)
+    rows = conn.execute(
+        select(_bookings_text.c.id, cast(_bookings_text.c.start_date, String), cast(_bookings_text.c.end_date, String))
+        .order_by(_bookings_text.c.id)
+    ).all()
+    changes: List[Dict[str, Any]] = []
+    for booking_id, start_text, end_text in rows:
+        report.checked += 1
+        start, end = parse_booking_date(start_text), parse_booking_date(end_text)
+        if (start_text is not None and start is None) or (end_text is not None and end is None):
+            report.reject(booking_id, start_text, end_text, "Fecha con formato desconocido")
+            continue
+        if start is not None and end is not None and end <= start:
+            report.reject(booking_id, start_text, end_text, "La fecha de fin debe ser posterior a la fecha de inicio")
+            continue
+        normalized = (start.isoformat() if start else None, end.isoformat() if end else None)
+        if normalized != (start_text, end_text):
+            changes.append({"booking_id": booking_id, "start": normalized[0], "end": normalized[1]})
+    report.normalized = len(changes)
+    if report.rejected or dry_run:
+        return
+
+    if changes:
+        conn.execute(
+            update(_bookings_text)
+            .where(_bookings_text.c.id == bindparam("booking_id"))
+            .values(start_date=bindparam("start"), end_date=bindparam("end")),
+            changes
+        )
+    quote = conn.dialect.identifier_preparer.quote
+    for name in legacy_unique_indexes(conn):
+        conn.exec_driver_sql(f"DROP INDEX {quote(name)}")
+        report.dropped_indexes.append(name)
+    columns = legacy_text_columns(conn)
+    if columns:
+        conn.exec_driver_sql(
+            f"ALTER TABLE {quote(Booking.__tablename__)} "
+            + ", ".join(f"ALTER COLUMN {quote(name)} TYPE date USING {quote(name)}::date" for name in columns)
+        )
+        report.altered_columns = columns
+    if conn.dialect.name == "postgresql":
+        checks = {check["name"] for check in inspect(conn).get_check_constraints(Booking.__tablename__)}
+        if "ck_bookings_dates" not in checks:
+            conn.exec_driver_sql(
+                f"ALTER TABLE {quote(Booking.__tablename__)} ADD CONSTRAINT ck_bookings_dates CHECK (end_date > start_date)"
+            )
+    # Índices del modelo que faltan (entre ellos ix_bookings_start_date, ahora no único)
+    for index in Booking.__table__.indexes:
+        index.create(conn, checkfirst=True)
+    report.applied = True
+
+
+async def migrate_booking_dates(errors: TextIO, dry_run: bool = False, bind: AsyncEngine = engine) -> DateMigrationReport:
+    """
+    Migrar las fechas de reservas de texto libre a fechas: normalizar los valores a ISO
+    8601, eliminar el índice único antiguo sobre start_date y, en PostgreSQL, convertir
+    las columnas a date (ALTER COLUMN ... TYPE date USING). Si alguna reserva no se puede
+    interpretar, se reportan todas las rechazadas y no se cambia nada: hay que corregirlas
+    y volver a ejecutar. Todo ocurre en una transacción.
+    """
+    report = DateMigrationReport(errors)
+    async with bind.begin() as conn:
+        await conn.run_sync(_migrate, report, dry_run)
+    return report
+
+
+async def warn_legacy_layout(bind: AsyncEngine = engine):
+    """Al iniciar: avisar si la base necesita la migración de fechas de reservas"""
+    async with bind.connect() as conn:
+        problems = await conn.run_sync(legacy_layout)
+    if problems:
+        logger.warning(
+            "La tabla bookings tiene el formato anterior a las fechas tipadas (%s). "
+            "Ejecute: python -m app migrate-booking-dates",
+            "; ".join(problems)
+        )
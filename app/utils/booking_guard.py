@@ -0,0 +1,90 @@
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.models.estate import Estate
+from app.utils.availability import INACTIVE_STATUSES
+
+# Primera llave de pg_advisory_xact_lock(int, int): separa los locks de reservas de otros usos
+BOOKING_LOCK_NAMESPACE = 4201
+
+BOOKING_CONFLICT_DETAIL = "La finca ya está reservada en esas fechas"
+
+
+def overlap_conditions(booking, estate_id, start, end) -> Tuple:
+    """
+    Condiciones para que `booking` (Booking o un alias) sea una reserva activa de la
+    finca que se cruza con las noches [start, end). `estate_id`, `start` y `end`
+    pueden ser valores o columnas.
+    """
+    return (
+        booking.estate_id == estate_id,
+        booking.status.not_in(INACTIVE_STATUSES),
+        booking.start_date < end,
+        booking.end_date > start,
+    )
+
+
+def capacity_exceeded(estate_id, persons):
+    """
+    Condición: la finca tiene capacidad registrada y es menor que `persons` (valores o
+    columnas). Las fincas sin capacidad no limitan los huéspedes, como en /estates/available.
+    """
+    return select(Estate.id).where(Estate.id == estate_id, Estate.capacity < persons).exists()
+
+
+def capacity_detail(capacity: int) -> str:
+    return f"La finca admite máximo {capacity} personas"
+
+
+def exceeds_capacity(capacity: Optional[int], persons: Optional[int]) -> bool:
+    return capacity is not None and persons is not None and persons > capacity
+
+
+async def _begin_immediate(conn: AsyncConnection):
+    """
+    SQLite: tomar el lock de escritura antes de buscar cruces. Con BEGIN (diferido)
+    dos transacciones leerían a la vez y una fallaría con "database is locked" al
+    escribir; con IMMEDIATE la segunda espera (busy_timeout) y ve la reserva ya confirmada.
+    Si la conexión ya está en una transacción (lote del escritor único, abierto con
+    BEGIN IMMEDIATE) el lock ya es suyo.
+    """
+    raw = await conn.get_raw_connection()
+    if not raw.driver_connection.in_transaction:
+        await conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+async def lock_estates(session: AsyncSession, estate_ids: Iterable[int]):
+    """
+    Serializar las escrituras de reservas de las fincas hasta el fin de la transacción:
+    pg_advisory_xact_lock por finca en PostgreSQL (en orden de ID para evitar deadlocks),
+    BEGIN IMMEDIATE en SQLite.
+    """
+    conn = await session.connection()
+    if conn.dialect.name == "postgresql":
+        await conn.execute(
+            text(
+                "SELECT pg_advisory_xact_lock(:namespace, estate_id) "
+                "FROM unnest(CAST(:estate_ids AS integer[])) AS estate_id ORDER BY estate_id"
+            ),
+            {"namespace": BOOKING_LOCK_NAMESPACE, "estate_ids": sorted(set(estate_ids))}
+        )
+    elif conn.dialect.name == "sqlite":
+        await _begin_immediate(conn)
+
+
+async def lock_booking_estates(session: AsyncSession, booking_ids: Iterable[int]):
+    """Como lock_estates, para las fincas de reservas existentes"""
+    conn = await session.connection()
+    if conn.dialect.name == "postgresql":
+        await conn.execute(
+            text(
+                "SELECT pg_advisory_xact_lock(:namespace, estate_id) "
+                "FROM (SELECT DISTINCT estate_id FROM bookings WHERE id = ANY(CAST(:booking_ids AS integer[]))) AS locked "
+                "ORDER BY estate_id"
+            ),
+            {"namespace": BOOKING_LOCK_NAMESPACE, "booking_ids": sorted(set(booking_ids))}
+        )
+    elif conn.dialect.name == "sqlite":
+        await _begin_immediate(conn)
@@ -0,0 +1,311 @@
+import asyncio
+import csv
+import io
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Table, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.database import create_tables, engine
+from app.models import Estate, Experiences, User
+from app.schemas.estate import EstateCreate
+from app.schemas.experience import ExperienceCreate
+from app.schemas.user import UserCreate
+from app.utils.auth import get_password_hash
+from app.utils.geo import coordinates_for
+from app.utils.locations import normalize_location
+
+# Fila leída del archivo: (número de línea, campos)
+Row = Tuple[int, Dict[str, Any]]
+
+
+class ImportSpec:
+    """Cómo validar e insertar un tipo de entidad"""
+
+    def __init__(
+        self,
+        table: Table,
+        schema: Type[BaseModel],
+        unique: Dict[str, str],
+        references: Dict[str, Tuple[Any, str]],
+        to_record: Callable[[BaseModel], Dict[str, Any]] = lambda item: item.model_dump(),
+        hash_passwords: bool = False
+    ):
+        self.table = table
+        self.schema = schema
+        # columna única -> mensaje de duplicado
+        self.unique = unique
+        # campo -> (columna referenciada, mensaje si no existe)
+        self.references = references
+        self.to_record = to_record
+        self.hash_passwords = hash_passwords
+
+
+def _located_record(item: BaseModel) -> Dict[str, Any]:
+    # COPY no aplica los defaults de las columnas: la ubicación normalizada va en el registro
+    record = item.model_dump()
+    record["location_key"] = normalize_location(record["location"])
+    record["latitude"], record["longitude"] = coordinates_for(record["location"], record["latitude"], record["longitude"])
+    return record
+
+
+def _user_record(user: UserCreate) -> Dict[str, Any]:
+    record = user.model_dump(exclude={"password"})
+    record["is_active"] = True
+    return record
+
+
+IMPORT_SPECS = {
+    "estates": ImportSpec(
+        Estate.__table__,
+        EstateCreate,
+        unique={"name": "Ya existe una finca con ese nombre"},
+        references={"owner_id": (User.id, "Usuario con ID {} no encontrado")},
+        to_record=_located_record,
+    ),
+    "experiences": ImportSpec(
+        Experiences.__table__,
+        ExperienceCreate,
+        unique={"title": "Ya existe una experiencia con este título"},
+        references={"user_id": (User.id, "Usuario con ID {} no encontrado")},
+        to_record=_located_record,
+    ),
+    "users": ImportSpec(
+        User.__table__,
+        UserCreate,
+        unique={
+            "username": "El nombre de usuario ya existe",
+            "email": "El email ya está registrado",
+            "phone": "El teléfono ya está registrado",
+        },
+        references={},
+        to_record=_user_record,
+        hash_passwords=True,
+    ),
+}
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Row]:
+    """Leer el archivo fila por fila (CSV con encabezado o NDJSON) sin cargarlo completo"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for fields in reader:
+            # Las celdas vacías se omiten para que apliquen los valores por defecto del esquema
+            yield reader.line_num, {key: value for key, value in fields.items() if value not in ("", None)}
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            fields = json.loads(line)
+        except ValueError as exc:
+            fields = {"__error__": f"JSON inválido: {exc}"}
+        yield line_number, fields if isinstance(fields, dict) else {"__error__": "Se esperaba un objeto JSON"}
+
+
+def batched(rows: Iterator[Row], size: int) -> Iterator[List[Row]]:
+    batch: List[Row] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ImportReport:
+    """Conteo de filas insertadas y errores por fila (una línea JSON por fila rechazada)"""
+
+    def __init__(self, errors: TextIO):
+        self.errors = errors
+        self.inserted = 0
+        self.rejected = 0
+        self.start = time.perf_counter()
+
+    def reject(self, line: int, messages: Sequence[str]):
+        self.rejected += 1
+        self.errors.write(json.dumps({"line": line, "errors": list(messages)}, ensure_ascii=False) + "\n")
+
+    def summary(self, entity: str) -> str:
+        elapsed = time.perf_counter() - self.start
+        rate = (self.inserted + self.rejected) / elapsed if elapsed else 0
+        return (
+            f"{entity}: {self.inserted} insertadas, {self.rejected} con errores "
+            f"en {elapsed:.2f}s ({rate:.0f} filas/s)"
+        )
+
+
+def _validation_messages(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()]
+
+
+class BulkImporter:
+    """
+    Importación por lotes: valida con los esquemas Pydantic, descarta duplicados y
+    referencias inexistentes con una consulta IN por columna, e inserta el lote en
+    una sola transacción con executemany (COPY en PostgreSQL).
+    """
+
+    def __init__(self, spec: ImportSpec, report: ImportReport, pool: Optional[ProcessPoolExecutor] = None):
+        self.spec = spec
+        self.report = report
+        self.pool = pool
+
+    def validate(self, batch: List[Row]) -> List[Tuple[int, BaseModel]]:
+        valid = []
+        for line, fields in batch:
+            if "__error__" in fields:
+                self.report.reject(line, [fields["__error__"]])
+                continue
+            try:
+                valid.append((line, self.spec.schema.model_validate(fields)))
+            except ValidationError as exc:
+                self.report.reject(line, _validation_messages(exc))
+        return valid
+
+    async def _existing(self, conn: AsyncConnection, column, values: set) -> set:
+        if not values:
+            return set()
+        result = await conn.execute(select(column).where(column.in_(values)))
+        return set(result.scalars().all())
+
+    async def check_constraints(
+        self, conn: AsyncConnection, items: List[Tuple[int, BaseModel]]
+    ) -> List[Tuple[int, BaseModel]]:
+        """Rechazar duplicados (en la base o dentro del lote) y referencias inexistentes"""
+        taken = {
+            name: await self._existing(conn, self.spec.table.c[name], {getattr(item, name) for _, item in items} - {None})
+            for name in self.spec.unique
+        }
+        found = {
+            field: await self._existing(conn, column, {getattr(item, field) for _, item in items} - {None})
+            for field, (column, _) in self.spec.references.items()
+        }
+
+        accepted = []
+        for line, item in items:
+            messages = []
+            for name, message in self.spec.unique.items():
+                value = getattr(item, name)
+                if value is not None and value in taken[name]:
+                    messages.append(f"{name}: {message}")
+            for field, (_, message) in self.spec.references.items():
+                value = getattr(item, field)
+                if value is not None and value not in found[field]:
+                    messages.append(f"{field}: {message.format(value)}")
+            if messages:
+                self.report.reject(line, messages)
+                continue
+            # Los valores aceptados cuentan como duplicados para el resto del lote
+            for name in self.spec.unique:
+                taken[name].add(getattr(item, name))
+            accepted.append((line, item))
+        return accepted
+
+    async def to_records(self, items: List[Tuple[int, BaseModel]]) -> List[Dict[str, Any]]:
+        records = [self.spec.to_record(item) for _, item in items]
+        if self.spec.hash_passwords:
+            passwords = [item.password for _, item in items]
+            if self.pool is not None:
+                loop = asyncio.get_running_loop()
+                hashes = await asyncio.gather(*(
+                    loop.run_in_executor(self.pool, get_password_hash, password) for password in passwords
+                ))
+            else:
+                hashes = [get_password_hash(password) for password in passwords]
+            for record, hashed in zip(records, hashes):
+                record["hashed_password"] = hashed
+        return records
+
+    async def _insert_many(self, conn: AsyncConnection, records: List[Dict[str, Any]]):
+        if conn.dialect.name == "postgresql":
+            columns = list(records[0])
+            raw = await conn.get_raw_connection()
+            # COPY dentro de la transacción abierta por las consultas de verificación
+            await raw.driver_connection.copy_records_to_table(
+                self.spec.table.name,
+                records=[tuple(record[column] for column in columns) for record in records],
+                columns=columns,
+                schema_name=self.spec.table.schema
+            )
+        else:
+            await conn.execute(insert(self.spec.table), records)
+
+    async def _insert_one_by_one(self, conn: AsyncConnection, lines: List[int], records: List[Dict[str, Any]]):
+        """Aislar las filas que violan restricciones (p. ej. otro proceso insertó el mismo nombre)"""
+        for line, record in zip(lines, records):
+            try:
+                async with conn.begin_nested():
+                    await conn.execute(insert(self.spec.table), record)
+                self.report.inserted += 1
+            except IntegrityError as exc:
+                self.report.reject(line, [str(exc.orig)])
+
+    async def import_batch(self, conn: AsyncConnection, batch: List[Row]):
+        items = self.validate(batch)
+        if not items:
+            return
+        async with conn.begin():
+            items = await self.check_constraints(conn, items)
+        if not items:
+            return
+        # El hash de contraseñas se calcula fuera de la transacción
+        records = await self.to_records(items)
+        try:
+            async with conn.begin():
+                await self._insert_many(conn, records)
+            self.report.inserted += len(records)
+        except Exception:
+            # COPY reporta las violaciones con las excepciones de asyncpg, no como IntegrityError;
+            # fila por fila, cualquier error que no sea de integridad se propaga
+            async with conn.begin():
+                await self._insert_one_by_one(conn, [line for line, _ in items], records)
+
+
+async def run_import(
+    entity: str,
+    stream: TextIO,
+    fmt: str,
+    batch_size: int = 1000,
+    workers: int = 1,
+    errors: TextIO = sys.stderr
+) -> ImportReport:
+    """Importar el archivo completo, lote por lote, reportando los errores por fila en `errors`"""
+    spec = IMPORT_SPECS[entity]
+    report = ImportReport(errors)
+    await create_tables()
+
+    pool = ProcessPoolExecutor(max_workers=workers) if spec.hash_passwords and workers > 0 else None
+    try:
+        importer = BulkImporter(spec, report, pool)
+        async with engine.connect() as conn:
+            for batch in batched(read_rows(stream, fmt), batch_size):
+                await importer.import_batch(conn, batch)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return report
+
+
+def detect_format(path: str) -> str:
+    """Formato según la extensión del archivo"""
+    lowered = path.lower()
+    if lowered.endswith(".csv"):
+        return "csv"
+    if lowered.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    raise ValueError(f"No se pudo deducir el formato de {path}; use --format csv|ndjson")
+
+
+def open_input(path: str) -> TextIO:
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    return open(path, encoding="utf-8-sig", newline="")
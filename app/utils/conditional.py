@@ -0,0 +1,90 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterable, Optional
+
+from fastapi import Request, Response, status
+
+
+def _tag_part(part) -> str:
+    if isinstance(part, datetime):
+        return part.strftime("%Y%m%d%H%M%S%f")
+    return str(part)
+
+
+def entity_tag(*parts) -> str:
+    """ETag fuerte de un registro a partir de su ID y su versión (o fecha de actualización): "12.3\""""
+    return '"' + ".".join(_tag_part(part) for part in parts) + '"'
+
+
+def page_tag(parts: Iterable) -> str:
+    """ETag fuerte de una página: resumen de los (id, versión) de sus registros, en orden"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def body_tag(body: bytes) -> str:
+    """ETag fuerte de un cuerpo ya serializado"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def gzip_tag(etag: str) -> str:
+    """ETag de la versión gzip de una representación: "12.3-gz" (no comparte el del cuerpo sin comprimir)"""
+    return etag[:-1] + '-gz"'
+
+
+def _utc(value: datetime) -> datetime:
+    """Las columnas DateTime guardan UTC sin zona (datetime.utcnow)"""
+    value = value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def validators(etag: Optional[str], last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    """Cabeceras ETag y Last-Modified"""
+    headers = {}
+    if etag is not None:
+        headers["ETag"] = etag
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_utc(last_modified), usegmt=True)
+    return headers
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_not_modified(request: Request, etag: Optional[str], last_modified: Optional[datetime] = None) -> bool:
+    """
+    Evaluar If-None-Match (comparación débil, como pide HTTP para GET) o, si no viene,
+    If-Modified-Since con la precisión de segundos de la cabecera
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since is None:
+        return False
+    return _utc(last_modified) <= _utc(since)
+
+
+def not_modified(etag: Optional[str], last_modified: Optional[datetime] = None) -> Response:
+    """Respuesta 304 sin cuerpo con los mismos validadores"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators(etag, last_modified))
+
+
+def set_validators(response: Response, etag: Optional[str], last_modified: Optional[datetime] = None):
+    """Publicar ETag y Last-Modified en la respuesta"""
+    response.headers.update(validators(etag, last_modified))
@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator, Iterable, List, Sequence
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+from app.config import settings
+from app.database import read_engine
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Un solo encoder: json.dumps con argumentos propios crea uno nuevo en cada llamada
+_json_encoder = json.JSONEncoder(ensure_ascii=False, default=str)
+
+
+def accepts_gzip(request: Request) -> bool:
+    """Verificar si el cliente acepta gzip (Accept-Encoding, respetando q=0)"""
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def ndjson_chunk(keys: Sequence[str], rows: Iterable[Sequence]) -> str:
+    """Una línea JSON por fila"""
+    encode = _json_encoder.encode
+    return "".join(encode(dict(zip(keys, row))) + "\n" for row in rows)
+
+
+def csv_chunk(rows: Iterable[Sequence]) -> str:
+    """Filas en formato CSV (None se escribe como celda vacía)"""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue()
+
+
+async def stream_rows(bind, stmt: Select, fmt: str, compress: bool) -> AsyncIterator[bytes]:
+    """
+    Recorrer la consulta con un cursor del lado del servidor, lote por lote.
+
+    Solo hay en memoria un lote de EXPORT_BATCH_SIZE tuplas (sin objetos ORM ni
+    modelos Pydantic), así que la memoria no depende del tamaño de la tabla.
+    """
+    compressor = zlib.compressobj(settings.EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+
+    def encode(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    async with bind.connect() as conn:
+        result = await conn.stream(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        keys: List[str] = list(result.keys())
+        if fmt == "csv":
+            yield encode(csv_chunk([keys]))
+        async for rows in result.partitions():
+            chunk = encode(csv_chunk(rows) if fmt == "csv" else ndjson_chunk(keys, rows))
+            if chunk:
+                yield chunk
+
+    if compressor:
+        yield compressor.flush()
+
+
+def stream_export(request: Request, stmt: Select, fmt: str, filename: str) -> StreamingResponse:
+    """
+    Respuesta en streaming (NDJSON o CSV) para la consulta, comprimida con gzip
+    al vuelo si el cliente lo acepta.
+
+    La consulta usa su propia conexión (réplica si hay): la sesión de la petición
+    se cierra antes de que termine de enviarse el cuerpo.
+    """
+    compress = accepts_gzip(request)
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}.{fmt}"',
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_rows(read_engine(request), stmt, fmt, compress),
+        media_type=EXPORT_FORMATS[fmt],
+        headers=headers
+    )
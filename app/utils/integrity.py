@@ -0,0 +1,50 @@
+import re
+from typing import Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+UNIQUE = "unique"
+FOREIGN_KEY = "foreign_key"
+# Restricción de exclusión de PostgreSQL (reservas cruzadas, BOOKING_EXCLUSION_CONSTRAINT)
+EXCLUSION = "exclusion"
+
+# SQLite: "UNIQUE constraint failed: users.username"
+SQLITE_UNIQUE = re.compile(r"UNIQUE constraint failed: \w+\.(\w+)")
+# PostgreSQL: 'DETAIL:  Key (username)=(ana) already exists.' / 'constraint "users_username_key"'
+POSTGRES_KEY = re.compile(r"Key \((\w+)\)=")
+POSTGRES_CONSTRAINT = re.compile(r'constraint "(\w+)"')
+
+
+def parse_integrity_error(error: IntegrityError) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Tipo de restricción violada (UNIQUE, FOREIGN_KEY o EXCLUSION) y columna, si el motor la reporta.
+    SQLite no indica la columna en las violaciones de llave foránea.
+    """
+    message = str(error.orig)
+    lowered = message.lower()
+
+    match = SQLITE_UNIQUE.search(message)
+    if match:
+        return UNIQUE, match.group(1)
+
+    if "unique constraint" in lowered or "duplicate key" in lowered:
+        kind = UNIQUE
+    elif "foreign key constraint" in lowered:
+        kind = FOREIGN_KEY
+    elif "exclusion constraint" in lowered:
+        kind = EXCLUSION
+    else:
+        return None, None
+
+    match = POSTGRES_KEY.search(message)
+    if match:
+        return kind, match.group(1)
+    match = POSTGRES_CONSTRAINT.search(message)
+    return kind, match.group(1) if match else None
+
+
+def violates(error: IntegrityError, kind: str, column: str) -> bool:
+    """Verificar si el error corresponde a la restricción de `column`"""
+    error_kind, error_column = parse_integrity_error(error)
+    # En PostgreSQL sin DETAIL solo se conoce el nombre de la restricción (users_username_key)
+    return error_kind == kind and error_column is not None and column in error_column
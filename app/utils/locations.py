@@ -0,0 +1,133 @@
+import asyncio
+import re
+import time
+import unicodedata
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy import Table, bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.config import settings
+from app.database import engine
+
+_SEPARATORS = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_location(location: Optional[str]) -> Optional[str]:
+    """Ubicación sin tildes, en minúsculas y con las palabras separadas por un espacio: "Salénto, Quindío" -> "salento quindio\""""
+    if location is None:
+        return None
+    decomposed = unicodedata.normalize("NFKD", location.casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _SEPARATORS.sub(" ", stripped).strip() or None
+
+
+def location_key_default(context) -> Optional[str]:
+    """Default de la columna location_key en los INSERT (también executemany)"""
+    return normalize_location(context.get_current_parameters().get("location"))
+
+
+def word_trigrams(word: str) -> FrozenSet[str]:
+    """Trigramas de una palabra con el relleno de pg_trgm ("  s", " sa", ..., "to ")"""
+    padded = f"  {word} "
+    return frozenset(padded[index:index + 3] for index in range(len(padded) - 2))
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Trigramas compartidos sobre trigramas totales (0 a 1)"""
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class LocationIndex:
+    """
+    Vocabulario de ubicaciones normalizadas (valores distintos de location_key) con sus
+    trigramas. Las ubicaciones distintas son pocas (municipios), así que la búsqueda
+    difusa se resuelve en memoria y la base filtra con `location_key IN (...)` sobre
+    el índice de la columna. Se recarga desde la base cada LOCATION_INDEX_TTL_SECONDS
+    para ver las ubicaciones escritas por otros procesos.
+    """
+
+    def __init__(self, column):
+        self.column = column
+        self._words: Dict[str, Tuple[FrozenSet[str], ...]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= settings.LOCATION_INDEX_TTL_SECONDS
+
+    async def refresh(self, db: AsyncSession):
+        """Cargar el vocabulario si venció; una sola carga aunque lleguen varias peticiones a la vez"""
+        if not self._stale():
+            return
+        async with self._lock:
+            if not self._stale():
+                return
+            result = await db.execute(select(self.column).where(self.column.is_not(None)).distinct())
+            self._words = {key: tuple(word_trigrams(word) for word in key.split()) for key in result.scalars()}
+            self._loaded_at = time.monotonic()
+
+    def add(self, location: Optional[str]):
+        """Registrar la ubicación de una escritura de este proceso"""
+        key = normalize_location(location)
+        if key and key not in self._words:
+            self._words[key] = tuple(word_trigrams(word) for word in key.split())
+
+    def _score(self, key: str, query: str, query_words: Tuple[FrozenSet[str], ...]) -> float:
+        """1 si la búsqueda está contenida en la ubicación; si no, la mejor similitud contra
+        cada tramo de la ubicación con tantas palabras como la búsqueda"""
+        if query in key:
+            return 1.0
+        words = self._words[key]
+        size = min(len(query_words), len(words))
+        grams = frozenset().union(*query_words)
+        return max(
+            similarity(grams, frozenset().union(*words[start:start + size]))
+            for start in range(len(words) - size + 1)
+        )
+
+    def match(self, location: str) -> List[str]:
+        """Ubicaciones normalizadas que coinciden con la búsqueda, de la más a la menos parecida"""
+        query = normalize_location(location)
+        if not query:
+            return []
+        query_words = tuple(word_trigrams(word) for word in query.split())
+        scored = []
+        for key in self._words:
+            score = self._score(key, query, query_words)
+            if score >= settings.LOCATION_SIMILARITY_THRESHOLD:
+                scored.append((-score, key))
+        scored.sort()
+        return [key for _, key in scored[:settings.LOCATION_MAX_MATCHES]]
+
+    async def keys(self, db: AsyncSession, location: str) -> List[str]:
+        """Cargar el vocabulario si hace falta y buscar la ubicación"""
+        await self.refresh(db)
+        return self.match(location)
+
+
+async def backfill_location_keys(table: Table, bind: AsyncEngine = engine) -> int:
+    """
+    Calcular location_key de las filas que no lo tienen (bases anteriores a la columna o
+    filas escritas por fuera de la aplicación): un UPDATE por ubicación distinta, que usa
+    el índice de location. Retorna las filas actualizadas.
+    """
+    async with bind.begin() as conn:
+        result = await conn.execute(
+            select(table.c.location).where(table.c.location_key.is_(None), table.c.location.is_not(None)).distinct()
+        )
+        locations = [
+            {"old_location": location, "new_key": normalize_location(location)} for location in result.scalars()
+        ]
+        if not locations:
+            return 0
+        updated = await conn.execute(
+            update(table)
+            .where(table.c.location == bindparam("old_location"), table.c.location_key.is_(None))
+            .values(location_key=bindparam("new_key")),
+            locations
+        )
+        return updated.rowcount if updated.rowcount >= 0 else len(locations)
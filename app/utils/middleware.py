@@ -2,13 +2,13 @@ from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-import jwt
+from jose import JWTError
 
 from app.database import get_db
-from app.models.user import User
-from app.schemas.auth import UserProfile
+from app.schemas.auth import TokenClaims, UserProfile
 from app.utils.auth import verify_token
-from sqlalchemy import select
+from app.utils.user_cache import resolve_user, token_state
+from app.utils.token_claims import claims_from_payload, is_current, is_revoked, user_roles
 
 security = HTTPBearer()
 
@@ -35,16 +35,18 @@ async def get_current_user_optional(
         if username is None or user_id is None:
             return None
             
-    except jwt.PyJWTError:
+    except JWTError:
         return None
     
-    result = await db.execute(select(User).where(User.username == username))
-    user = result.scalar_one_or_none()
+    if await is_revoked(db, payload):
+        return None
+    
+    user = await resolve_user(db, username, user_id)
     
     if user is None or user.is_active != 1:
         return None
     
-    return UserProfile.from_orm(user)
+    return user
 
 async def get_current_user_required(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -72,11 +74,13 @@ async def get_current_user_required(
         if username is None or user_id is None:
             raise credentials_exception
             
-    except jwt.PyJWTError:
+    except JWTError:
+        raise credentials_exception
+    
+    if await is_revoked(db, payload):
         raise credentials_exception
     
-    result = await db.execute(select(User).where(User.username == username))
-    user = result.scalar_one_or_none()
+    user = await resolve_user(db, username, user_id)
     
     if user is None:
         raise credentials_exception
@@ -87,7 +91,48 @@ async def get_current_user_required(
             detail="Usuario inactivo"
         )
     
-    return UserProfile.from_orm(user)
+    return user
+
+async def get_token_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> TokenClaims:
+    """
+    Dependency de autorización a partir de los claims del token.
+
+    Con un token con claims (AUTH_CLAIMS_TOKENS) no carga el usuario: solo compara la
+    generación del token con la del usuario (en memoria; si no está, una consulta de dos
+    columnas). Un token anterior (solo sub y user_id) carga el usuario y sus roles.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="No se pudieron validar las credenciales",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    payload = verify_token(credentials.credentials)
+    if payload is None or payload.get("sub") is None or payload.get("user_id") is None:
+        raise credentials_exception
+    
+    claims = claims_from_payload(payload)
+    if claims is not None:
+        if not is_current(claims, await token_state(db, claims.user_id)):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token revocado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return claims
+    
+    user = await resolve_user(db, payload["sub"], payload["user_id"])
+    if user is None:
+        raise credentials_exception
+    return TokenClaims(
+        user_id=user.id,
+        username=user.username,
+        is_active=user.is_active == 1,
+        roles=await user_roles(db, user.id)
+    )
 
 def require_roles(allowed_roles: list):
     """
@@ -116,3 +161,35 @@ def require_active_user():
             )
         return current_user
     return active_checker
+
+def require_claims_roles(allowed_roles: list):
+    """
+    Como require_roles, pero desde los claims del token ("user", "owner", "client"):
+    retorna TokenClaims, sin cargar el usuario.
+    """
+    def role_checker(claims: TokenClaims = Depends(get_token_claims)):
+        if not claims.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Usuario inactivo"
+            )
+        if not set(claims.roles) & set(allowed_roles):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Acceso denegado"
+            )
+        return claims
+    return role_checker
+
+def require_active_claims():
+    """
+    Como require_active_user, pero desde los claims del token: retorna TokenClaims.
+    """
+    def active_checker(claims: TokenClaims = Depends(get_token_claims)):
+        if not claims.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Usuario inactivo"
+            )
+        return claims
+    return active_checker
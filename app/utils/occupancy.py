@@ -0,0 +1,120 @@
+import logging
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import String, cast, delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.config import settings
+from app.database import engine
+from app.models.booking import Booking
+from app.models.occupancy import EstateOccupancy
+from app.utils.availability import INACTIVE_STATUSES, occupies
+from app.utils.booking_dates import parse_booking_date
+
+logger = logging.getLogger("triada.occupancy")
+
+# Dialectos con INSERT ... ON CONFLICT DO NOTHING
+_CONFLICT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def occupancy_rows(booking) -> List[Dict[str, Any]]:
+    """Filas de ocupación de una reserva: una por noche de [start_date, end_date), ninguna si está cancelada"""
+    if not occupies(booking.status) or booking.start_date is None or booking.end_date is None:
+        return []
+    return [
+        {
+            "estate_id": booking.estate_id,
+            "day": booking.start_date + timedelta(night),
+            "booking_id": booking.id,
+            "persons": booking.num_persons,
+            "status": booking.status,
+        }
+        for night in range((booking.end_date - booking.start_date).days)
+    ]
+
+
+async def write_occupancy(session: AsyncSession, bookings: Iterable, replace: bool = True):
+    """
+    Escribir la ocupación de las reservas en la transacción de `session`.
+    Con `replace` se borran antes sus filas anteriores (reservas modificadas).
+    """
+    bookings = list(bookings)
+    if replace and bookings:
+        await session.execute(
+            delete(EstateOccupancy)
+            .where(EstateOccupancy.booking_id.in_([booking.id for booking in bookings]))
+            .execution_options(synchronize_session=False)
+        )
+    rows = [row for booking in bookings for row in occupancy_rows(booking)]
+    if rows:
+        await session.execute(insert(EstateOccupancy), rows)
+
+
+async def rebuild_occupancy(bind: AsyncEngine = engine) -> int:
+    """
+    Reconstruir la tabla completa desde las reservas activas (al crearla sobre una base
+    con reservas, o si se escribieron reservas por fuera de la API). Si hay reservas
+    antiguas cruzadas, cada noche queda con la de menor ID. Las reservas con fechas que
+    no se pueden interpretar (texto libre anterior a migrate-booking-dates) se omiten y
+    se reportan en el log. Retorna las filas escritas.
+    """
+    written = 0
+    skipped: List[int] = []
+    async with bind.begin() as conn:
+        table_insert = _CONFLICT_INSERTS.get(conn.dialect.name)
+        statement = table_insert(EstateOccupancy).on_conflict_do_nothing() if table_insert else insert(EstateOccupancy)
+        await conn.execute(delete(EstateOccupancy))
+        # Las fechas se leen como texto: un valor antiguo no aborta la lectura del lote
+        result = await conn.stream(
+            select(
+                Booking.id, Booking.estate_id, Booking.num_persons, Booking.status,
+                cast(Booking.start_date, String).label("start_date"), cast(Booking.end_date, String).label("end_date")
+            )
+            .where(Booking.status.not_in(INACTIVE_STATUSES))
+            .order_by(Booking.id)
+            .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        async for partition in result.partitions():
+            bookings = []
+            for booking in partition:
+                start, end = parse_booking_date(booking.start_date), parse_booking_date(booking.end_date)
+                if start is None or end is None:
+                    skipped.append(booking.id)
+                    continue
+                bookings.append(SimpleNamespace(**{**booking._asdict(), "start_date": start, "end_date": end}))
+            rows = [row for booking in bookings for row in occupancy_rows(booking)]
+            if rows:
+                inserted = await conn.execute(statement, rows)
+                # Las noches ya ocupadas por otra reserva no se cuentan (si el driver lo reporta)
+                written += inserted.rowcount if inserted.rowcount >= 0 else len(rows)
+    if skipped:
+        logger.warning(
+            "Ocupación: %d reservas omitidas por fechas que no se pueden interpretar (IDs %s%s). "
+            "Ejecute: python -m app migrate-booking-dates",
+            len(skipped), ", ".join(map(str, skipped[:20])), "..." if len(skipped) > 20 else ""
+        )
+    return written
+
+
+async def ensure_occupancy(bind: AsyncEngine = engine) -> bool:
+    """
+    Al iniciar: avisar si la tabla de ocupación está vacía y hay reservas activas (p. ej.
+    recién creada sobre una base existente). La construcción recorre todas las reservas,
+    así que no se hace al arrancar sino con `python -m app rebuild-occupancy`.
+    """
+    async with bind.connect() as conn:
+        result = await conn.execute(select(
+            ~select(EstateOccupancy.estate_id).exists(),
+            select(Booking.id).where(Booking.status.not_in(INACTIVE_STATUSES)).exists()
+        ))
+        empty, has_bookings = result.one()
+    if empty and has_bookings:
+        logger.warning(
+            "La tabla de ocupación está vacía y hay reservas activas: el calendario no las mostrará. "
+            "Ejecute: python -m app rebuild-occupancy"
+        )
+        return False
+    return True
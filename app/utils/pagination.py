@@ -0,0 +1,129 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import select, tuple_, union_all
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import Select
+
+
+def encode_cursor(sort: str, value: Any, row_id: int) -> str:
+    """Cursor opaco con el orden, el valor de la llave de orden y el ID de la última fila"""
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort: str) -> Tuple[Any, int]:
+    """Valor de orden e ID codificados en el cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor_sort, value, row_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+    if cursor_sort != sort or not isinstance(row_id, int):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El cursor no corresponde al orden solicitado"
+        )
+    return value, row_id
+
+
+class Keyset:
+    """
+    Paginación por cursor sobre (sort_key, id).
+
+    Cada página continúa desde la última fila de la anterior con un WHERE sobre el
+    índice (sort_key, id), así que su costo no depende de la profundidad y las filas
+    insertadas entre páginas no desplazan los resultados.
+
+    Las filas con la llave de orden nula (registros antiguos) van al final (NULLS LAST)
+    y se recorren por id, porque la comparación de tuplas nunca las incluye. Una página
+    desde un cursor con valor une (UNION ALL) las filas siguientes por el índice y las
+    primeras nulas. Así cada parte sigue buscando por índice; un OR recorrería el índice
+    desde el principio.
+    """
+
+    def __init__(self, id_column, **sort_keys):
+        self.id_column = id_column
+        self.sort_keys = {"id": id_column, **sort_keys}
+
+    def _column(self, sort: str):
+        if sort not in self.sort_keys:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Orden no soportado. Opciones: {', '.join(self.sort_keys)}"
+            )
+        return self.sort_keys[sort]
+
+    @staticmethod
+    def _coerce(column, value: Any) -> Any:
+        """Reconstruir fechas (el cursor las guarda en ISO 8601)"""
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            return value
+        if value is not None and python_type in (date, datetime) and isinstance(value, str):
+            try:
+                return python_type.fromisoformat(value)
+            except ValueError:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+        return value
+
+    def apply(self, stmt: Select, sort: str = "id", cursor: Optional[str] = None, skip: int = 0, limit: int = 100) -> Select:
+        """Ordenar y paginar la consulta; sin cursor se mantiene `skip` por compatibilidad"""
+        sort_column = self._column(sort)
+        if cursor:
+            if skip:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Use skip o cursor, no ambos"
+                )
+            value, row_id = decode_cursor(cursor, sort)
+            value = self._coerce(sort_column, value)
+            if sort_column is self.id_column:
+                stmt = stmt.where(self.id_column > row_id)
+            elif value is None:
+                stmt = stmt.where(sort_column.is_(None), self.id_column > row_id)
+            else:
+                return self._after_value(stmt, sort_column, value, row_id, limit)
+        elif skip:
+            stmt = stmt.offset(skip)
+
+        if sort_column is self.id_column:
+            return stmt.order_by(self.id_column).limit(limit)
+        return stmt.order_by(sort_column.nulls_last(), self.id_column).limit(limit)
+
+    def _after_value(self, stmt: Select, sort_column, value: Any, row_id: int, limit: int) -> Select:
+        """Filas después de (value, row_id) y, si no alcanzan, las de llave nula, sobre el mismo modelo"""
+        following = stmt.where(tuple_(sort_column, self.id_column) > tuple_(value, row_id))
+        following = following.order_by(sort_column, self.id_column).limit(limit)
+        nulls = stmt.where(sort_column.is_(None)).order_by(self.id_column).limit(limit)
+        page = union_all(select(following.subquery()), select(nulls.subquery())).subquery()
+        entity = aliased(stmt.column_descriptions[0]["entity"], page)
+        sort_key, id_key = getattr(entity, sort_column.key), getattr(entity, self.id_column.key)
+        return select(entity).order_by(sort_key.nulls_last(), id_key).limit(limit)
+
+    def next_cursor(self, items: Sequence, sort: str = "id", limit: int = 100) -> Optional[str]:
+        """Cursor de la página siguiente (None si esta página no estaba llena)"""
+        if len(items) < limit:
+            return None
+        last = items[-1]
+        return encode_cursor(
+            sort,
+            getattr(last, self._column(sort).key),
+            getattr(last, self.id_column.key)
+        )
+
+
+def set_next_cursor(request: Request, response: Response, cursor: Optional[str]):
+    """Publicar el cursor de la siguiente página en las cabeceras X-Next-Cursor y Link"""
+    if cursor is None:
+        return
+    response.headers["X-Next-Cursor"] = cursor
+    next_url = request.url.remove_query_params("skip").include_query_params(cursor=cursor)
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.utils.auth import get_password_hash, verify_password
+
+
+class PasswordHasher:
+    """
+    Pool acotado de hilos para bcrypt, fuera del event loop.
+
+    bcrypt libera el GIL mientras calcula, así que cada hash (~250 ms) ocupa un hilo del
+    pool y no el loop: el resto de peticiones del worker siguen atendiéndose.
+    Hay como máximo `max_pending` hashes en curso o en espera; por encima se responde 429
+    de inmediato en lugar de dejar crecer la cola (y la latencia de todos los logins).
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 16):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_pending_seen = 0
+        self.hash_time = 0.0
+        self._lock = threading.Lock()
+
+    async def hash(self, password: str) -> str:
+        """Hash bcrypt de la contraseña"""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verificar la contraseña contra su hash"""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def _run(self, function: Callable[..., Any], *args) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Demasiadas solicitudes de autenticación, intente de nuevo en unos segundos",
+                headers={"Retry-After": "1"}
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        self.max_pending_seen = max(self.max_pending_seen, self.pending)
+        # El cupo se libera cuando termina el hash, aunque la petición se cancele antes
+        future = self._executor.submit(self._timed, function, *args)
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return await asyncio.wrap_future(future)
+
+    def _timed(self, function: Callable[..., Any], *args) -> Any:
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.hash_time += elapsed
+
+    def _release(self):
+        self.pending -= 1
+        self.completed += 1
+
+    def stop(self):
+        """Esperar los hashes en curso y cerrar el pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores del pool para el endpoint interno"""
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "max_pending_seen": self.max_pending_seen,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_hash_ms": round(self.hash_time / self.completed * 1000, 2) if self.completed else 0.0,
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from typing import Dict, Any, Type
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool, QueuePool
+
+
+class PoolMetrics:
+    """Contadores de uso de un pool de conexiones"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.pool: Pool = None
+        self.pool_class: str = None
+        self.reset()
+
+    def reset(self):
+        """Reiniciar todos los contadores"""
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.waits = 0
+            self.wait_time_total = 0.0
+            self.wait_time_max = 0.0
+
+    def incr(self, counter: str):
+        """Sumar uno a un contador (los eventos del pool llegan desde varios hilos)"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_wait(self, elapsed: float, timed_out: bool = False):
+        """Registrar el tiempo de espera para obtener una conexión"""
+        with self._lock:
+            self.waits += 1
+            self.wait_time_total += elapsed
+            self.wait_time_max = max(self.wait_time_max, elapsed)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado actual del pool y contadores acumulados"""
+        pool = self.pool
+        with self._lock:
+            data = {
+                "name": self.name,
+                "pid": os.getpid(),
+                "pool_class": self.pool_class,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_time_total_ms": round(self.wait_time_total * 1000, 3),
+                "wait_time_avg_ms": round(self.wait_time_total * 1000 / self.waits, 3) if self.waits else 0.0,
+                "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+            })
+        else:
+            data["checked_out"] = data["checkouts"] - data["checkins"]
+        return data
+
+
+# Registro de métricas por engine (primary, réplicas, ...)
+_registry: Dict[str, PoolMetrics] = {}
+
+
+def get_pool_metrics(name: str) -> PoolMetrics:
+    """Obtener (o crear) las métricas asociadas a un engine"""
+    if name not in _registry:
+        _registry[name] = PoolMetrics(name)
+    return _registry[name]
+
+
+def all_pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """Snapshot de todos los pools registrados en este proceso"""
+    return {name: metrics.snapshot() for name, metrics in _registry.items()}
+
+
+def instrumented_pool_class(base: Type[Pool], metrics: PoolMetrics) -> Type[Pool]:
+    """
+    Crear una subclase del pool que mide el tiempo de espera de cada checkout.
+    La subclase se conserva cuando SQLAlchemy recrea el pool (engine.dispose()).
+    """
+    def _do_get(self):
+        metrics.pool = self
+        start = time.perf_counter()
+        try:
+            connection = base._do_get(self)
+        except PoolTimeoutError:
+            metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+    metrics.pool_class = base.__name__
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+def register_pool_events(engine, metrics: PoolMetrics):
+    """Registrar los listeners de eventos del pool sobre un engine"""
+    metrics.pool = engine.pool
+    if metrics.pool_class is None:
+        metrics.pool_class = type(engine.pool).__name__
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.incr("connects")
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.incr("checkouts")
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        metrics.incr("checkins")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.incr("invalidations")
@@ -0,0 +1,128 @@
+import time
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+
+from app.config import settings
+
+
+class RequestQueryStats:
+    """Sentencias SQL, tiempo en la base de datos y filas modificadas de una petición"""
+
+    def __init__(self, budget: Optional[int] = None):
+        self.count = 0
+        self.db_time = 0.0
+        self.rows_written = 0
+        self.budget = budget
+        self.statements: List[str] = []
+        self._started: Optional[float] = None
+        self._changes: Optional[int] = None
+
+    def server_timing(self, total: float) -> str:
+        """Valor de la cabecera Server-Timing (duraciones en ms)"""
+        return (
+            f'db;dur={self.db_time * 1000:.3f};desc="{self.count} queries, {self.rows_written} rows written", '
+            f"app;dur={max(total - self.db_time, 0) * 1000:.3f}"
+        )
+
+
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def current_query_stats() -> Optional[RequestQueryStats]:
+    """Estadísticas de la petición en curso (None fuera de una petición)"""
+    return _current.get()
+
+
+def _is_write(context) -> bool:
+    return context is not None and (context.isinsert or context.isupdate or context.isdelete)
+
+
+def _total_changes(conn) -> Optional[int]:
+    """Filas modificadas por la conexión SQLite desde que se abrió (None en otros motores)"""
+    if conn.dialect.name != "sqlite":
+        return None
+    return conn.connection.driver_connection.total_changes
+
+
+def register_query_events(engine):
+    """Registrar los listeners que cuentan sentencias sobre un engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        if stats is not None:
+            stats._started = time.perf_counter()
+            stats._changes = _total_changes(conn) if _is_write(context) else None
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        if stats is None or stats._started is None:
+            return
+        stats.db_time += time.perf_counter() - stats._started
+        stats._started = None
+        stats.count += 1
+        if _is_write(context):
+            # rowcount (DB-API) cuenta las filas de INSERT/UPDATE/DELETE. Con RETURNING, SQLite
+            # no lo informa: se usa la diferencia de total_changes de la conexión (incluye las
+            # filas que escriben los triggers, como los del índice R*Tree). Las filas de un
+            # SELECT no se cuentan porque los drivers no las exponen antes de leerlas
+            rows = cursor.rowcount
+            if rows < 0 and stats._changes is not None:
+                rows = _total_changes(conn) - stats._changes
+            stats.rows_written += max(rows, 0)
+        stats._changes = None
+        if settings.QUERY_BUDGET_ENFORCED:
+            stats.statements.append(" ".join(statement.split()))
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        # Una sentencia que falla también cuenta (tiempo y presupuesto), sin filas escritas
+        stats = _current.get()
+        if stats is None or stats._started is None:
+            return
+        stats.db_time += time.perf_counter() - stats._started
+        stats._started = None
+        stats._changes = None
+        stats.count += 1
+        if settings.QUERY_BUDGET_ENFORCED and exception_context.statement is not None:
+            stats.statements.append(" ".join(exception_context.statement.split()))
+
+
+def query_budget(max_queries: int) -> Callable[[], None]:
+    """
+    Dependency que fija el presupuesto de sentencias SQL de una ruta.
+    Solo se aplica con QUERY_BUDGET_ENFORCED (desarrollo y pruebas).
+    """
+    def set_budget():
+        stats = _current.get()
+        if stats is not None:
+            stats.budget = max_queries
+    return set_budget
+
+
+async def query_stats_middleware(request: Request, call_next):
+    """Medir las sentencias SQL de cada petición y reportarlas en Server-Timing"""
+    stats = RequestQueryStats(budget=settings.QUERY_BUDGET_DEFAULT or None)
+    token = _current.set(stats)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _current.reset(token)
+
+    if settings.QUERY_BUDGET_ENFORCED and stats.budget is not None and stats.count > stats.budget:
+        response = JSONResponse(
+            status_code=500,
+            content={
+                "detail": f"Presupuesto de consultas excedido: {stats.count} > {stats.budget}",
+                "route": f"{request.method} {request.url.path}",
+                "statements": stats.statements,
+            }
+        )
+    response.headers["Server-Timing"] = stats.server_timing(time.perf_counter() - start)
+    return response
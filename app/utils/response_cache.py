@@ -0,0 +1,189 @@
+import asyncio
+import gzip
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+
+from app.config import settings
+from app.database import is_pinned_to_primary
+from app.utils.cache import TTLCache
+from app.utils.conditional import body_tag, entity_tag, gzip_tag, is_conditional, is_not_modified, not_modified
+from app.utils.export import accepts_gzip
+from app.utils.pagination import set_next_cursor
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+class CachedResponse:
+    """Cuerpo JSON ya serializado, su versión gzip (si vale la pena), su ETag y el cursor de la página siguiente"""
+
+    __slots__ = ("body", "gzipped", "etag", "next_cursor")
+
+    def __init__(self, body: bytes, etag: str, next_cursor: Optional[str] = None):
+        self.body = body
+        self.etag = etag
+        self.next_cursor = next_cursor
+        self.gzipped = None
+        if len(body) >= settings.RESPONSE_CACHE_GZIP_MIN_BYTES:
+            self.gzipped = gzip.compress(body, compresslevel=settings.RESPONSE_CACHE_GZIP_LEVEL, mtime=0)
+
+    def render(self, request: Request) -> Response:
+        """
+        304 si el cliente ya tiene la representación que se le enviaría; si no, el cuerpo
+        (comprimido si lo acepta). Cada codificación tiene su propio ETag
+        """
+        compress = self.gzipped is not None and accepts_gzip(request)
+        etag = gzip_tag(self.etag) if compress else self.etag
+        if is_not_modified(request, etag):
+            response = not_modified(etag)
+        else:
+            response = Response(self.gzipped if compress else self.body, media_type=JSON_MEDIA_TYPE)
+            if compress:
+                response.headers["Content-Encoding"] = "gzip"
+            response.headers["ETag"] = etag
+            set_next_cursor(request, response, self.next_cursor)
+        if self.gzipped is not None:
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+class ResponseCache:
+    """
+    Respuestas serializadas de las lecturas de un recurso (un registro por ID y páginas
+    del listado por ruta y parámetros), en cachés LRU con vencimiento de este worker.
+
+    - Invalidación: el controlador llama invalidate(id) al actualizar o eliminar (descarta
+      ese registro y todas las páginas) e invalidate() al crear (solo las páginas).
+    - Estampida: las peticiones por una llave que ya se está cargando esperan esa carga
+      en lugar de repetir la consulta.
+    - Una carga que empezó antes de una invalidación no se guarda.
+    - Los clientes fijados al primario (escribieron hace poco) no leen de la caché.
+    - ETag: la versión del registro o el resumen del cuerpo de la página, con el sufijo -gz
+      en la versión comprimida. Con If-None-Match se responde 304 desde la caché o, si el
+      registro no está, consultando solo su versión.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self._one = TypeAdapter(model)
+        self._many = TypeAdapter(List[model])
+        self.items = TTLCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL_SECONDS)
+        self.pages = TTLCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL_SECONDS)
+        self._generation = 0
+        self._loading: Dict[Tuple[Hashable, int], asyncio.Future] = {}
+        self.coalesced = 0
+        self.discarded = 0
+        self.revalidated = 0
+
+    async def item(
+        self,
+        request: Request,
+        item_id: Hashable,
+        load: Callable[[], Awaitable[Any]],
+        version: Optional[Callable[[], Awaitable[Optional[int]]]] = None
+    ) -> Response:
+        """
+        Respuesta de un registro; `load` lo consulta (o lanza HTTPException si no existe) y
+        `version` consulta solo su versión, para responder 304 sin cargarlo
+        """
+        async def build() -> CachedResponse:
+            item = await load()
+            return CachedResponse(self._one.dump_json(item, by_alias=True), entity_tag(item_id, item.version))
+
+        async def probe() -> Optional[str]:
+            current = await version()
+            return None if current is None else entity_tag(item_id, current)
+
+        return await self._serve(request, self.items, item_id, build, probe if version is not None else None)
+
+    async def page(
+        self, request: Request, load: Callable[[], Awaitable[Tuple[List[Any], Optional[str]]]]
+    ) -> Response:
+        """Respuesta de una página del listado; `load` retorna los registros y el cursor siguiente"""
+        async def build() -> CachedResponse:
+            items, next_cursor = await load()
+            body = self._many.dump_json(items, by_alias=True)
+            return CachedResponse(body, body_tag(body), next_cursor)
+
+        key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+        return await self._serve(request, self.pages, key, build)
+
+    async def _serve(
+        self,
+        request: Request,
+        entries: TTLCache,
+        key: Hashable,
+        build: Callable[[], Awaitable[CachedResponse]],
+        probe: Optional[Callable[[], Awaitable[Optional[str]]]] = None
+    ) -> Response:
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return (await build()).render(request)
+        if is_pinned_to_primary(request):
+            # Lectura fresca del primario; sirve también para refrescar la caché
+            return (await self._load(entries, key, build)).render(request)
+
+        cached = entries.get(key)
+        if cached is not None:
+            return cached.render(request)
+        if probe is not None and is_conditional(request):
+            etag = await probe()
+            # Sin cargar el cuerpo no se sabe si tiene versión gzip: vale el ETag de cualquiera
+            # de las dos que el cliente pueda tener
+            tags = (etag, gzip_tag(etag)) if accepts_gzip(request) else (etag,)
+            for tag in tags if etag is not None else ():
+                if is_not_modified(request, tag):
+                    self.revalidated += 1
+                    return not_modified(tag)
+
+        loading = self._loading.get((key, self._generation))
+        if loading is not None:
+            self.coalesced += 1
+            try:
+                return (await asyncio.shield(loading)).render(request)
+            except asyncio.CancelledError:
+                # Se canceló la petición que cargaba, no esta: cargar aquí
+                if not loading.cancelled():
+                    raise
+        return (await self._load(entries, key, build)).render(request)
+
+    async def _load(self, entries: TTLCache, key: Hashable, build: Callable[[], Awaitable[CachedResponse]]) -> CachedResponse:
+        generation = self._generation
+        flight = (key, generation)
+        future = asyncio.get_running_loop().create_future()
+        self._loading.setdefault(flight, future)
+        try:
+            cached = await build()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            # Que el error no quede sin recuperar si nadie esperaba la carga
+            future.exception()
+            raise
+        else:
+            future.set_result(cached)
+            if generation == self._generation:
+                entries.set(key, cached)
+            else:
+                self.discarded += 1
+            return cached
+        finally:
+            if self._loading.get(flight) is future:
+                del self._loading[flight]
+
+    def invalidate(self, item_id: Optional[Hashable] = None):
+        """Tras una escritura: descartar las páginas y, si se indica, el registro"""
+        self._generation += 1
+        self.pages.clear()
+        if item_id is not None:
+            self.items.pop(item_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": self.items.stats(),
+            "pages": self.pages.stats(),
+            "coalesced": self.coalesced,
+            "discarded": self.discarded,
+            "revalidated": self.revalidated,
+        }
@@ -0,0 +1,86 @@
+import re
+from typing import List
+
+from sqlalchemy import text
+
+# Índice FTS5 (SQLite) de título y descripción de las experiencias
+FTS_TABLE = "experiences_fts"
+# Configuración de búsqueda de PostgreSQL: español (stemming) sin tildes
+PG_SEARCH_CONFIG = "es_unaccent"
+# Peso del título frente a la descripción en el ranking
+TITLE_WEIGHT = 10.0
+# Palabras consideradas de una búsqueda
+MAX_TERMS = 8
+
+_WORD = re.compile(r"[^\W_]+")
+
+SQLITE_DDL = [
+    # Tabla de contenido externo: el texto vive en experiences, FTS5 solo guarda el índice.
+    # unicode61 con remove_diacritics 2 ignora mayúsculas y tildes ("Café" = "cafe")
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "title, description, content='experiences', content_rowid='id_experience', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    # Los triggers mantienen el índice en la misma transacción de cada escritura (también la importación masiva)
+    f"CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON experiences BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id_experience, new.title, new.description); "
+    "END",
+    f"CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON experiences BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+    "VALUES ('delete', old.id_experience, old.title, old.description); "
+    "END",
+    f"CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF title, description ON experiences BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+    "VALUES ('delete', old.id_experience, old.title, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id_experience, new.title, new.description); "
+    "END",
+    # Indexar las experiencias que ya existían
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "DO $$ BEGIN "
+    f"IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{PG_SEARCH_CONFIG}') THEN "
+    f"CREATE TEXT SEARCH CONFIGURATION {PG_SEARCH_CONFIG} (COPY = spanish); "
+    f"ALTER TEXT SEARCH CONFIGURATION {PG_SEARCH_CONFIG} "
+    "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem; "
+    "END IF; END $$",
+    # Columna generada: PostgreSQL la recalcula en cada INSERT/UPDATE (también con COPY)
+    "ALTER TABLE experiences ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    f"setweight(to_tsvector('{PG_SEARCH_CONFIG}'::regconfig, coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{PG_SEARCH_CONFIG}'::regconfig, coalesce(description, '')), 'B')"
+    ") STORED",
+    "CREATE INDEX IF NOT EXISTS ix_experiences_search ON experiences USING gin (search_vector)",
+]
+
+
+def ensure_search_index(target, connection, **kw):
+    """
+    Listener after_create de la metadata: crear el índice de búsqueda de experiencias
+    si no existe (bases nuevas y existentes). En otros motores la búsqueda usa ILIKE.
+    """
+    if connection.dialect.name == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first()
+        if exists is None:
+            for statement in SQLITE_DDL:
+                connection.exec_driver_sql(statement)
+    elif connection.dialect.name == "postgresql":
+        for statement in POSTGRES_DDL:
+            connection.exec_driver_sql(statement)
+
+
+def search_terms(query: str) -> List[str]:
+    """Palabras de la búsqueda en minúsculas, sin signos ni operadores"""
+    return _WORD.findall(query.lower())[:MAX_TERMS]
+
+
+def fts5_query(terms: List[str]) -> str:
+    """Todas las palabras, como prefijo: "cafe"* "salen"*"""
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def tsquery(terms: List[str]) -> str:
+    """Todas las palabras, como prefijo: cafe:* & salen:*"""
+    return " & ".join(f"{term}:*" for term in terms)
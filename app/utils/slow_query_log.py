@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from logging.handlers import RotatingFileHandler
+from typing import Any, List, Optional
+
+import greenlet
+from sqlalchemy import event
+
+from app.config import settings
+
+logger = logging.getLogger("triada.slow_queries")
+
+EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+}
+EXPLAINABLE = ("select", "with", "update", "delete", "insert")
+EXPLAIN_SAVEPOINT = "slow_query_explain"
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Una línea JSON por consulta lenta"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"timestamp": datetime.now(timezone.utc).isoformat(), **record.slow_query}
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def get_slow_query_logger() -> logging.Logger:
+    """Configurar (una sola vez) el archivo rotativo del log de consultas lentas"""
+    if not logger.handlers:
+        directory = os.path.dirname(settings.SLOW_QUERY_LOG_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = RotatingFileHandler(
+            settings.SLOW_QUERY_LOG_FILE,
+            maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=settings.SLOW_QUERY_LOG_BACKUP_COUNT,
+            encoding="utf-8",
+            delay=True
+        )
+        handler.setFormatter(JsonLineFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(logging.WARNING)
+        logger.propagate = False
+    return logger
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Conservar números, booleanos y nulos; ocultar textos, fechas y binarios"""
+    if isinstance(parameters, dict):
+        return {key: redact_parameters(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact_parameters(value) for value in parameters]
+    if parameters is None or isinstance(parameters, (bool, int, float, Decimal)):
+        return parameters
+    if isinstance(parameters, (str, bytes)):
+        return f"<{type(parameters).__name__}:{len(parameters)}>"
+    return f"<{type(parameters).__name__}>"
+
+
+def find_controller_caller() -> Optional[str]:
+    """
+    Método de controlador que originó la consulta.
+
+    Con AsyncSession la sentencia se ejecuta en un greenlet hijo; la pila del
+    controlador (corutinas) continúa en el frame suspendido del greenlet padre.
+    """
+    frame = sys._getframe(1)
+    current = greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            module = frame.f_globals.get("__name__", "")
+            if module.startswith("app.controllers."):
+                name = getattr(frame.f_code, "co_qualname", frame.f_code.co_name)
+                return f"{module}.{name}"
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return None
+        frame = current.gr_frame
+
+
+def explain(conn, statement: str, parameters: Any) -> List[str]:
+    """Plan de ejecución de la sentencia con el EXPLAIN propio del motor"""
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().lower().startswith(EXPLAINABLE):
+        return []
+    # Cursor DBAPI directo: no dispara eventos ni cuenta en las métricas de la petición
+    cursor = conn.connection.cursor()
+    # En PostgreSQL un error del EXPLAIN dejaría abortada la transacción de la petición
+    # (su consulta sí funcionó): va en un SAVEPOINT que se revierte si falla
+    savepoint = conn.dialect.name == "postgresql" and conn.in_transaction()
+    try:
+        if savepoint:
+            cursor.execute(f"SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return [str(row[-1]) for row in cursor.fetchall()]
+        except Exception:
+            if savepoint:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}")
+            raise
+        finally:
+            if savepoint:
+                cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+    finally:
+        cursor.close()
+
+
+def register_slow_query_log(engine, name: str):
+    """Registrar en el log rotativo las sentencias que superen SLOW_QUERY_THRESHOLD_MS"""
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info["slow_query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop("slow_query_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        if elapsed < threshold:
+            return
+
+        entry = {
+            "engine": name,
+            "dialect": conn.dialect.name,
+            "duration_ms": round(elapsed * 1000, 3),
+            "statement": " ".join(statement.split()),
+            "parameters": redact_parameters(parameters),
+            "executemany": executemany,
+            "caller": find_controller_caller(),
+            "plan": [],
+        }
+        if settings.SLOW_QUERY_EXPLAIN and not executemany:
+            try:
+                entry["plan"] = explain(conn, statement, parameters)
+            except Exception as exc:
+                entry["plan_error"] = str(exc)
+        get_slow_query_logger().warning("slow query", extra={"slow_query": entry})
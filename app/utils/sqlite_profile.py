@@ -0,0 +1,35 @@
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+
+def get_sqlite_pragmas() -> Dict[str, object]:
+    """PRAGMAs del perfil de producción de SQLite según Settings"""
+    return {
+        # WAL permite lectores concurrentes mientras un escritor hace commit
+        "journal_mode": "WAL",
+        # En WAL, NORMAL solo sincroniza en los checkpoints: seguro ante caídas del proceso
+        "synchronous": "NORMAL",
+        "foreign_keys": "ON",
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "temp_store": "MEMORY",
+    }
+
+
+def apply_sqlite_profile(engine: Engine, pragmas: Dict[str, object] = None):
+    """Ejecutar los PRAGMAs del perfil en cada conexión nueva del engine"""
+    pragmas = pragmas if pragmas is not None else get_sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
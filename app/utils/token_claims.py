@@ -0,0 +1,81 @@
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.client import Client
+from app.models.owner import Owner
+from app.models.user import User
+from app.schemas.auth import TokenClaims
+from app.utils.auth import create_access_token
+from app.utils.user_cache import token_state
+
+# Rol base de todo usuario; "owner" y "client" según las tablas de los modelos polimórficos
+BASE_ROLE = "user"
+
+
+async def user_roles(db: AsyncSession, user_id: int) -> List[str]:
+    """Roles del usuario en una consulta: base, más owner y client si tiene fila en esas tablas"""
+    result = await db.execute(
+        select(
+            exists().where(Owner.__table__.c.id_owner == user_id),
+            exists().where(Client.__table__.c.id_client == user_id)
+        )
+    )
+    is_owner, is_client = result.one()
+    roles = [BASE_ROLE]
+    if is_owner:
+        roles.append("owner")
+    if is_client:
+        roles.append("client")
+    return roles
+
+
+async def issue_access_token(
+    db: AsyncSession,
+    user_id: int,
+    username: str,
+    is_active: bool,
+    generation: Optional[int] = None,
+    expires_delta: timedelta = timedelta(minutes=30)
+) -> str:
+    """
+    Token de acceso con sub y user_id; con AUTH_CLAIMS_TOKENS incluye además el estado
+    activo (act), los roles y la generación de tokens del usuario (gen)
+    """
+    data: Dict[str, Any] = {"sub": username, "user_id": user_id}
+    if settings.AUTH_CLAIMS_TOKENS:
+        if generation is None:
+            state = await token_state(db, user_id)
+            generation = state[0] if state is not None else 0
+        data.update(act=bool(is_active), roles=await user_roles(db, user_id), gen=generation)
+    return create_access_token(data=data, expires_delta=expires_delta)
+
+
+def claims_from_payload(payload: Dict[str, Any]) -> Optional[TokenClaims]:
+    """Claims de un token con el formato de claims; None si es un token anterior (solo sub y user_id)"""
+    if "gen" not in payload or "roles" not in payload:
+        return None
+    try:
+        return TokenClaims(
+            user_id=payload["user_id"],
+            username=payload["sub"],
+            is_active=payload.get("act", False),
+            roles=payload["roles"],
+            generation=payload["gen"]
+        )
+    except (KeyError, ValueError):
+        return None
+
+
+def is_current(claims: TokenClaims, state: Optional[Tuple[int, bool]]) -> bool:
+    """El token sigue vigente si su generación es la actual del usuario y este sigue activo"""
+    return state is not None and state[1] and state[0] == claims.generation
+
+
+async def is_revoked(db: AsyncSession, payload: Dict[str, Any]) -> bool:
+    """Token con claims cuya generación ya no es la del usuario (o usuario desactivado)"""
+    claims = claims_from_payload(payload)
+    return claims is not None and not is_current(claims, await token_state(db, claims.user_id))
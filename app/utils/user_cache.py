@@ -0,0 +1,65 @@
+from typing import Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.user import User
+from app.schemas.auth import UserProfile
+from app.utils.cache import TTLCache
+
+# UserProfile resuelto por ID de usuario para las dependencias de autenticación de este worker
+user_cache = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+# (generación de tokens, activo) por ID de usuario, para validar los tokens con claims
+token_states = TTLCache(settings.TOKEN_STATE_CACHE_SIZE, settings.TOKEN_STATE_TTL_SECONDS)
+# Escrituras de usuarios en este worker: una carga que empezó antes de una no se guarda
+_generation = 0
+
+
+async def resolve_user(db: AsyncSession, username: str, user_id: int) -> Optional[UserProfile]:
+    """
+    Usuario del token (sub y user_id) desde la caché o, si no está, desde la base por
+    username, como antes. Una entrada cuyo username ya no coincide con el token no sirve.
+    Retorna None si el usuario no existe; el llamador revisa is_active.
+    """
+    cached = user_cache.get(user_id) if settings.USER_CACHE_ENABLED else None
+    if cached is not None and cached.username == username:
+        return cached
+
+    generation = _generation
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalar_one_or_none()
+    if user is None:
+        return None
+    profile = UserProfile.from_orm(user)
+    if settings.USER_CACHE_ENABLED and generation == _generation:
+        user_cache.set(profile.id, profile)
+    return profile
+
+
+async def token_state(db: AsyncSession, user_id: int) -> Optional[Tuple[int, bool]]:
+    """
+    Generación de tokens y estado activo del usuario, desde la caché o con una consulta de
+    solo esas dos columnas por llave primaria. None si el usuario no existe.
+    """
+    cached = token_states.get(user_id)
+    if cached is not None:
+        return cached
+
+    generation = _generation
+    result = await db.execute(select(User.token_generation, User.is_active).where(User.id == user_id))
+    row = result.first()
+    if row is None:
+        return None
+    state = (row.token_generation or 0, bool(row.is_active))
+    if generation == _generation:
+        token_states.set(user_id, state)
+    return state
+
+
+def forget_user(user_id: int):
+    """Descartar el usuario tras una escritura que lo cambia (datos, contraseña, desactivación)"""
+    global _generation
+    _generation += 1
+    user_cache.pop(user_id)
+    token_states.pop(user_id)
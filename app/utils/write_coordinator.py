@@ -0,0 +1,266 @@
+import asyncio
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import settings
+from app.database import SQLALCHEMY_DATABASE_URL, build_engine, pin_to_primary
+
+Operation = Callable[[AsyncSession], Awaitable[Any]]
+
+
+def _enable_sqlite_savepoints(sync_engine):
+    """
+    pysqlite/aiosqlite no emiten BEGIN antes de un SAVEPOINT, así que el RELEASE
+    del primer savepoint confirmaría la transacción. Se toma el control del BEGIN
+    (IMMEDIATE: el escritor único reserva el lock de escritura desde el inicio).
+    """
+    @event.listens_for(sync_engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(sync_engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+class WriteCoordinator:
+    """
+    Escritor único que agrupa las escrituras de todos los controladores en group commits.
+
+    Cada operación se ejecuta dentro de un SAVEPOINT del lote: si falla (por ejemplo
+    con IntegrityError) solo se revierte esa operación y su llamador recibe la excepción.
+    El resto del lote se confirma con un único COMMIT y cada future se resuelve con su fila.
+    """
+
+    def __init__(self, max_batch: int = 64, max_wait_ms: float = 2.0, queue_size: int = 10000):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue_size = queue_size
+        self._queue: asyncio.Queue = None
+        self._task: asyncio.Task = None
+        self._engine = None
+        self._sessionmaker = None
+        self.batches = 0
+        self.operations = 0
+        self.failed_batches = 0
+        self.max_batch_seen = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, url: str = SQLALCHEMY_DATABASE_URL):
+        """Crear la conexión dedicada del escritor y lanzar su tarea"""
+        if self.running:
+            return
+        self._engine = build_engine(url, "writer", poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0)
+        if make_url(url).get_backend_name() == "sqlite":
+            _enable_sqlite_savepoints(self._engine.sync_engine)
+        self._sessionmaker = async_sessionmaker(self._engine, expire_on_commit=False, autoflush=False)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Procesar las escrituras pendientes y detener el escritor"""
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        await self._engine.dispose()
+
+    async def submit(self, operation: Operation) -> Any:
+        """Encolar una operación de escritura y esperar a que su lote se confirme"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, future))
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores del escritor para el endpoint interno"""
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "batches": self.batches,
+            "operations": self.operations,
+            "failed_batches": self.failed_batches,
+            "avg_batch_size": round(self.operations / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+
+            # Acumular operaciones hasta llenar el lote o agotar la espera máxima
+            batch = [item]
+            stopping = False
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                try:
+                    if remaining <= 0:
+                        item = self._queue.get_nowait()
+                    else:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._commit_batch(batch)
+            if stopping:
+                return
+
+    async def _commit_batch(self, batch):
+        outcomes = []
+        try:
+            async with self._sessionmaker() as session:
+                async with session.begin():
+                    for operation, future in batch:
+                        try:
+                            async with session.begin_nested():
+                                outcomes.append((future, await operation(session), None))
+                        except Exception as exc:
+                            outcomes.append((future, None, exc))
+        except Exception as exc:
+            # Falló el COMMIT del lote: ninguna operación quedó confirmada
+            self.failed_batches += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.operations += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        for future, result, exc in outcomes:
+            if future.done():
+                continue
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+write_coordinator = WriteCoordinator(
+    max_batch=settings.WRITE_COORDINATOR_MAX_BATCH,
+    max_wait_ms=settings.WRITE_COORDINATOR_MAX_WAIT_MS,
+    queue_size=settings.WRITE_COORDINATOR_QUEUE_SIZE
+)
+
+
+async def _add_and_flush(instance, session: AsyncSession):
+    session.add(instance)
+    await session.flush()
+    return instance
+
+
+async def _merge_and_flush(instance, session: AsyncSession):
+    await session.merge(instance)
+    await session.flush()
+    return instance
+
+
+async def _execute_returning(statement, session: AsyncSession):
+    result = await session.execute(statement)
+    return result.scalar_one_or_none()
+
+
+async def _execute_returning_all(statement, parameters, session: AsyncSession):
+    result = await session.execute(statement, parameters)
+    return result.scalars().all()
+
+
+async def _execute(statement, session: AsyncSession):
+    result = await session.execute(statement)
+    return result.rowcount
+
+
+async def save_new(db: AsyncSession, instance):
+    """Insertar una instancia nueva y devolverla con su ID asignado"""
+    if write_coordinator.running:
+        instance = await write_coordinator.submit(partial(_add_and_flush, instance))
+        pin_to_primary(db)
+        return instance
+    db.add(instance)
+    await db.commit()
+    # expire_on_commit=False: la instancia ya tiene su ID y los defaults aplicados en el flush
+    return instance
+
+
+async def save_changes(db: AsyncSession, instance, refresh: bool = False):
+    """Confirmar los cambios hechos con setattr sobre una instancia cargada por `db`"""
+    if write_coordinator.running:
+        await write_coordinator.submit(partial(_merge_and_flush, instance))
+        # La instancia conserva los valores nuevos; `db` ya no debe volver a escribirlos
+        db.expunge(instance)
+        pin_to_primary(db)
+        return instance
+    await db.commit()
+    if refresh:
+        await db.refresh(instance)
+    return instance
+
+
+async def execute_write(db: AsyncSession, statement) -> int:
+    """Ejecutar un UPDATE/DELETE y confirmarlo; retorna las filas afectadas"""
+    if write_coordinator.running:
+        rowcount = await write_coordinator.submit(partial(_execute, statement))
+        # Las lecturas posteriores de `db` deben ver los valores ya confirmados
+        db.expire_all()
+        pin_to_primary(db)
+        return rowcount
+    result = await db.execute(statement)
+    await db.commit()
+    return result.rowcount
+
+
+async def write_returning(db: AsyncSession, statement):
+    """Ejecutar un INSERT/UPDATE ... RETURNING y confirmarlo; retorna la fila o None"""
+    if write_coordinator.running:
+        row = await write_coordinator.submit(partial(_execute_returning, statement))
+        db.expire_all()
+        pin_to_primary(db)
+        return row
+    row = (await db.execute(statement)).scalar_one_or_none()
+    await db.commit()
+    return row
+
+
+async def write_returning_all(db: AsyncSession, statement, parameters=None) -> list:
+    """Ejecutar un INSERT/UPDATE ... RETURNING (una o varias filas de parámetros) y confirmarlo"""
+    if write_coordinator.running:
+        rows = await write_coordinator.submit(partial(_execute_returning_all, statement, parameters))
+        db.expire_all()
+        pin_to_primary(db)
+        return rows
+    rows = (await db.execute(statement, parameters)).scalars().all()
+    await db.commit()
+    return rows
+
+
+async def write_transaction(db: AsyncSession, operation: Operation):
+    """
+    Ejecutar `operation(session)` (varias sentencias) como una sola transacción y confirmarla.
+    Con el escritor único corre dentro de un SAVEPOINT de su lote; si no, sobre `db`.
+    """
+    if write_coordinator.running:
+        result = await write_coordinator.submit(operation)
+        db.expire_all()
+        pin_to_primary(db)
+        return result
+    result = await operation(db)
+    await db.commit()
+    return result
@@ -0,0 +1,115 @@
+"""
+Benchmark de disponibilidad: índice en memoria frente a NOT EXISTS en SQL.
+
+Crea `--estates` fincas y `--bookings` reservas (estadías de 1 a 7 noches, sin
+cruces dentro de cada finca) en un SQLite temporal, carga el índice y mide la
+latencia de EstateController.get_available_estates para rangos aleatorios:
+
+    python benchmarks/availability.py --estates 5000 --bookings 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base de datos debe definirse antes de importar la aplicación
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_availability.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from app.controllers.estateController import EstateController  # noqa: E402
+from app.database import SessionLocal, create_tables, dispose_engine  # noqa: E402
+from app.utils.availability import availability_index  # noqa: E402
+
+FIRST_DAY = date(2025, 1, 1)
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def seed(estates: int, bookings: int):
+    """Insertar fincas y reservas directamente con sqlite3 (mucho más rápido que el ORM)"""
+    rng = random.Random(7)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("INSERT INTO users (id, username, email, hashed_password, is_active) VALUES (1, 'bench', 'b@x.co', 'x', 1)")
+    conn.executemany(
+        "INSERT INTO estates (id, name, location, size, price, capacity, owner_id) VALUES (?, ?, 'Salento', 10, ?, ?, 1)",
+        [(i, f"Finca {i}", rng.randint(100, 1000), rng.choice([None, 2, 4, 8, 12])) for i in range(1, estates + 1)]
+    )
+    per_estate = bookings // estates
+    rows = []
+    for estate_id in range(1, estates + 1):
+        day = FIRST_DAY + timedelta(rng.randint(0, 3))
+        for _ in range(per_estate):
+            nights = rng.randint(1, 7)
+            status = "cancelled" if rng.random() < 0.1 else "confirmed"
+            rows.append((day.isoformat(), (day + timedelta(nights)).isoformat(), status, estate_id))
+            day += timedelta(nights + rng.randint(0, 3))
+        if len(rows) >= 50000:
+            conn.executemany(
+                "INSERT INTO bookings (start_date, end_date, status, num_persons, user_id, estate_id) VALUES (?, ?, ?, 2, 1, ?)",
+                rows
+            )
+            rows = []
+    conn.executemany(
+        "INSERT INTO bookings (start_date, end_date, status, num_persons, user_id, estate_id) VALUES (?, ?, ?, 2, 1, ?)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+async def measure(name: str, ranges, persons: int):
+    latencies, found = [], 0
+    for start, end in ranges:
+        begin = time.perf_counter()
+        async with SessionLocal() as db:
+            estates = await EstateController(db).get_available_estates(start, end, persons=persons, limit=100)
+        latencies.append(time.perf_counter() - begin)
+        found += len(estates)
+    print(
+        f"{name:<8} p50={statistics.median(latencies) * 1000:>8.2f}ms  "
+        f"p99={percentile(latencies, 99) * 1000:>8.2f}ms  fincas/consulta={found / len(ranges):.0f}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estates", type=int, default=5000)
+    parser.add_argument("--bookings", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--persons", type=int, default=4)
+    args = parser.parse_args()
+
+    await create_tables()
+    seed(args.estates, args.bookings)
+
+    rng = random.Random(11)
+    ranges = []
+    for _ in range(args.queries):
+        start = FIRST_DAY + timedelta(rng.randint(0, 700))
+        ranges.append((start, start + timedelta(rng.randint(1, 7))))
+
+    print(f"{args.estates} fincas, {args.bookings} reservas, {args.queries} consultas")
+    await measure("sql", ranges, args.persons)
+
+    availability_index.enabled = True
+    await availability_index.load()
+    print(f"carga del índice: {availability_index.load_seconds:.2f}s ({availability_index.stats()['bookings']} reservas activas)")
+    await measure("índice", ranges, args.persons)
+
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
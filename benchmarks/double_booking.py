@@ -0,0 +1,219 @@
+"""
+Prueba de carga de reservas en conflicto: exactamente una debe ganar.
+
+En cada una de las `--rounds` rondas, `--requests` reservas concurrentes piden la
+misma finca en rangos que comparten al menos una noche. Se verifica que solo una
+reciba 201, que el resto reciba 409 y que la finca quede con una sola reserva
+activa. Después se mide el throughput sin conflictos (cada reserva en otra finca).
+
+Con `--processes` varias instancias de la aplicación (como varios workers de
+uvicorn) compiten por la misma base; con `--coordinator` las escrituras pasan por
+el escritor único. DATABASE_URL permite usar PostgreSQL (advisory locks):
+
+    python benchmarks/double_booking.py --requests 500 --concurrency 200 --processes 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base de datos debe definirse antes de importar la aplicación (los procesos hijos heredan la ruta)
+DB_PATH = os.environ.setdefault("DOUBLE_BOOKING_DB", os.path.join(tempfile.mkdtemp(), "bench_double_booking.db"))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("SQLITE_PROFILE", "production")
+
+from fastapi import HTTPException  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app.controllers.bookingController import BookingController  # noqa: E402
+from app.database import SessionLocal, create_tables, dispose_engine  # noqa: E402
+from app.models import Booking, Estate, User  # noqa: E402
+from app.schemas.booking import BookingCreate  # noqa: E402
+from app.utils.availability import INACTIVE_STATUSES  # noqa: E402
+from app.utils.write_coordinator import write_coordinator  # noqa: E402
+
+# Noche que comparten todas las reservas de una ronda
+PIVOT_NIGHT = date(2025, 12, 24)
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def conflicting_round(rng: random.Random, estate_id: int, requests: int):
+    """Rangos distintos que incluyen PIVOT_NIGHT: cualquier par se cruza"""
+    return [
+        {
+            "start_date": PIVOT_NIGHT - timedelta(rng.randint(0, 3)),
+            "end_date": PIVOT_NIGHT + timedelta(rng.randint(1, 4)),
+            "status": rng.choice(["pending", "confirmed"]),
+            "num_persons": 2,
+            "user_id": 1,
+            "estate_id": estate_id,
+        }
+        for _ in range(requests)
+    ]
+
+
+async def fire(payloads, concurrency: int):
+    """Crear las reservas con `concurrency` peticiones simultáneas; cuenta los códigos de respuesta"""
+    codes, latencies = Counter(), []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def create(payload):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                async with SessionLocal() as db:
+                    await BookingController(db).create_booking(BookingCreate(**payload))
+                codes[201] += 1
+            except HTTPException as exc:
+                codes[exc.status_code] += 1
+            except Exception as exc:
+                codes[type(exc).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(create(payload) for payload in payloads))
+    return codes, latencies, time.perf_counter() - start
+
+
+async def run_rounds(rounds, concurrency: int, coordinator: bool, barrier=None, results=None):
+    """Ejecutar las rondas; en modo multiproceso cada ronda arranca a la vez en todos los procesos"""
+    if coordinator:
+        await write_coordinator.start()
+    outcomes = []
+    for payloads in rounds:
+        if barrier is not None:
+            await asyncio.to_thread(barrier.wait)
+        outcome = await fire(payloads, concurrency)
+        if results is not None:
+            results.put(outcome)
+        outcomes.append(outcome)
+    if coordinator:
+        await write_coordinator.stop()
+    await dispose_engine()
+    return outcomes
+
+
+def worker(rounds, concurrency, coordinator, barrier, results):
+    asyncio.run(run_rounds(rounds, concurrency, coordinator, barrier, results))
+
+
+def execute(rounds, args):
+    """Repartir cada ronda entre los procesos y combinar los resultados por ronda"""
+    if args.processes <= 1:
+        return asyncio.run(run_rounds(rounds, args.concurrency, args.coordinator))
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(args.processes)
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=worker,
+            args=([payloads[index::args.processes] for payloads in rounds], args.concurrency,
+                  args.coordinator, barrier, results)
+        )
+        for index in range(args.processes)
+    ]
+    for process in workers:
+        process.start()
+    outcomes = []
+    for _ in rounds:
+        codes, latencies, elapsed = Counter(), [], 0.0
+        for _ in range(args.processes):
+            process_codes, process_latencies, process_elapsed = results.get()
+            codes.update(process_codes)
+            latencies.extend(process_latencies)
+            elapsed = max(elapsed, process_elapsed)
+        outcomes.append((codes, latencies, elapsed))
+    for process in workers:
+        process.join()
+    return outcomes
+
+
+async def seed(estates: int):
+    await create_tables()
+    async with SessionLocal() as db:
+        await db.execute(insert(User).values(id=1, username="bench", email="bench@example.com", hashed_password="x"))
+        await db.execute(insert(Estate), [
+            {"id": estate_id, "name": f"Finca {estate_id}", "location": "Salento", "size": 10, "price": 1000, "owner_id": 1}
+            for estate_id in range(1, estates + 1)
+        ])
+        await db.commit()
+    await dispose_engine()
+
+
+async def active_bookings(estate_ids):
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(Booking.estate_id, func.count())
+            .where(Booking.estate_id.in_(estate_ids), Booking.status.not_in(INACTIVE_STATUSES))
+            .group_by(Booking.estate_id)
+        )
+        counts = dict(result.all())
+    await dispose_engine()
+    return counts
+
+
+def report(name: str, outcomes):
+    requests = sum(sum(codes.values()) for codes, _, _ in outcomes)
+    elapsed = sum(elapsed for _, _, elapsed in outcomes)
+    latencies = [latency for _, round_latencies, _ in outcomes for latency in round_latencies]
+    codes = Counter()
+    for round_codes, _, _ in outcomes:
+        codes.update(round_codes)
+    print(
+        f"{name:<14} {requests / elapsed:>8.1f} reservas/s  p50={statistics.median(latencies) * 1000:>7.2f}ms  "
+        f"p99={percentile(latencies, 99) * 1000:>7.2f}ms  respuestas={dict(codes)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--coordinator", action="store_true")
+    args = parser.parse_args()
+
+    # Fincas 1..rounds para los conflictos; el resto, una por reserva sin conflicto
+    asyncio.run(seed(args.rounds + args.requests))
+    rng = random.Random(3)
+
+    print(f"{args.rounds} rondas de {args.requests} reservas en conflicto, {args.processes} proceso(s), "
+          f"{args.concurrency} simultáneas por proceso{', escritor único' if args.coordinator else ''}")
+    conflict_estates = list(range(1, args.rounds + 1))
+    outcomes = execute([conflicting_round(rng, estate_id, args.requests) for estate_id in conflict_estates], args)
+    report("en conflicto", outcomes)
+
+    free_round = [
+        {"start_date": PIVOT_NIGHT, "end_date": PIVOT_NIGHT + timedelta(2), "status": "pending",
+         "num_persons": 2, "user_id": 1, "estate_id": args.rounds + 1 + index}
+        for index in range(args.requests)
+    ]
+    report("sin conflicto", execute([free_round], args))
+
+    # Exactamente una ganadora por ronda, en las respuestas y en la base
+    counts = asyncio.run(active_bookings(conflict_estates))
+    for estate_id, (codes, _, _) in zip(conflict_estates, outcomes):
+        assert codes[201] == 1, f"finca {estate_id}: {codes[201]} reservas aceptadas"
+        assert codes[409] == args.requests - 1, f"finca {estate_id}: respuestas {dict(codes)}"
+        assert counts.get(estate_id) == 1, f"finca {estate_id}: {counts.get(estate_id)} reservas activas"
+    print(f"ok: una reserva por finca en las {args.rounds} rondas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark de las facetas del listado de fincas.
+
+Crea `--estates` fincas en un SQLite temporal y mide, para varios conjuntos de
+filtros, lo que hacía el cliente (recorrer todas las páginas de
+EstateController.get_all_estates y agregar en Python), EstateController.get_facets
+sin caché (una consulta agrupada) y get_facets con la caché caliente.
+
+    python benchmarks/estate_facets.py --estates 200000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base de datos debe definirse antes de importar la aplicación
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_facets.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from app.controllers.estateController import EstateController  # noqa: E402
+from app.database import SessionLocal, create_tables, dispose_engine  # noqa: E402
+from app.utils.locations import normalize_location  # noqa: E402
+
+MUNICIPALITIES = [
+    "Armenia", "Calarcá", "Circasia", "Filandia", "Montenegro", "Quimbaya", "Salento", "Manizales",
+    "Chinchiná", "Villamaría", "Pereira", "Santa Rosa de Cabal", "Marsella", "Jardín", "Jericó",
+]
+
+FILTERS = [
+    {},
+    {"min_price": 200000, "max_price": 800000},
+    {"location": "salento"},
+    {"owner_id": 3},
+]
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def seed(estates: int):
+    """Insertar propietarios y fincas directamente con sqlite3 (con su location_key)"""
+    rng = random.Random(19)
+    conn = sqlite3.connect(DB_PATH)
+    conn.executemany(
+        "INSERT INTO users (id, username, email, hashed_password, is_active) VALUES (?, ?, ?, 'x', 1)",
+        [(owner, f"bench{owner}", f"b{owner}@x.co") for owner in range(1, 101)]
+    )
+    rows = []
+    for estate_id in range(1, estates + 1):
+        location = rng.choice(MUNICIPALITIES)
+        rows.append((
+            estate_id, f"Finca {estate_id}", location, normalize_location(location),
+            rng.randint(1, 120), rng.randint(5, 200) * 10000, rng.randint(1, 100)
+        ))
+    conn.executemany(
+        "INSERT INTO estates (id, name, location, location_key, size, price, owner_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+async def paging(filters: dict):
+    """Lo que hacía el cliente: todas las páginas del listado y los agregados en Python"""
+    price, size, locations, cursor = Counter(), Counter(), Counter(), None
+    while True:
+        async with SessionLocal() as db:
+            controller = EstateController(db)
+            page = await controller.get_all_estates(limit=1000, cursor=cursor, **filters)
+        for estate in page:
+            price[estate.price // 100000] += 1
+            size[estate.size // 10] += 1
+            locations[estate.location] += 1
+        cursor = controller.keyset.next_cursor(page, "id", 1000)
+        if cursor is None:
+            return sum(price.values())
+
+
+async def facets(filters: dict):
+    async with SessionLocal() as db:
+        return (await EstateController(db).get_facets(**filters)).total
+
+
+async def facets_uncached(filters: dict):
+    EstateController.facets_cache.clear()
+    return await facets(filters)
+
+
+async def measure(name: str, call, repeat: int):
+    print(f"{name}:")
+    for filters in FILTERS:
+        latencies, total = [], 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            total = await call(filters)
+            latencies.append(time.perf_counter() - start)
+        print(
+            f"  {str(filters):<44} p50={statistics.median(latencies) * 1000:>9.2f}ms  "
+            f"p99={percentile(latencies, 99) * 1000:>9.2f}ms  total={total}"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estates", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    await create_tables()
+    seed(args.estates)
+    print(f"{args.estates} fincas en {len(MUNICIPALITIES)} municipios")
+
+    await measure("paginando el listado", paging, max(1, args.repeat // 5))
+    await measure("facetas sin caché", facets_uncached, args.repeat)
+    for filters in FILTERS:
+        await facets(filters)
+    await measure("facetas con caché", facets, args.repeat)
+
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,132 @@
+"""
+Benchmark de la búsqueda de experiencias: ILIKE frente al índice de texto completo.
+
+Crea `--experiences` experiencias en un SQLite temporal (los triggers llenan el
+índice FTS5 al insertar) y mide, para cada búsqueda, la consulta anterior
+(`title ILIKE '%q%' OR description ILIKE '%q%'`, recorre la tabla completa) y
+ExperienceController.search_experiences (índice invertido, ranking bm25 y fragmento).
+También cuenta los resultados: ILIKE no encuentra "café" al buscar "cafe".
+
+    python benchmarks/experience_search.py --experiences 500000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base de datos debe definirse antes de importar la aplicación
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_search.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from sqlalchemy import select  # noqa: E402
+
+from app.controllers.experienceController import ExperienceController  # noqa: E402
+from app.database import SessionLocal, create_tables, dispose_engine  # noqa: E402
+from app.models.experiences import Experiences  # noqa: E402
+
+ACTIVITIES = ["Tour", "Caminata", "Cabalgata", "Taller", "Avistamiento", "Degustación", "Recorrido", "Clase"]
+TOPICS = ["del café", "de aves", "en el cafetal", "de barismo", "por el valle", "de cacao", "nocturno", "de cocina"]
+PLACES = ["Salento", "Filandia", "Pijao", "Génova", "Buenavista", "Calarcá", "Montenegro", "Circasia"]
+WORDS = (
+    "finca cafetal cosecha grano tostión secado beneficio montaña palmas cera niebla guadua río "
+    "sendero mirador artesanía familia tradición arriero mula fonda almuerzo bandeja chocolate panela "
+    "orquídeas colibríes tucanes bosque cascada quebrada amanecer atardecer fotografía"
+).split()
+RARE = ["degustación de cafés especiales", "mariposario", "observación de búhos"]
+
+SEARCHES = ["café", "cafe degustacion", "palmas cera", "mariposario", "buhos", "colibries bosque cascada"]
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def seed(experiences: int):
+    """Insertar usuarios y experiencias directamente con sqlite3"""
+    rng = random.Random(11)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("INSERT INTO users (id, username, email, hashed_password, is_active) VALUES (1, 'bench', 'b@x.co', 'x', 1)")
+    rows = []
+    for index in range(1, experiences + 1):
+        place = rng.choice(PLACES)
+        description = " ".join(rng.choices(WORDS, k=rng.randint(12, 30)))
+        if rng.random() < 0.001:
+            description += " " + rng.choice(RARE)
+        title = f"{rng.choice(ACTIVITIES)} {rng.choice(TOPICS)} en {place} #{index}"
+        rows.append((title, description, "8:00", rng.randint(1, 8), rng.randint(20, 300) * 1000, place))
+        if len(rows) == 10000:
+            conn.executemany(
+                "INSERT INTO experiences (title, description, schedule, duration, price, location, user_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, 1)",
+                rows
+            )
+            rows = []
+    if rows:
+        conn.executemany(
+            "INSERT INTO experiences (title, description, schedule, duration, price, location, user_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, 1)",
+            rows
+        )
+    conn.commit()
+    conn.close()
+
+
+async def ilike(db, query: str, limit: int):
+    """La consulta anterior a la búsqueda de texto completo"""
+    result = await db.execute(
+        select(Experiences)
+        .where(Experiences.title.ilike(f"%{query}%") | Experiences.description.ilike(f"%{query}%"))
+        .offset(0)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def full_text(db, query: str, limit: int):
+    return await ExperienceController(db).search_experiences(query, limit=limit)
+
+
+async def measure(name: str, call, repeat: int, limit: int):
+    print(f"{name}:")
+    for query in SEARCHES:
+        latencies, found = [], 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            async with SessionLocal() as db:
+                found = len(await call(db, query, limit))
+            latencies.append(time.perf_counter() - start)
+        print(
+            f"  {query!r:<28} p50={statistics.median(latencies) * 1000:>9.2f}ms  "
+            f"p99={percentile(latencies, 99) * 1000:>9.2f}ms  resultados={found}"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--experiences", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    await create_tables()
+    start = time.perf_counter()
+    seed(args.experiences)
+    print(f"{args.experiences} experiencias insertadas e indexadas en {time.perf_counter() - start:.1f}s")
+
+    await measure("ILIKE", ilike, args.repeat, args.limit)
+    await measure("texto completo", full_text, args.repeat, args.limit)
+
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
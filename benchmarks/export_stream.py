@@ -0,0 +1,102 @@
+"""
+Benchmark de exportación: streaming desde cursor frente al bucle de páginas.
+
+Crea `--rows` reservas en un SQLite temporal y compara tiempo y pico de memoria
+(tracemalloc) de recorrer todas las reservas con GET /bookings/?skip=...&limit=1000
+(get_all_bookings) y con el stream NDJSON/CSV de /bookings/export:
+
+    python benchmarks/export_stream.py --rows 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base de datos debe definirse antes de importar la aplicación
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_export.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from app.controllers.bookingController import BookingController  # noqa: E402
+from app.database import SessionLocal, create_tables, dispose_engine, engine  # noqa: E402
+from app.utils.export import stream_rows  # noqa: E402
+
+
+def seed(rows: int):
+    """Insertar las reservas directamente con sqlite3 (mucho más rápido que el ORM)"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("INSERT INTO users (id, username, email, hashed_password, is_active) VALUES (1, 'bench', 'b@x.co', 'x', 1)")
+    conn.execute("INSERT INTO estates (id, name, location, size, price, owner_id) VALUES (1, 'Finca', 'Salento', 10, 100, 1)")
+    rng = random.Random(7)
+    batch = 50000
+    for start in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO bookings (start_date, end_date, status, num_persons, user_id, estate_id) VALUES (?, ?, 'pending', 2, 1, 1)",
+            [
+                (f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", "2025-12-31")
+                for _ in range(min(batch, rows - start))
+            ]
+        )
+    conn.commit()
+    conn.close()
+
+
+async def paged(page_size: int) -> int:
+    """Recorrer todas las reservas página por página, como los reportes actuales"""
+    total, skip = 0, 0
+    while True:
+        async with SessionLocal() as db:
+            page = await BookingController(db).get_all_bookings(skip=skip, limit=page_size)
+        total += len(page)
+        skip += page_size
+        if len(page) < page_size:
+            return total
+
+
+async def streamed(fmt: str, compress: bool) -> int:
+    """Consumir el stream de exportación y contar los bytes enviados"""
+    async with SessionLocal() as db:
+        stmt = BookingController(db).export_query()
+    total = 0
+    async for chunk in stream_rows(engine, stmt, fmt, compress):
+        total += len(chunk)
+    return total
+
+
+async def measure(name: str, call):
+    """Tiempo y pico de memoria de una corrida completa"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = await call()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<22} {elapsed:>8.2f}s  pico={peak / 2**20:>8.1f} MiB  resultado={result}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    await create_tables()
+    seed(args.rows)
+
+    print(f"{args.rows} reservas")
+    await measure(f"paginas de {args.page_size}", lambda: paged(args.page_size))
+    await measure("stream ndjson", lambda: streamed("ndjson", False))
+    await measure("stream csv", lambda: streamed("csv", False))
+    await measure("stream ndjson + gzip", lambda: streamed("ndjson", True))
+
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+Benchmark de paginación: `skip` (OFFSET) frente a cursor (keyset) en reservas.
+
+Crea una tabla de `--rows` reservas en un SQLite temporal y mide la latencia de
+BookingController.get_all_bookings en la página 1 y en la página `--page`, para
+cada orden soportado y cada forma de paginar:
+
+    python benchmarks/keyset_pagination.py --rows 1000000 --page 10000 --limit 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base de datos debe definirse antes de importar la aplicación
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_pagination.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from sqlalchemy import select  # noqa: E402
+
+from app.controllers.bookingController import BookingController  # noqa: E402
+from app.database import SessionLocal, create_tables, dispose_engine  # noqa: E402
+from app.models import Booking  # noqa: E402
+from app.utils.pagination import encode_cursor  # noqa: E402
+
+
+def seed(rows: int):
+    """Insertar las reservas directamente con sqlite3 (mucho más rápido que el ORM)"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("INSERT INTO users (id, username, email, hashed_password, is_active) VALUES (1, 'bench', 'b@x.co', 'x', 1)")
+    conn.execute("INSERT INTO estates (id, name, location, size, price, owner_id) VALUES (1, 'Finca', 'Salento', 10, 100, 1)")
+    rng = random.Random(7)
+    batch = 50000
+    for start in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO bookings (start_date, end_date, status, num_persons, user_id, estate_id) VALUES (?, ?, 'pending', 2, 1, 1)",
+            [
+                (f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", "2025-12-31")
+                for _ in range(min(batch, rows - start))
+            ]
+        )
+    conn.commit()
+    conn.close()
+
+
+async def cursor_for_page(sort: str, page: int, limit: int) -> str:
+    """Cursor que apunta al final de la página anterior a `page`"""
+    column = BookingController.keyset.sort_keys[sort]
+    order = [Booking.id] if sort == "id" else [column, Booking.id]
+    async with SessionLocal() as db:
+        row = (await db.execute(
+            select(column, Booking.id).order_by(*order).offset((page - 1) * limit - 1).limit(1)
+        )).one()
+    return encode_cursor(sort, row[0], row[1])
+
+
+async def measure(repeat: int, **kwargs) -> float:
+    """Mediana de latencia (ms) de get_all_bookings con los argumentos dados"""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        async with SessionLocal() as db:
+            await BookingController(db).get_all_bookings(**kwargs)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--page", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    await create_tables()
+    seed(args.rows)
+
+    print(f"{args.rows} reservas, limit={args.limit}")
+    for sort in BookingController.keyset.sort_keys:
+        deep_skip = (args.page - 1) * args.limit
+        deep_cursor = await cursor_for_page(sort, args.page, args.limit)
+        results = {
+            "skip p1": await measure(args.repeat, sort=sort, limit=args.limit),
+            f"skip p{args.page}": await measure(args.repeat, sort=sort, skip=deep_skip, limit=args.limit),
+            f"cursor p{args.page}": await measure(args.repeat, sort=sort, cursor=deep_cursor, limit=args.limit),
+        }
+        print(f"sort={sort:<11}" + "  ".join(f"{name}={ms:>8.2f}ms" for name, ms in results.items()))
+
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
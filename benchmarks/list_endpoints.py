@@ -0,0 +1,123 @@
+"""
+Benchmark de throughput para los endpoints de listado de reservas y fincas.
+
+Lanza N peticiones concurrentes contra un servidor en ejecución y reporta
+peticiones por segundo y latencias p50/p99. Para comparar antes/después,
+ejecutar el mismo comando contra cada versión del servidor:
+
+    uvicorn app.main:app --workers 1
+    python benchmarks/list_endpoints.py --seed --concurrency 200 --requests 5000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date, timedelta
+
+import httpx
+
+ENDPOINTS = ["/bookings/?limit=50", "/estates/?limit=50"]
+
+
+async def seed(client: httpx.AsyncClient, estates: int, bookings: int):
+    """Crear un usuario, fincas y reservas de prueba usando la propia API"""
+    response = await client.post("/users/", json={
+        "username": "bench_user",
+        "email": "bench@example.com",
+        "full_name": "Bench User",
+        "phone": "3000000000",
+        "password": "benchpass"
+    })
+    if response.status_code == 201:
+        user_id = response.json()["id"]
+    else:
+        user_id = (await client.get("/users/username/bench_user")).json()["id"]
+
+    for i in range(estates):
+        await client.post("/estates/", json={
+            "name": f"Finca bench {i}",
+            "location": "Salento",
+            "size": 10 + i,
+            "price": 100000 + i,
+            "owner_id": user_id
+        })
+
+    estate_ids = [estate["id"] for estate in (await client.get("/estates/?limit=1000")).json()]
+    for i in range(bookings):
+        # Cada vuelta sobre las fincas usa otras noches: las reservas cruzadas se rechazan
+        start = date(2025, 1, 1) + timedelta(2 * (i // len(estate_ids)))
+        await client.post("/bookings/", json={
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(2)).isoformat(),
+            "status": "pending",
+            "num_persons": 2,
+            "user_id": user_id,
+            "estate_id": estate_ids[i % len(estate_ids)]
+        })
+
+
+async def run(base_url: str, path: str, concurrency: int, total: int, timeout: float = 30):
+    """Ejecutar `total` peticiones GET con `concurrency` clientes simultáneos"""
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(path)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        # Calentamiento: abrir conexiones HTTP y del pool antes de medir
+        await asyncio.gather(*(client.get(path) for _ in range(concurrency)), return_exceptions=True)
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                url = queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "path": path,
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--timeout", type=float, default=30, help="Timeout por petición en segundos")
+    parser.add_argument("--seed", action="store_true", help="Crear datos de prueba antes de medir")
+    parser.add_argument("--estates", type=int, default=50)
+    parser.add_argument("--bookings", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.seed:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+            await seed(client, args.estates, args.bookings)
+
+    for path in ENDPOINTS:
+        result = await run(args.base_url, path, args.concurrency, args.requests, args.timeout)
+        print(
+            f"{result['path']:<24} {result['rps']:>8.1f} req/s  "
+            f"p50={result['p50_ms']:.1f}ms  p99={result['p99_ms']:.1f}ms  errors={result['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
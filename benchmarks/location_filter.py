@@ -0,0 +1,116 @@
+"""
+Benchmark del filtro por ubicación: ILIKE '%q%' frente a location_key.
+
+Crea `--experiences` experiencias repartidas entre municipios del Eje Cafetero en
+un SQLite temporal y mide, para búsquedas exactas, con tildes, parciales y con
+errores de escritura, la consulta anterior (`location ILIKE '%q%'`, recorre la
+tabla) y ExperienceController.get_experiences_by_location (vocabulario en memoria
+y `location_key IN (...)` sobre el índice). También cuenta los resultados.
+
+    python benchmarks/location_filter.py --experiences 500000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base de datos debe definirse antes de importar la aplicación
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_locations.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from sqlalchemy import select  # noqa: E402
+
+from app.controllers.experienceController import ExperienceController  # noqa: E402
+from app.database import SessionLocal, create_tables, dispose_engine  # noqa: E402
+from app.models.experiences import Experiences  # noqa: E402
+from app.utils.locations import normalize_location  # noqa: E402
+
+MUNICIPALITIES = [
+    "Armenia", "Buenavista", "Calarcá", "Circasia", "Córdoba", "Filandia", "Génova", "La Tebaida",
+    "Montenegro", "Pijao", "Quimbaya", "Salento", "Manizales", "Chinchiná", "Neira", "Palestina",
+    "Villamaría", "Aguadas", "Pácora", "Riosucio", "Pereira", "Dosquebradas", "Santa Rosa de Cabal",
+    "Marsella", "Belén de Umbría", "Apía", "Santuario", "Jardín", "Jericó", "Támesis",
+]
+
+SEARCHES = ["Salento", "salento", "Salénto", "Slento", "sal", "Calarca", "Filandya", "Santa Rosa", "Bogotá"]
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def seed(experiences: int):
+    """Insertar experiencias directamente con sqlite3 (con su location_key)"""
+    rng = random.Random(13)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("INSERT INTO users (id, username, email, hashed_password, is_active) VALUES (1, 'bench', 'b@x.co', 'x', 1)")
+    for first in range(1, experiences + 1, 10000):
+        rows = []
+        for index in range(first, min(first + 10000, experiences + 1)):
+            municipality = rng.choice(MUNICIPALITIES)
+            location = f"{municipality}, {rng.choice(['Quindío', 'Caldas', 'Risaralda', 'Antioquia'])}"
+            rows.append((f"Experiencia {index}", "Recorrido", "8:00", 2, 50000, location, normalize_location(location)))
+        conn.executemany(
+            "INSERT INTO experiences (title, description, schedule, duration, price, location, location_key, user_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
+            rows
+        )
+    conn.commit()
+    conn.close()
+
+
+async def ilike(db, location: str, limit: int):
+    """El filtro anterior a location_key"""
+    result = await db.execute(
+        select(Experiences).where(Experiences.location.ilike(f"%{location}%")).offset(0).limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def location_key(db, location: str, limit: int):
+    return await ExperienceController(db).get_experiences_by_location(location, limit=limit)
+
+
+async def measure(name: str, call, repeat: int, limit: int):
+    print(f"{name}:")
+    for location in SEARCHES:
+        latencies, found = [], 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            async with SessionLocal() as db:
+                found = len(await call(db, location, limit))
+            latencies.append(time.perf_counter() - start)
+        print(
+            f"  {location!r:<14} p50={statistics.median(latencies) * 1000:>9.2f}ms  "
+            f"p99={percentile(latencies, 99) * 1000:>9.2f}ms  resultados={found}"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--experiences", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    await create_tables()
+    seed(args.experiences)
+    print(f"{args.experiences} experiencias en {len(MUNICIPALITIES)} municipios")
+
+    await measure("ILIKE", ilike, args.repeat, args.limit)
+    await measure("location_key", location_key, args.repeat, args.limit)
+
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""
+Benchmark de la latencia de otros endpoints durante una ráfaga de logins.
+
+Crea un usuario y una finca en un SQLite temporal y, a través de la aplicación ASGI
+completa (httpx, sin red), mantiene `--logins` logins simultáneos durante `--seconds`
+segundos mientras otra tarea lee `GET /estates/1` cada `--interval-ms` ms. Compara
+bcrypt dentro del event loop (como antes, cada hash bloquea el worker) con el pool
+acotado de `password_hasher`, y muestra la latencia de las lecturas y los logins
+atendidos o rechazados con 429.
+
+    python benchmarks/login_storm.py --logins 32 --seconds 5
+    python benchmarks/login_storm.py --logins 32 --max-pending 4
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base de datos debe definirse antes de importar la aplicación
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_login_storm.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from app.database import create_tables  # noqa: E402
+from app.main import app  # noqa: E402
+from app.utils.auth import get_password_hash  # noqa: E402
+from app.utils.password_hasher import password_hasher  # noqa: E402
+
+PASSWORD = "secret123"
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def seed():
+    """Un usuario con contraseña real (bcrypt) y una finca, directamente con sqlite3"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute(
+        "INSERT INTO users (id, username, email, full_name, phone, hashed_password, is_active) VALUES (1, 'bench', 'b@x.co', 'Bench', '1', ?, 1)",
+        (get_password_hash(PASSWORD),)
+    )
+    conn.execute(
+        "INSERT INTO estates (id, name, location, location_key, size, price, owner_id) "
+        "VALUES (1, 'Finca 1', 'Salento, Quindío', 'salento quindio', 10, 100000, 1)"
+    )
+    conn.commit()
+    conn.close()
+
+
+async def storm(name: str, client: AsyncClient, logins: int, seconds: float, interval: float):
+    deadline = time.perf_counter() + seconds
+    latencies = []
+    statuses = {}
+
+    async def login():
+        while time.perf_counter() < deadline:
+            response = await client.post("/auth/login", json={"username": "bench", "password": PASSWORD})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 429:
+                await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+
+    async def probe():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get("/estates/1")
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+            await asyncio.sleep(interval)
+
+    await asyncio.gather(probe(), *[login() for _ in range(logins)])
+    print(
+        f"{name:<14} GET /estates/1: p50={statistics.median(latencies) * 1000:>8.2f}ms  "
+        f"p99={percentile(latencies, 99) * 1000:>8.2f}ms  max={max(latencies) * 1000:>8.2f}ms  "
+        f"({len(latencies)} lecturas)   logins: {dict(sorted(statuses.items()))}"
+    )
+
+
+async def inline(function, *args):
+    """bcrypt en el event loop, como antes del pool"""
+    return function(*args)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--interval-ms", type=float, default=10.0)
+    parser.add_argument("--max-pending", type=int, default=None, help="PASSWORD_HASH_MAX_PENDING para la prueba")
+    args = parser.parse_args()
+    if args.max_pending is not None:
+        password_hasher.max_pending = args.max_pending
+
+    await create_tables()
+    seed()
+    print(
+        f"{args.logins} logins simultáneos durante {args.seconds:g} s; pool de {password_hasher.workers} hilos, "
+        f"máximo {password_hasher.max_pending} hashes pendientes"
+    )
+
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            pooled = password_hasher._run
+            password_hasher._run = inline
+            await storm("en el loop", client, args.logins, args.seconds, args.interval_ms / 1000)
+            password_hasher._run = pooled
+            await storm("pool acotado", client, args.logins, args.seconds, args.interval_ms / 1000)
+
+    print(password_hasher.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+"""
+Benchmark de la búsqueda de fincas por cercanía y por caja.
+
+Crea `--estates` fincas en un SQLite temporal (la mitad en el Eje Cafetero, el
+resto por todo el país; los triggers llenan el R*Tree al insertar) y mide:
+
+- recorrido: distancia y orden en SQL sin índice espacial (recorre la tabla);
+- nearby: EstateController.get_nearby_estates (candidatas y orden desde el R*Tree);
+- within: EstateController.get_estates_in_box con una caja de ~40 x 40 km.
+
+    python benchmarks/nearby_estates.py --estates 200000 --radius 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base de datos debe definirse antes de importar la aplicación
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_nearby.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from sqlalchemy import select  # noqa: E402
+
+from app.controllers.estateController import EstateController  # noqa: E402
+from app.database import SessionLocal, create_tables, dispose_engine  # noqa: E402
+from app.models.estate import Estate  # noqa: E402
+from app.utils.geo import KM_PER_DEGREE, distance_sq  # noqa: E402
+
+# Centros de búsqueda: Armenia, Manizales, Pereira, Salento, Medellín
+CENTERS = [(4.5339, -75.6811), (5.0703, -75.5138), (4.8133, -75.6961), (4.6375, -75.5706), (6.2442, -75.5812)]
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def seed(estates: int):
+    """Insertar fincas con coordenadas directamente con sqlite3"""
+    rng = random.Random(17)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("INSERT INTO users (id, username, email, hashed_password, is_active) VALUES (1, 'bench', 'b@x.co', 'x', 1)")
+    rows = []
+    for estate_id in range(1, estates + 1):
+        if estate_id % 2:
+            lat, lon = rng.uniform(4.2, 5.6), rng.uniform(-76.0, -75.4)
+        else:
+            lat, lon = rng.uniform(-4.0, 12.0), rng.uniform(-79.0, -67.0)
+        rows.append((estate_id, f"Finca {estate_id}", lat, lon))
+    conn.executemany(
+        "INSERT INTO estates (id, name, location, size, price, owner_id, latitude, longitude) "
+        "VALUES (?, ?, 'Eje Cafetero', 10, 1000, 1, ?, ?)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+async def scan(db, lat, lon, radius_km, limit):
+    """Misma distancia y orden, sin índice espacial"""
+    distance = distance_sq(Estate.latitude, Estate.longitude, lat, lon)
+    result = await db.execute(
+        select(Estate, distance).where(distance <= radius_km * radius_km).order_by(distance, Estate.id).limit(limit)
+    )
+    return result.all()
+
+
+async def nearby(db, lat, lon, radius_km, limit):
+    return await EstateController(db).get_nearby_estates(lat, lon, radius_km, limit=limit)
+
+
+async def within(db, lat, lon, radius_km, limit):
+    delta = radius_km / KM_PER_DEGREE
+    return await EstateController(db).get_estates_in_box(
+        lat - delta, lon - delta, lat + delta, lon + delta, limit=limit
+    )
+
+
+async def measure(name: str, call, points, radius_km: float, limit: int):
+    latencies, found = [], 0
+    for lat, lon in points:
+        start = time.perf_counter()
+        async with SessionLocal() as db:
+            found += len(await call(db, lat, lon, radius_km, limit))
+        latencies.append(time.perf_counter() - start)
+    print(
+        f"{name:<10} p50={statistics.median(latencies) * 1000:>8.2f}ms  "
+        f"p99={percentile(latencies, 99) * 1000:>8.2f}ms  resultados/consulta={found / len(points):.0f}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estates", type=int, default=200000)
+    parser.add_argument("--radius", type=float, default=20.0)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    await create_tables()
+    seed(args.estates)
+    print(f"{args.estates} fincas, radio {args.radius} km, {args.limit} por página")
+
+    rng = random.Random(19)
+    points = [
+        (lat + rng.uniform(-0.05, 0.05), lon + rng.uniform(-0.05, 0.05))
+        for lat, lon in rng.choices(CENTERS, k=args.queries)
+    ]
+    await measure("recorrido", scan, points, args.radius, args.limit)
+    await measure("nearby", nearby, points, args.radius, args.limit)
+    await measure("within", within, points, args.radius, args.limit)
+
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
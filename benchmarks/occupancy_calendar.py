@@ -0,0 +1,127 @@
+"""
+Benchmark del calendario de ocupación frente al cálculo en el cliente.
+
+Crea `--estates` fincas con `--bookings` reservas en total en un SQLite temporal,
+construye la tabla de ocupación y mide, para un calendario de 12 meses por finca:
+
+- reservas: get_bookings_by_estate (todas las reservas de la finca, máximo 1000)
+  y la expansión a noches ocupadas que hoy hace el widget;
+- calendario: EstateController.get_calendar (un recorrido de rango por (estate_id, day)).
+
+    python benchmarks/occupancy_calendar.py --estates 1000 --bookings 500000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base de datos debe definirse antes de importar la aplicación
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_calendar.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from app.controllers.bookingController import BookingController  # noqa: E402
+from app.controllers.estateController import EstateController  # noqa: E402
+from app.database import SessionLocal, create_tables, dispose_engine  # noqa: E402
+from app.utils.occupancy import rebuild_occupancy  # noqa: E402
+
+FIRST_DAY = date(2024, 1, 1)
+CALENDAR_START = date(2025, 1, 1)
+CALENDAR_END = date(2025, 12, 31)
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def seed(estates: int, bookings: int):
+    """Insertar fincas y reservas sin cruces directamente con sqlite3"""
+    rng = random.Random(5)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("INSERT INTO users (id, username, email, hashed_password, is_active) VALUES (1, 'bench', 'b@x.co', 'x', 1)")
+    conn.executemany(
+        "INSERT INTO estates (id, name, location, size, price, owner_id) VALUES (?, ?, 'Salento', 10, 100, 1)",
+        [(i, f"Finca {i}") for i in range(1, estates + 1)]
+    )
+    rows = []
+    for estate_id in range(1, estates + 1):
+        day = FIRST_DAY
+        for _ in range(bookings // estates):
+            nights = rng.randint(1, 4)
+            status = rng.choice(["pending", "confirmed", "confirmed", "cancelled"])
+            rows.append((day.isoformat(), (day + timedelta(nights)).isoformat(), status, rng.randint(1, 8), estate_id))
+            day += timedelta(nights + rng.randint(0, 2))
+    conn.executemany(
+        "INSERT INTO bookings (start_date, end_date, status, num_persons, user_id, estate_id) VALUES (?, ?, ?, ?, 1, ?)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+def nights_from_bookings(bookings):
+    """Lo que hace el widget con la lista de reservas: noches ocupadas dentro del calendario"""
+    days = {}
+    for booking in bookings:
+        if booking.status == "cancelled":
+            continue
+        day = max(booking.start_date, CALENDAR_START)
+        while day < booking.end_date and day <= CALENDAR_END:
+            days[day] = (booking.num_persons, booking.status)
+            day += timedelta(1)
+    return days
+
+
+async def measure(name: str, estate_ids, call):
+    latencies, nights = [], 0
+    for estate_id in estate_ids:
+        start = time.perf_counter()
+        async with SessionLocal() as db:
+            nights += await call(db, estate_id)
+        latencies.append(time.perf_counter() - start)
+    print(
+        f"{name:<11} p50={statistics.median(latencies) * 1000:>8.2f}ms  "
+        f"p99={percentile(latencies, 99) * 1000:>8.2f}ms  noches/finca={nights / len(estate_ids):.0f}"
+    )
+
+
+async def from_bookings(db, estate_id):
+    return len(nights_from_bookings(await BookingController(db).get_bookings_by_estate(estate_id)))
+
+
+async def from_calendar(db, estate_id):
+    calendar = await EstateController(db).get_calendar(estate_id, CALENDAR_START, CALENDAR_END)
+    return len(calendar.days)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estates", type=int, default=1000)
+    parser.add_argument("--bookings", type=int, default=500000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    await create_tables()
+    seed(args.estates, args.bookings)
+    start = time.perf_counter()
+    rows = await rebuild_occupancy()
+    print(f"{args.estates} fincas, {args.bookings} reservas; ocupación: {rows} noches en {time.perf_counter() - start:.1f}s")
+
+    estate_ids = random.Random(9).choices(range(1, args.estates + 1), k=args.queries)
+    await measure("reservas", estate_ids, from_bookings)
+    await measure("calendario", estate_ids, from_calendar)
+
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""
+Benchmark de la caché de respuestas de fincas.
+
+Crea `--estates` fincas en un SQLite temporal y envía, a través de la aplicación
+ASGI completa (httpx, sin red), `--requests` lecturas de `GET /estates/{id}` sobre
+un conjunto caliente de fincas y de páginas de `GET /estates/`, primero sin caché
+y luego con ella. Con `--concurrency` peticiones simultáneas también muestra cuántas
+esperaron una carga en curso en lugar de repetir la consulta.
+
+    python benchmarks/response_cache.py --estates 20000 --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base de datos debe definirse antes de importar la aplicación
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_responses.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.controllers.estateController import EstateController  # noqa: E402
+from app.database import create_tables  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def seed(estates: int):
+    """Insertar fincas directamente con sqlite3"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("INSERT INTO users (id, username, email, hashed_password, is_active) VALUES (1, 'bench', 'b@x.co', 'x', 1)")
+    conn.executemany(
+        "INSERT INTO estates (id, name, location, location_key, size, price, owner_id) "
+        "VALUES (?, ?, 'Salento, Quindío', 'salento quindio', 10, ?, 1)",
+        [(estate_id, f"Finca {estate_id}", 100000 + estate_id) for estate_id in range(1, estates + 1)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def workload(estates: int, requests: int):
+    """80 % fichas de 200 fincas populares, 20 % primeras páginas del listado"""
+    rng = random.Random(20)
+    popular = rng.sample(range(1, estates + 1), min(200, estates))
+    urls = []
+    for _ in range(requests):
+        if rng.random() < 0.8:
+            urls.append(f"/estates/{rng.choice(popular)}")
+        else:
+            urls.append(f"/estates/?limit=50&skip={rng.randrange(5) * 50}")
+    return urls
+
+
+async def measure(name: str, client: AsyncClient, urls, concurrency: int):
+    latencies = []
+    queue = list(reversed(urls))
+
+    async def worker():
+        while queue:
+            url = queue.pop()
+            start = time.perf_counter()
+            response = await client.get(url, headers={"Accept-Encoding": "gzip"})
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<10} p50={statistics.median(latencies) * 1000:>7.2f}ms  "
+        f"p99={percentile(latencies, 99) * 1000:>7.2f}ms  {len(urls) / elapsed:>7.0f} peticiones/s"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estates", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    await create_tables()
+    seed(args.estates)
+    urls = workload(args.estates, args.requests)
+    print(f"{args.estates} fincas, {args.requests} lecturas, {args.concurrency} simultáneas")
+
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            settings.RESPONSE_CACHE_ENABLED = False
+            await measure("sin caché", client, urls, args.concurrency)
+            settings.RESPONSE_CACHE_ENABLED = True
+            await measure("con caché", client, urls, args.concurrency)
+
+    stats = EstateController.responses.stats()
+    print(
+        f"aciertos: fichas {stats['items']['hit_ratio']:.1%}, páginas {stats['pages']['hit_ratio']:.1%}; "
+        f"esperaron una carga en curso: {stats['coalesced']}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
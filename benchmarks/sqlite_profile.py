@@ -0,0 +1,90 @@
+"""
+Benchmark de concurrencia lectura/escritura en SQLite con y sin el perfil de producción.
+
+Durante `--seconds` segundos, `--writers` tareas insertan reservas (un commit por
+inserción) mientras `--readers` tareas listan reservas, igual que hacen
+BookingController.create_booking y get_all_bookings. Se reportan operaciones por
+segundo y errores "database is locked" para cada perfil:
+
+    python benchmarks/sqlite_profile.py --writers 8 --readers 32 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import select, insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base  # noqa: E402
+from app.models import Booking, Estate, User  # noqa: E402
+from app.utils.sqlite_profile import apply_sqlite_profile  # noqa: E402
+
+
+async def run_profile(profile: str, writers: int, readers: int, seconds: float):
+    """Ejecutar la carga mixta sobre un archivo SQLite nuevo"""
+    path = os.path.join(tempfile.mkdtemp(), f"bench_{profile}.db")
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        pool_size=writers + readers,
+        max_overflow=0
+    )
+    if profile == "production":
+        apply_sqlite_profile(engine.sync_engine)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User).values(id=1, username="bench", email="bench@example.com", hashed_password="x"))
+        await conn.execute(insert(Estate).values(id=1, name="Finca bench", location="Salento", size=10, price=1000, owner_id=1))
+
+    counters = {"writes": 0, "reads": 0, "locked": 0}
+    deadline = time.perf_counter() + seconds
+
+    async def writer():
+        while time.perf_counter() < deadline:
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(insert(Booking).values(
+                        start_date="2025-01-01", end_date="2025-01-03", status="pending",
+                        num_persons=2, user_id=1, estate_id=1
+                    ))
+                counters["writes"] += 1
+            except OperationalError:
+                counters["locked"] += 1
+
+    async def reader():
+        while time.perf_counter() < deadline:
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(select(Booking).order_by(Booking.id.desc()).limit(50))
+                counters["reads"] += 1
+            except OperationalError:
+                counters["locked"] += 1
+
+    await asyncio.gather(*[writer() for _ in range(writers)], *[reader() for _ in range(readers)])
+    await engine.dispose()
+
+    print(
+        f"{profile:<11} writes={counters['writes'] / seconds:>8.1f}/s  "
+        f"reads={counters['reads'] / seconds:>8.1f}/s  locked_errors={counters['locked']}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    for profile in ("default", "production"):
+        await run_profile(profile, args.writers, args.readers, args.seconds)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
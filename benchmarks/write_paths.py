@@ -0,0 +1,91 @@
+"""
+Benchmark de latencia de las rutas de escritura (creación y actualización).
+
+Ejecuta `--iterations` llamadas secuenciales a cada método de controlador sobre
+una base de datos SQLite nueva y reporta p50/p99 por operación. Sirve para comparar
+versiones del código (por ejemplo, antes y después de un cambio en los controladores):
+
+    python benchmarks/write_paths.py --iterations 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base de datos debe definirse antes de importar la aplicación
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_write_paths.db')}")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.controllers.bookingController import BookingController  # noqa: E402
+from app.controllers.estateController import EstateController  # noqa: E402
+from app.controllers.experienceController import ExperienceController  # noqa: E402
+from app.database import SessionLocal, create_tables, dispose_engine  # noqa: E402
+from app.models import User  # noqa: E402
+from app.schemas.booking import BookingCreate, BookingUpdate  # noqa: E402
+from app.schemas.estate import EstateCreate, EstateUpdate  # noqa: E402
+from app.schemas.experience import ExperienceCreate, ExperienceUpdate  # noqa: E402
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def measure(name: str, iterations: int, call):
+    """Ejecutar `call(i)` en una sesión nueva por iteración, como una petición"""
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        async with SessionLocal() as db:
+            await call(db, i)
+        latencies.append(time.perf_counter() - start)
+    print(
+        f"{name:<18} p50={statistics.median(latencies) * 1000:>7.3f}ms  "
+        f"p99={percentile(latencies, 99) * 1000:>7.3f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    await create_tables()
+    async with SessionLocal() as db:
+        await db.execute(insert(User).values(id=1, username="bench", email="bench@example.com", hashed_password="x"))
+        await db.commit()
+
+    await measure("create_estate", n, lambda db, i: EstateController(db).create_estate(
+        EstateCreate(name=f"Finca {i}", location="Salento", size=10, price=1000, owner_id=1)
+    ))
+    await measure("update_estate", n, lambda db, i: EstateController(db).update_estate(
+        i + 1, EstateUpdate(price=1000 + i)
+    ))
+    await measure("create_booking", n, lambda db, i: BookingController(db).create_booking(
+        BookingCreate(start_date="2025-01-01", end_date="2025-01-03", status="pending",
+                      num_persons=2, user_id=1, estate_id=i + 1)
+    ))
+    await measure("update_booking", n, lambda db, i: BookingController(db).update_booking(
+        i + 1, BookingUpdate(status="confirmed")
+    ))
+    await measure("create_experience", n, lambda db, i: ExperienceController(db).create_experience(
+        ExperienceCreate(title=f"Tour {i}", description="Tour de café", schedule="am",
+                         duration=60, price=10, location="Salento", user_id=1)
+    ))
+    await measure("update_experience", n, lambda db, i: ExperienceController(db).update_experience(
+        i + 1, ExperienceUpdate(price=20)
+    ))
+
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
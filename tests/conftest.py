@@ -0,0 +1,18 @@
+import os
+import tempfile
+
+import pytest
+
+# Base de datos temporal: la configuración se lee al importar la aplicación
+_db_dir = tempfile.mkdtemp(prefix="triada-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_db_dir, 'test.db')}"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,55 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.utils.middleware import require_active_claims, require_active_user, require_claims_roles, require_roles
+
+deps = FastAPI()
+
+
+@deps.get("/active")
+def active(user=Depends(require_active_user())):
+    return {"type": type(user).__name__}
+
+
+@deps.get("/roles")
+def roles(user=Depends(require_roles(["owner"]))):
+    return {"type": type(user).__name__}
+
+
+@deps.get("/claims/active")
+def claims_active(claims=Depends(require_active_claims())):
+    return {"type": type(claims).__name__, "roles": claims.roles}
+
+
+@deps.get("/claims/owner")
+def claims_owner(claims=Depends(require_claims_roles(["owner"]))):
+    return {"type": type(claims).__name__}
+
+
+def _token(client, monkeypatch, username, phone, claims_tokens):
+    monkeypatch.setattr(settings, "AUTH_CLAIMS_TOKENS", claims_tokens)
+    client.post("/users/", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "full_name": "Usuario de Prueba",
+        "phone": phone,
+        "password": "secret123",
+    })
+    response = client.post("/users/login", json={"username": username, "password": "secret123"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_dependencias_de_usuario_retornan_perfil(client, monkeypatch):
+    headers = _token(client, monkeypatch, "perfil", "3100000001", False)
+    with TestClient(deps) as local:
+        assert local.get("/active", headers=headers).json() == {"type": "UserProfile"}
+        assert local.get("/roles", headers=headers).json() == {"type": "UserProfile"}
+
+
+def test_dependencias_de_claims(client, monkeypatch):
+    headers = _token(client, monkeypatch, "claims", "3100000002", True)
+    with TestClient(deps) as local:
+        assert local.get("/claims/active", headers=headers).json() == {"type": "TokenClaims", "roles": ["user"]}
+        assert local.get("/claims/owner", headers=headers).status_code == 403
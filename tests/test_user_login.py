@@ -0,0 +1,32 @@
+import pytest
+
+from app.config import settings
+
+
+@pytest.mark.parametrize("claims_tokens", [False, True])
+def test_login_por_users(client, monkeypatch, claims_tokens):
+    monkeypatch.setattr(settings, "AUTH_CLAIMS_TOKENS", claims_tokens)
+    username = f"login{int(claims_tokens)}"
+    created = client.post("/users/", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "full_name": "Usuario de Prueba",
+        "phone": f"30000000{int(claims_tokens)}",
+        "password": "secret123",
+    })
+    assert created.status_code == 201, created.text
+
+    response = client.post("/users/login", json={"username": username, "password": "secret123"})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["token_type"] == "bearer"
+    assert body["access_token"]
+    assert body["user"]["username"] == username
+
+    profile = client.get("/auth/me", headers={"Authorization": f"Bearer {body['access_token']}"})
+    assert profile.status_code == 200, profile.text
+
+
+def test_login_credenciales_incorrectas(client):
+    response = client.post("/users/login", json={"username": "nadie", "password": "x"})
+    assert response.status_code == 401